@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+
+"""
+Import time, peak memory and datablock counts of RobotBuilder against the robot size.
+
+Usage: python3 benchmarks/bench_builder.py [--blender blender] [--links 10 100 1000 10000] [--output results.json]
+       [--scenario NAME ...] [--option key=value ...]
+
+For every scenario and link count a synthetic robot is generated with
+generate_robot.py and imported by a fresh headless Blender, so the peak
+memory of one run does not carry over into the next. The results are
+printed as a table per scenario and written to --output as JSON.
+
+Run with --run inside Blender to import a single robot and print its
+result as one JSON line:
+       blender --background --python benchmarks/bench_builder.py -- --run robot.urdf [--option key=value ...]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_robot import generate_robot  # noqa: E402
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+SCENARIOS = {
+    "primitives": {"geometry": "primitive"},
+    "repeated_stl": {"geometry": "mesh", "mesh_formats": ["stl"]},
+    "unique_stl": {"geometry": "mesh", "mesh_formats": ["stl"], "unique_meshes": True},
+    "unique_mixed": {"geometry": "mesh", "mesh_formats": ["stl", "obj", "dae"], "unique_meshes": True},
+    "many_materials": {"geometry": "mesh", "mesh_formats": ["dae"], "materials": 64},
+}
+
+
+def get_peak_memory() -> float:
+    """Peak resident memory of this process in MB, None where resource is not available"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kB elsewhere
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def parse_option(option: str):
+    key, value = option.split("=", 1)
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def run_import(urdf_path: str, options: Dict) -> Dict:
+    """Import urdf_path in the running Blender"""
+    from urdf_importer_addon.urdf_importer.batch import get_scene_counts, import_robot, reset_scene
+
+    reset_scene()
+    start = time.perf_counter()
+    robot_builder = import_robot(urdf_path, options)
+    result = {"import_time": time.perf_counter() - start, "peak_memory": get_peak_memory(), "counts": get_scene_counts()}
+    if robot_builder.profiler.enabled:
+        result["profile"] = robot_builder.profiler.to_dict()
+    return result
+
+
+def run_in_blender(blender: str, urdf_path: str, options: List[str], timeout: float) -> Dict:
+    command = [blender, "--background", "--factory-startup", "--python", os.path.abspath(__file__), "--", "--run", urdf_path]
+    command += ["--option=" + option for option in options]
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(command, cwd=os.path.dirname(urdf_path), capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout"}
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result["status"] = "succeeded"
+            result["process_time"] = time.perf_counter() - start
+            return result
+    return {"status": "failed", "returncode": process.returncode, "output": process.stdout[-2000:] + process.stderr[-2000:]}
+
+
+def run_benchmarks(
+    blender: str, scenarios: List[str], link_counts: List[int], visuals: int, resolution: int, options: List[str], timeout: float
+) -> List[Dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scenario in scenarios:
+            for link_count in link_counts:
+                robot_dir = os.path.join(work_dir, "%s_%d" % (scenario, link_count))
+                robot = generate_robot(robot_dir, links=link_count, visuals=visuals, resolution=resolution, **SCENARIOS[scenario])
+                print("Importing %s with %d links" % (scenario, link_count), flush=True)
+                result = run_in_blender(blender, os.path.join(robot_dir, "robot.urdf"), options, timeout)
+                results.append({"scenario": scenario, "robot": robot, **result})
+    return results
+
+
+def print_table(results: List[Dict]) -> None:
+    print("%-16s %8s %8s %10s %10s %10s %10s %10s" % ("scenario", "links", "status", "import s", "peak MB", "objects", "meshes", "materials"))
+    for result in results:
+        counts = result.get("counts", {})
+        print(
+            "%-16s %8d %8s %10s %10s %10s %10s %10s"
+            % (
+                result["scenario"],
+                result["robot"]["links"],
+                result["status"],
+                "%.2f" % result["import_time"] if "import_time" in result else "-",
+                "%.0f" % result["peak_memory"] if result.get("peak_memory") is not None else "-",
+                counts.get("objects", "-"),
+                counts.get("meshes", "-"),
+                counts.get("materials", "-"),
+            )
+        )
+    return None
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bench_builder", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--run", metavar="URDF", help="Import URDF in this Blender and print the result")
+    parser.add_argument("--blender", default="blender")
+    parser.add_argument("--scenario", dest="scenarios", action="append", choices=list(SCENARIOS), help="Default all scenarios")
+    parser.add_argument("--links", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--visuals", type=int, default=1, help="Visuals per link")
+    parser.add_argument("--resolution", type=int, default=4, help="Quads per box side and axis")
+    parser.add_argument("--option", dest="options", action="append", default=[], help="Import option of batch.import_robot as key=value")
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds per import")
+    parser.add_argument("--output", help="Path of the JSON results")
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = get_argument_parser().parse_args(argv)
+
+    if args.run is not None:
+        result = run_import(os.path.abspath(args.run), dict(parse_option(option) for option in args.options))
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return 0
+
+    scenarios = args.scenarios or list(SCENARIOS)
+    results = run_benchmarks(args.blender, scenarios, args.links, args.visuals, args.resolution, args.options, args.timeout)
+    print_table(results)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump({"options": args.options, "results": results}, file, indent=2)
+    return 0 if all(result["status"] == "succeeded" for result in results) else 1
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    sys.exit(main(argv))
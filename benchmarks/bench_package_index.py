@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+"""
+Lookup cost of package:// resolution against the number of visuals.
+
+Usage: blender --background --python benchmarks/bench_package_index.py -- [--packages 200]
+
+Creates a fake ROS 1 workspace, points ROS_PACKAGE_PATH at it and compares
+a fresh rospkg.RosPack per visual (the old behaviour) with the cached
+package index used by RobotBuilder.configure_mesh_path.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from urdf_importer_addon.urdf_importer import robot_builder  # noqa: E402
+
+
+def make_workspace(root: str, package_count: int) -> None:
+    for i in range(package_count):
+        pkg_path = os.path.join(root, "pkg_%d" % i)
+        os.makedirs(pkg_path)
+        with open(os.path.join(pkg_path, "package.xml"), "w") as file:
+            file.write('<package format="2"><name>pkg_%d</name><version>0.0.0</version></package>' % i)
+
+
+def time_lookups(get_path, pkg_names) -> float:
+    start = time.perf_counter()
+    for pkg_name in pkg_names:
+        get_path(pkg_name)
+    return time.perf_counter() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=200, help="Number of packages in the fake workspace")
+    parser.add_argument("--visuals", type=int, nargs="+", default=[10, 100, 1000], help="Visual counts to measure")
+    args = parser.parse_args(argv)
+
+    if 1 not in robot_builder.ROS_PKG_VERSIONS:
+        print("rospkg is not installed, nothing to compare")
+        return 1
+
+    with tempfile.TemporaryDirectory() as root:
+        make_workspace(root, args.packages)
+        os.environ["ROS_PACKAGE_PATH"] = root
+
+        print("%10s %14s %14s" % ("visuals", "RosPack (s)", "index (s)"))
+        for visual_count in args.visuals:
+            pkg_names = ["pkg_%d" % (i % args.packages) for i in range(visual_count)]
+            uncached = time_lookups(lambda pkg_name: robot_builder.rospkg.RosPack().get_path(pkg_name), pkg_names)
+            # Fresh index per run, so the crawl is part of the measured time
+            robot_builder._ros_package_index = None
+            cached = time_lookups(lambda pkg_name: robot_builder.get_ros_package_index().get_path(pkg_name), pkg_names)
+            print("%10d %14.4f %14.4f" % (visual_count, uncached, cached))
+    return 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+
+"""
+Generate a synthetic URDF robot with mesh assets for benchmarking.
+
+Usage: python3 benchmarks/generate_robot.py OUTPUT_DIR [--links 100] [--branching 2] ...
+
+Links form a tree in which every link has up to --branching children, so 1
+gives a serial chain. Every link gets --visuals visuals, either primitives
+or box meshes in STL, OBJ and/or DAE format, split into a grid of
+--resolution x --resolution quads per side.
+"""
+
+import argparse
+import os
+import struct
+import sys
+from typing import Dict, List, Tuple
+
+PRIMITIVES = ["box", "cylinder", "sphere"]
+MESH_FORMATS = ["stl", "obj", "dae"]
+
+
+def get_box_quads(resolution: int) -> Tuple[List[Tuple[float, float, float]], List[Tuple[int, int, int, int]]]:
+    """Vertices and quads of a unit box with resolution x resolution quads per side"""
+    vertices: List[Tuple[float, float, float]] = []
+    quads: List[Tuple[int, int, int, int]] = []
+    for axis in range(3):
+        for side in (-0.5, 0.5):
+            offset = len(vertices)
+            for i in range(resolution + 1):
+                for j in range(resolution + 1):
+                    u, v = i / resolution - 0.5, j / resolution - 0.5
+                    vertex = [0.0, 0.0, 0.0]
+                    vertex[axis] = side
+                    vertex[(axis + 1) % 3] = u
+                    vertex[(axis + 2) % 3] = v
+                    vertices.append(tuple(vertex))
+            for i in range(resolution):
+                for j in range(resolution):
+                    a = offset + i * (resolution + 1) + j
+                    quad = (a, a + resolution + 1, a + resolution + 2, a + 1)
+                    quads.append(quad if side > 0 else quad[::-1])
+    return vertices, quads
+
+
+def write_stl(file_path: str, resolution: int) -> None:
+    vertices, quads = get_box_quads(resolution)
+    triangles = [tri for a, b, c, d in quads for tri in ((a, b, c), (a, c, d))]
+    with open(file_path, "wb") as file:
+        file.write(b"synthetic benchmark box".ljust(80, b" "))
+        file.write(struct.pack("<I", len(triangles)))
+        for triangle in triangles:
+            file.write(struct.pack("<3f", 0.0, 0.0, 0.0))
+            for vertex_id in triangle:
+                file.write(struct.pack("<3f", *vertices[vertex_id]))
+            file.write(b"\0\0")
+    return None
+
+
+def write_obj(file_path: str, resolution: int) -> None:
+    vertices, quads = get_box_quads(resolution)
+    with open(file_path, "w") as file:
+        file.writelines("v %f %f %f\n" % vertex for vertex in vertices)
+        file.writelines("f %d %d %d %d\n" % tuple(i + 1 for i in quad) for quad in quads)
+    return None
+
+
+def write_dae(file_path: str, resolution: int, color: Tuple[float, float, float, float]) -> None:
+    vertices, quads = get_box_quads(resolution)
+    positions = " ".join("%f %f %f" % vertex for vertex in vertices)
+    indices = " ".join("%d %d %d %d" % quad for quad in quads)
+    with open(file_path, "w") as file:
+        file.write(
+            f"""<?xml version="1.0" encoding="utf-8"?>
+<COLLADA xmlns="http://www.collada.org/2005/11/COLLADASchema" version="1.4.1">
+  <asset><unit name="meter" meter="1"/><up_axis>Y_UP</up_axis></asset>
+  <library_effects>
+    <effect id="box-effect"><profile_COMMON><technique sid="common"><lambert>
+      <diffuse><color sid="diffuse">{" ".join(str(c) for c in color)}</color></diffuse>
+    </lambert></technique></profile_COMMON></effect>
+  </library_effects>
+  <library_materials>
+    <material id="box-material" name="box_material"><instance_effect url="#box-effect"/></material>
+  </library_materials>
+  <library_geometries>
+    <geometry id="box-mesh" name="box">
+      <mesh>
+        <source id="box-positions">
+          <float_array id="box-positions-array" count="{len(vertices) * 3}">{positions}</float_array>
+          <technique_common><accessor source="#box-positions-array" count="{len(vertices)}" stride="3">
+            <param name="X" type="float"/><param name="Y" type="float"/><param name="Z" type="float"/>
+          </accessor></technique_common>
+        </source>
+        <vertices id="box-vertices"><input semantic="POSITION" source="#box-positions"/></vertices>
+        <polylist material="box-material" count="{len(quads)}">
+          <input semantic="VERTEX" source="#box-vertices" offset="0"/>
+          <vcount>{" ".join("4" for _ in quads)}</vcount>
+          <p>{indices}</p>
+        </polylist>
+      </mesh>
+    </geometry>
+  </library_geometries>
+  <library_visual_scenes>
+    <visual_scene id="Scene" name="Scene">
+      <node id="box" name="box" type="NODE">
+        <instance_geometry url="#box-mesh" name="box">
+          <bind_material><technique_common>
+            <instance_material symbol="box-material" target="#box-material"/>
+          </technique_common></bind_material>
+        </instance_geometry>
+      </node>
+    </visual_scene>
+  </library_visual_scenes>
+  <scene><instance_visual_scene url="#Scene"/></scene>
+</COLLADA>
+"""
+        )
+    return None
+
+
+def get_color(i: int) -> Tuple[float, float, float, float]:
+    return ((i * 37 % 100) / 100, (i * 59 % 100) / 100, (i * 83 % 100) / 100, 1.0)
+
+
+def generate_robot(
+    output_dir: str,
+    links: int = 100,
+    branching: int = 2,
+    visuals: int = 1,
+    geometry: str = "mesh",
+    mesh_formats: List[str] = None,
+    unique_meshes: bool = False,
+    materials: int = 4,
+    resolution: int = 4,
+) -> Dict:
+    """Write robot.urdf and its meshes to output_dir, returns the generated counts"""
+    mesh_formats = mesh_formats or ["stl"]
+    mesh_dir = os.path.join(output_dir, "meshes")
+    os.makedirs(mesh_dir, exist_ok=True)
+
+    mesh_files = set()
+
+    def get_mesh_file(visual_id: int) -> str:
+        mesh_format = mesh_formats[visual_id % len(mesh_formats)]
+        mesh_file = "meshes/mesh_%d.%s" % (visual_id if unique_meshes else 0, mesh_format)
+        if mesh_file not in mesh_files:
+            mesh_path = os.path.join(output_dir, mesh_file)
+            if mesh_format == "stl":
+                write_stl(mesh_path, resolution)
+            elif mesh_format == "obj":
+                write_obj(mesh_path, resolution)
+            else:
+                write_dae(mesh_path, resolution, get_color(visual_id))
+            mesh_files.add(mesh_file)
+        return mesh_file
+
+    lines = ['<?xml version="1.0"?>', '<robot name="synthetic_robot">']
+    for material_id in range(materials):
+        lines.append('  <material name="material_%d"><color rgba="%g %g %g %g"/></material>' % ((material_id,) + get_color(material_id)))
+
+    visual_id = 0
+    for link_id in range(links):
+        lines.append('  <link name="link_%d">' % link_id)
+        for i in range(visuals):
+            if geometry == "mesh":
+                geometry_xml = '<mesh filename="%s" scale="0.05 0.05 0.05"/>' % get_mesh_file(visual_id)
+            else:
+                primitive = PRIMITIVES[visual_id % len(PRIMITIVES)]
+                geometry_xml = {
+                    "box": '<box size="0.05 0.05 0.05"/>',
+                    "cylinder": '<cylinder radius="0.025" length="0.05"/>',
+                    "sphere": '<sphere radius="0.025"/>',
+                }[primitive]
+            material_xml = '<material name="material_%d"/>' % (visual_id % materials) if materials > 0 else ""
+            lines.append(
+                '    <visual><origin xyz="0 0 %g" rpy="0 0 %g"/><geometry>%s</geometry>%s</visual>'
+                % (0.01 * i, 0.1 * i, geometry_xml, material_xml)
+            )
+            visual_id += 1
+        lines.append("  </link>")
+
+    for link_id in range(1, links):
+        parent_id = (link_id - 1) // max(branching, 1)
+        lines.append(
+            '  <joint name="joint_%d" type="revolute"><parent link="link_%d"/><child link="link_%d"/>'
+            '<origin xyz="0.1 0 0.05" rpy="0 0 0.3"/><axis xyz="0 0 1"/>'
+            '<limit lower="-3.14" upper="3.14" effort="1" velocity="1"/></joint>' % (link_id, parent_id, link_id)
+        )
+    lines.append("</robot>")
+
+    with open(os.path.join(output_dir, "robot.urdf"), "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+    return {"links": links, "joints": links - 1, "visuals": visual_id, "mesh_files": len(mesh_files), "materials": materials}
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir")
+    parser.add_argument("--links", type=int, default=100)
+    parser.add_argument("--branching", type=int, default=2, help="Children per link, 1 gives a serial chain")
+    parser.add_argument("--visuals", type=int, default=1, help="Visuals per link")
+    parser.add_argument("--geometry", choices=["mesh", "primitive"], default="mesh")
+    parser.add_argument("--mesh-formats", nargs="+", choices=MESH_FORMATS, default=["stl"])
+    parser.add_argument("--unique-meshes", action="store_true", help="One mesh file per visual instead of one shared file")
+    parser.add_argument("--materials", type=int, default=4)
+    parser.add_argument("--resolution", type=int, default=4, help="Quads per box side and axis")
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = vars(get_argument_parser().parse_args(argv))
+    print(generate_robot(args.pop("output_dir"), **args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,16 @@
+#!/usr/bin/python3
+
+"""
+Launcher for urdf_importer_addon.urdf_importer.batch.
+
+Usage: blender --background --python scripts/urdf_batch.py -- [options] URDF [URDF ...]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from urdf_importer_addon.urdf_importer.batch import main  # noqa: E402
+
+sys.exit(main())
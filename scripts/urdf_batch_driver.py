@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+
+"""
+Fan URDF to FBX conversions out over several background Blender processes.
+
+Usage: python3 scripts/urdf_batch_driver.py --workers 8 [batch options] URDF [URDF ...]
+
+Each job runs scripts/urdf_batch.py for one URDF in a fresh Blender. Every
+worker has its own working directory, since the importer stages tmp.dae and
+texture/ relative to it. Jobs whose Blender crashes or times out are retried.
+Options that are not listed here are passed on to urdf_batch.py, give their
+values with "=", e.g. --scale-unit=0.01.
+"""
+
+import argparse
+import glob
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+BATCH_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "urdf_batch.py")
+
+
+def get_urdf_paths(patterns: List[str]) -> List[str]:
+    urdf_paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for urdf_path in matches:
+            urdf_path = os.path.abspath(urdf_path)
+            if urdf_path not in urdf_paths:
+                urdf_paths.append(urdf_path)
+    return urdf_paths
+
+
+def get_output_dirs(urdf_paths: List[str], output_dir: str) -> Dict[str, str]:
+    """
+    Output folder of every URDF job, the folder of the URDF relative to the
+    common folder of all URDFs under output_dir, as urdf_batch.py lays out
+    a whole batch. Robots with the same name in different folders so get
+    different FBX files, also when they are converted at the same time.
+    """
+    if not urdf_paths:
+        return {}
+    root_dir = os.path.commonpath([os.path.dirname(urdf_path) for urdf_path in urdf_paths])
+    return {
+        urdf_path: os.path.normpath(os.path.join(output_dir, os.path.relpath(os.path.dirname(urdf_path), root_dir)))
+        for urdf_path in urdf_paths
+    }
+
+
+class BatchDriver:
+    def __init__(self, blender: str, workers: int, retries: int, timeout: float, output_dir: str, work_dir: str, batch_args: List[str]):
+        self.blender = blender
+        self.workers = workers
+        self.retries = retries
+        self.timeout = timeout
+        self.output_dir = os.path.abspath(output_dir)
+        self.work_dir = work_dir
+        self.batch_args = batch_args
+        self.output_dirs: Dict[str, str] = {}
+        self.jobs: queue.Queue = queue.Queue()
+        self.results: List[Dict] = []
+        self.results_lock = threading.Lock()
+
+    def run_job(self, worker_dir: str, urdf_path: str) -> Dict:
+        job_summary_path = os.path.join(worker_dir, "summary.json")
+        if os.path.exists(job_summary_path):
+            os.remove(job_summary_path)
+        command = [
+            self.blender, "--background", "--factory-startup", "--python", BATCH_SCRIPT_PATH, "--",
+            "--output-dir", self.output_dirs[urdf_path], "--summary", job_summary_path, *self.batch_args, urdf_path,
+        ]
+        start = time.perf_counter()
+        try:
+            process = subprocess.run(command, cwd=worker_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=self.timeout)
+            returncode, output = process.returncode, process.stdout
+        except subprocess.TimeoutExpired as error:
+            returncode, output = None, error.stdout or b""
+        wall_time = time.perf_counter() - start
+
+        if os.path.exists(job_summary_path):
+            with open(job_summary_path) as file:
+                result = json.load(file)["results"][0]
+        else:
+            # Blender crashed or timed out before writing the summary
+            result = {
+                "urdf": urdf_path,
+                "status": "crashed",
+                "returncode": returncode,
+                "log": output.decode("utf-8", "replace")[-4000:],
+            }
+        result["wall_time"] = wall_time
+        return result
+
+    def work(self, worker_id: int) -> None:
+        worker_dir = os.path.join(self.work_dir, "worker_%d" % worker_id)
+        os.makedirs(worker_dir, exist_ok=True)
+        while True:
+            try:
+                urdf_path, attempt = self.jobs.get_nowait()
+            except queue.Empty:
+                return None
+            result = self.run_job(worker_dir, urdf_path)
+            result["worker"] = worker_id
+            result["attempts"] = attempt + 1
+            if result["status"] == "crashed" and attempt < self.retries:
+                print("Worker %d crashed on %s, retrying" % (worker_id, urdf_path))
+                # The working directory may hold half-staged files of the crashed run
+                shutil.rmtree(worker_dir)
+                os.makedirs(worker_dir)
+                self.jobs.put((urdf_path, attempt + 1))
+                continue
+            print("Worker %d: %s %s" % (worker_id, result["status"], urdf_path))
+            with self.results_lock:
+                self.results.append(result)
+
+    def run(self, urdf_paths: List[str]) -> Dict:
+        start = time.perf_counter()
+        self.output_dirs = get_output_dirs(urdf_paths, self.output_dir)
+        for urdf_path in urdf_paths:
+            self.jobs.put((urdf_path, 0))
+        threads = [threading.Thread(target=self.work, args=(worker_id,)) for worker_id in range(min(self.workers, len(urdf_paths)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        results = sorted(self.results, key=lambda result: urdf_paths.index(result["urdf"]))
+        return {
+            "total_time": time.perf_counter() - start,
+            "workers": len(threads),
+            "succeeded": sum(result["status"] == "succeeded" for result in results),
+            "failed": sum(result["status"] != "succeeded" for result in results),
+            "results": results,
+        }
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable, default $BLENDER or blender")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="Number of Blender processes")
+    parser.add_argument("--retries", type=int, default=2, help="Retries of a job whose Blender crashed")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds after which a job counts as crashed")
+    parser.add_argument("-o", "--output-dir", default="fbx")
+    parser.add_argument("--summary", help="Path of the JSON summary, default <output-dir>/summary.json")
+    parser.add_argument("--work-dir", help="Parent of the worker directories, default a temporary directory")
+    parser.add_argument("urdfs", nargs="+", help="URDF files or glob patterns")
+    args, batch_args = parser.parse_known_args(argv)
+
+    urdf_paths = get_urdf_paths(args.urdfs)
+    if not any(batch_arg.startswith("--mesh-workers") for batch_arg in batch_args):
+        # The workers already use every core, so each Blender decodes meshes in its own process
+        batch_args.append("--mesh-workers=1")
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="urdf_batch_")
+    driver = BatchDriver(args.blender, args.workers, args.retries, args.timeout, args.output_dir, work_dir, batch_args)
+    summary = driver.run(urdf_paths)
+    if args.work_dir is None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.json")
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, "w") as file:
+        json.dump(summary, file, indent=2)
+
+    print(
+        "Converted %d of %d robots with %d workers in %.2f s, summary written to %s"
+        % (summary["succeeded"], len(urdf_paths), summary["workers"], summary["total_time"], summary_path)
+    )
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+"""
+Send jobs to a running URDF worker (scripts/urdf_worker.py) and print its answers.
+
+Usage:
+  python3 scripts/urdf_client.py convert robot.urdf robot.fbx [--option scale_unit=0.01 ...]
+  python3 scripts/urdf_client.py ping
+  python3 scripts/urdf_client.py shutdown
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Dict, Iterator, List
+
+DEFAULT_PORT = 8765
+
+
+def connect(host: str, port: int, socket_path: str = None) -> socket.socket:
+    if socket_path is not None:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+    else:
+        client = socket.create_connection((host, port))
+    return client
+
+
+def send_job(client: socket.socket, job: Dict) -> Iterator[Dict]:
+    """Send one job and yield the answers of the worker, up to the final succeeded or failed one"""
+    client.sendall((json.dumps(job) + "\n").encode("utf-8"))
+    with client.makefile("r", encoding="utf-8") as answers:
+        for line in answers:
+            answer = json.loads(line)
+            yield answer
+            if answer["status"] in ("succeeded", "failed"):
+                return
+
+
+def parse_option(option: str):
+    key, value = option.split("=", 1)
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["convert", "import", "export", "ping", "shutdown"])
+    parser.add_argument("paths", nargs="*", help="URDF and/or FBX path of the command")
+    parser.add_argument("--option", action="append", default=[], help="Import option as key=value, the value is read as JSON if possible")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", dest="socket_path")
+    args = parser.parse_args(argv)
+
+    job = {"command": args.command, "options": dict(parse_option(option) for option in args.option)}
+    # The worker has its own working directory
+    if args.command in ("convert", "import"):
+        job["urdf"] = os.path.abspath(args.paths[0])
+    if args.command == "convert":
+        job["fbx"] = os.path.abspath(args.paths[1])
+    elif args.command == "export":
+        job["fbx"] = os.path.abspath(args.paths[0])
+
+    status = "failed"
+    with connect(args.host, args.port, args.socket_path) as client:
+        for answer in send_job(client, job):
+            print(json.dumps(answer))
+            status = answer["status"]
+    return 0 if status == "succeeded" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+
+"""
+Regression test of the direct parenting of link meshes to their bones.
+
+A small generated robot is imported with use_parent_operator=True, which
+parents the meshes with bpy.ops.object.parent_set, and with False, which
+sets parent, parent_bone and matrix_parent_inverse directly. Every object
+must end up with the same parent bone and world matrix. Needs bpy, e.g.
+the bpy module from PyPI, and is skipped without it.
+"""
+
+import os
+import sys
+from typing import Dict, Tuple
+
+import numpy
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_PATH)
+sys.path.insert(0, os.path.join(REPO_PATH, "benchmarks"))
+
+from generate_robot import generate_robot  # noqa: E402
+from urdf_importer_addon.urdf_importer.batch import import_robot, reset_scene  # noqa: E402
+
+TOLERANCE = 1e-4  # In scene units, the robot is imported with scale_unit 0.01
+
+
+def get_object_poses(urdf_path: str, use_parent_operator: bool) -> Dict[str, Tuple[str, numpy.ndarray]]:
+    """Parent bone and world matrix of every object of the imported robot"""
+    reset_scene()
+    import_robot(urdf_path, {"use_parent_operator": use_parent_operator})
+    bpy.context.view_layer.update()
+    return {object.name: (object.parent_bone, numpy.array(object.matrix_world)) for object in bpy.data.objects}
+
+
+@pytest.mark.parametrize("geometry", ["mesh", "primitive"])
+def test_direct_parenting_matches_parent_operator(geometry, tmp_path, monkeypatch):
+    # The importer stages files in the working directory
+    monkeypatch.chdir(tmp_path)
+    generate_robot(str(tmp_path / "robot"), links=7, branching=2, visuals=2, geometry=geometry, resolution=2)
+    urdf_path = str(tmp_path / "robot" / "robot.urdf")
+
+    operator_poses = get_object_poses(urdf_path, True)
+    direct_poses = get_object_poses(urdf_path, False)
+    assert operator_poses.keys() == direct_poses.keys()
+    for object_name, (parent_bone, matrix) in operator_poses.items():
+        assert parent_bone == direct_poses[object_name][0], "Parent bone of %s differs" % object_name
+        assert numpy.allclose(matrix, direct_poses[object_name][1], atol=TOLERANCE), "World matrix of %s differs" % object_name
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+
+"""
+End-to-end test of the worker daemon.
+
+A JobServer listens on a temporary Unix socket, or a free localhost port
+where Unix sockets are not available, and serves on the main thread like
+scripts/urdf_worker.py. A client thread sends ping, convert of a small
+generated robot and shutdown with urdf_client.send_job. The test checks
+the streamed statuses of every job and that the FBX was written. Needs
+bpy, e.g. the bpy module from PyPI, and is skipped without it.
+"""
+
+import os
+import socket
+import sys
+import threading
+import traceback
+from typing import Dict, List
+
+import pytest
+
+pytest.importorskip("bpy")
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_PATH)
+sys.path.insert(0, os.path.join(REPO_PATH, "benchmarks"))
+sys.path.insert(0, os.path.join(REPO_PATH, "scripts"))
+
+from generate_robot import generate_robot  # noqa: E402
+from urdf_client import connect, send_job  # noqa: E402
+from urdf_importer_addon.urdf_importer.server import JobServer  # noqa: E402
+
+CLIENT_TIMEOUT = 300.0  # Seconds a job may take before the client gives up
+
+
+def connect_to(job_server: JobServer) -> socket.socket:
+    if job_server.socket_path is not None:
+        return connect(None, None, job_server.socket_path)
+    return connect(*job_server.address)
+
+
+def run_client(job_server: JobServer, jobs: List[Dict], answers: List[List[Dict]], errors: List[str]) -> None:
+    """Send every job over its own connection and collect the answers"""
+    try:
+        for job in jobs:
+            with connect_to(job_server) as client:
+                client.settimeout(CLIENT_TIMEOUT)
+                answers.append(list(send_job(client, job)))
+    except Exception:
+        errors.append(traceback.format_exc())
+        # Without the shutdown job the server would wait for connections forever
+        job_server.stopped = True
+        try:
+            # Wakes up the server waiting in handle_request, so it sees stopped
+            connect_to(job_server).close()
+        except OSError:
+            pass
+    return None
+
+
+def get_statuses(answers: List[Dict]) -> List[str]:
+    return [answer["status"] for answer in answers]
+
+
+def test_ping_convert_shutdown(tmp_path, monkeypatch):
+    # The server stages files in its working directory
+    monkeypatch.chdir(tmp_path)
+    generate_robot(str(tmp_path / "robot"), links=5, branching=2, visuals=1, resolution=2)
+    urdf_path = str(tmp_path / "robot" / "robot.urdf")
+    fbx_path = str(tmp_path / "fbx" / "robot.fbx")
+
+    if hasattr(socket, "AF_UNIX"):
+        job_server = JobServer(socket_path=str(tmp_path / "worker.sock"))
+    else:
+        job_server = JobServer(port=0)
+    jobs = [
+        {"command": "ping"},
+        {"command": "convert", "urdf": urdf_path, "fbx": fbx_path, "options": {"scale_unit": 0.01}},
+        {"command": "shutdown"},
+    ]
+    answers: List[List[Dict]] = []
+    errors: List[str] = []
+    client_thread = threading.Thread(target=run_client, args=(job_server, jobs, answers, errors))
+    client_thread.start()
+    # Jobs use bpy, so the server runs on the main thread as in the worker daemon
+    job_server.serve()
+    client_thread.join()
+
+    assert not errors, "Client failed:\n" + "".join(errors)
+    assert len(answers) == len(jobs)
+    assert get_statuses(answers[0]) == ["started", "succeeded"]
+    assert get_statuses(answers[1]) == ["started", "imported", "exported", "succeeded"], answers[1][-1]
+    assert get_statuses(answers[2]) == ["started", "succeeded"]
+    assert answers[1][-1]["export"]["fbx_exported"]
+    assert answers[1][-1]["counts"]["bones"] > 0
+    assert os.path.isfile(fbx_path)
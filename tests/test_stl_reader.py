@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+"""Tests of the NumPy-only STL reader, they run without Blender"""
+
+import importlib.util
+import os
+import struct
+import time
+
+import numpy
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STL_READER_PATH = os.path.join(REPO_PATH, "urdf_importer_addon", "urdf_importer", "stl_reader.py")
+
+# Loaded by path, the add-on package itself imports bpy
+spec = importlib.util.spec_from_file_location("stl_reader", STL_READER_PATH)
+stl_reader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(stl_reader)
+
+CHAIN_VERTEX_COUNT = 40000
+CHAIN_TIME_BUDGET = 5.0  # Seconds, a merge that settles one vertex per round takes minutes
+
+
+def get_brute_force_groups(positions: numpy.ndarray, distance: float) -> numpy.ndarray:
+    """First vertex of the group of every vertex, with groups linked by vertices at most distance apart"""
+    differences = positions[:, None].astype(numpy.float64) - positions[None]
+    is_close = numpy.linalg.norm(differences, axis=2) <= distance
+    groups = numpy.arange(len(positions))
+    for i in range(len(positions)):
+        for j in numpy.flatnonzero(is_close[i]):
+            old_group, new_group = max(groups[i], groups[j]), min(groups[i], groups[j])
+            groups[groups == old_group] = new_group
+    return groups
+
+
+def test_close_pairs_match_brute_force():
+    rng = numpy.random.default_rng(0)
+    distance = 0.01
+    for _ in range(50):
+        positions = (rng.random((rng.integers(2, 150), 3)) * rng.choice([0.01, 0.05, 0.2]) - 0.02).astype(numpy.float32)
+        firsts, seconds = stl_reader.get_close_pairs(positions, distance)
+        differences = positions[:, None].astype(numpy.float64) - positions[None]
+        is_close = numpy.linalg.norm(differences, axis=2) <= distance
+        expected = {(i, j) for i, j in zip(*numpy.nonzero(is_close)) if i < j}
+        assert set(zip(firsts.tolist(), seconds.tolist())) == expected
+        assert len(firsts) == len(expected)
+        assert numpy.array_equal(stl_reader.merge_close_vertices(positions, distance), get_brute_force_groups(positions, distance))
+
+
+def test_merge_vertices_removes_exact_duplicates():
+    positions = numpy.repeat(numpy.random.default_rng(1).random((50, 3)).astype(numpy.float32), 3, axis=0)
+    merged, inverse = stl_reader.merge_vertices(positions)
+    assert len(merged) == 50
+    assert numpy.array_equal(merged[inverse], positions)
+
+
+def test_merge_vertices_merges_across_cell_borders():
+    # Both vertices are 0.0002 apart, but on either side of a cell border of the distance 0.001
+    positions = numpy.array([[0.0009, 0.0, 0.0], [0.0011, 0.0, 0.0], [0.5, 0.0, 0.0]], dtype=numpy.float32)
+    merged, inverse = stl_reader.merge_vertices(positions, 0.001)
+    assert len(merged) == 2
+    assert inverse.tolist() == [0, 0, 1]
+
+
+def test_merge_vertices_chain_in_time_budget():
+    # A chain of vertices half the distance apart, every vertex only links to its neighbours
+    positions = numpy.zeros((CHAIN_VERTEX_COUNT, 3), dtype=numpy.float32)
+    positions[:, 0] = numpy.arange(CHAIN_VERTEX_COUNT) * 0.0005
+    start = time.perf_counter()
+    merged, inverse = stl_reader.merge_vertices(positions, 0.001)
+    elapsed = time.perf_counter() - start
+    assert len(merged) == 1
+    assert numpy.all(inverse == 0)
+    assert elapsed < CHAIN_TIME_BUDGET, "Merging a chain of %d vertices took %.1f s" % (CHAIN_VERTEX_COUNT, elapsed)
+
+
+def test_read_stl_welds_binary_file(tmp_path):
+    # The last corner is 0.0005 away from the third corner of the first triangle
+    triangles = numpy.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]], [[1, 0, 0], [1, 1, 0], [0, 1.0005, 0]]], dtype="<f4")
+    file_path = str(tmp_path / "mesh.stl")
+    with open(file_path, "wb") as file:
+        file.write(b"\0" * 80 + struct.pack("<I", len(triangles)))
+        for triangle in triangles:
+            file.write(numpy.zeros(3, dtype="<f4").tobytes() + triangle.tobytes() + b"\0\0")
+
+    exact = stl_reader.read_stl(file_path)
+    assert len(exact["vertices"]) // 3 == 5
+    welded = stl_reader.read_stl(file_path, 1.0, 0.001)
+    assert len(welded["vertices"]) // 3 == 4
+    assert int(welded["welded_vertices"]) == 1
+    assert welded["loop_totals"].tolist() == [3, 3]
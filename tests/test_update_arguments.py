@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+
+"""
+Check of the arguments stored for updates of an import.
+
+Every RobotBuilder argument is either reused by updates, UPDATE_ARGUMENTS,
+or only applies to one import, IMPORT_ARGUMENTS, so a new import option
+can not be dropped by load_full_meshes silently. A builder created from
+the stored arguments must compare equal to the stored import options.
+Needs bpy, e.g. the bpy module from PyPI, and is skipped without it.
+"""
+
+import inspect
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("bpy")
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_PATH)
+sys.path.insert(0, os.path.join(REPO_PATH, "benchmarks"))
+
+from generate_robot import generate_robot  # noqa: E402
+from urdf_importer_addon.urdf_importer.robot_builder import IMPORT_ARGUMENTS, UPDATE_ARGUMENTS, RobotBuilder  # noqa: E402
+
+
+def test_every_argument_is_classified():
+    parameters = set(inspect.signature(RobotBuilder).parameters)
+    assert not set(UPDATE_ARGUMENTS) & set(IMPORT_ARGUMENTS)
+    assert set(UPDATE_ARGUMENTS) | set(IMPORT_ARGUMENTS) == parameters
+
+
+def test_update_arguments_keep_import_options(tmp_path):
+    generate_robot(str(tmp_path / "robot"), links=3, branching=1, visuals=1, resolution=2)
+    urdf_path = str(tmp_path / "robot" / "robot.urdf")
+    options = {"weld_backend": "NUMPY", "weld_distance": 0.001, "use_native_stl": False, "mesh_workers": 2}
+    robot_builder = RobotBuilder(urdf_path, "OP1", True, True, True, False, 0.01, False, run=False, **options)
+    arguments = robot_builder.get_update_arguments()
+    assert list(arguments) == list(UPDATE_ARGUMENTS)
+    assert arguments["weld_backend"] == "NUMPY" and arguments["mesh_workers"] == 2
+    update_builder = RobotBuilder(urdf_path, update=True, run=False, **arguments)
+    assert update_builder.get_import_options() == robot_builder.get_import_options()
+    assert update_builder.get_update_arguments() == arguments
@@ -13,6 +13,9 @@ bl_info = {
 import bpy
 
 from .urdf_importer import URDFImporter
+from .urdf_importer import ClearMeshCache
+from .urdf_importer import StopURDFWatch
+from .urdf_importer import LoadFullMeshes
 from .urdf_importer import FBXExporter
 # fmt: on
 
@@ -31,6 +34,9 @@ def register():
     bpy.types.TOPBAR_MT_file_import.append(import_menu_func)
     bpy.utils.register_class(FBXExporter)
     bpy.types.TOPBAR_MT_file_export.append(export_menu_func)
+    bpy.utils.register_class(ClearMeshCache)
+    bpy.utils.register_class(StopURDFWatch)
+    bpy.utils.register_class(LoadFullMeshes)
 
 
 def unregister():
@@ -38,6 +44,11 @@ def unregister():
     bpy.types.TOPBAR_MT_file_import.remove(import_menu_func)
     bpy.utils.unregister_class(FBXExporter)
     bpy.types.TOPBAR_MT_file_export.remove(export_menu_func)
+    bpy.utils.unregister_class(ClearMeshCache)
+    bpy.utils.unregister_class(StopURDFWatch)
+    bpy.utils.unregister_class(LoadFullMeshes)
+    from .urdf_importer.watcher import stop_watch
+    stop_watch()
     from os.path import exists
     from shutil import rmtree
 
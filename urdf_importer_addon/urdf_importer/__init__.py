@@ -1,3 +1,3 @@
-from .urdf_importer import URDFImporter
+from .urdf_importer import URDFImporter, ClearMeshCache, LoadFullMeshes, StopURDFWatch
 from .fbx_exporter import FBXExporter
 from .robot_builder import TMP_FOLDER_PATH
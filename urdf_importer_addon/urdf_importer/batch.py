@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+
+"""
+Convert URDF files to FBX without the Blender UI.
+
+Usage: blender --background --python scripts/urdf_batch.py -- [options] URDF [URDF ...]
+
+Every URDF (or glob pattern) is imported with RobotBuilder, its materials
+are merged and it is exported with export_fbx. A failing file is recorded
+in the summary and the batch moves on to the next one.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from shutil import rmtree
+from typing import Dict, List
+
+import bpy
+
+from .fbx_exporter import export_fbx
+from .mesh_cache import MESH_CACHE_SIZE
+from .robot_builder import TMP_FOLDER_PATH, RobotBuilder, clean_up
+from .textures import ATLAS_MAX_TEXTURE, ATLAS_SIZE, TEXTURE_FORMATS, TEXTURE_QUALITY, TextureProcessor
+from .weld import WELD_BACKENDS, WELD_DISTANCE
+
+IMPORT_OPTIONS = {
+    "merge_duplicate_materials": "OP1",
+    "rename_materials": True,
+    "apply_weld": True,
+    "unique_name": True,
+    "scale_unit": 0.01,
+    "ignore_root": False,
+}
+
+# Command line arguments of the TextureProcessor of the export, by its argument name
+TEXTURE_ARGUMENTS = {
+    "texture_max_size": "max_size",
+    "texture_format": "format",
+    "texture_quality": "quality",
+    "texture_atlas": "atlas",
+    "atlas_size": "atlas_size",
+    "atlas_max_texture": "atlas_max_texture",
+    "texture_workers": "workers",
+}
+
+
+def import_robot(urdf_path: str, options: Dict) -> RobotBuilder:
+    """
+    Import a URDF with the options of IMPORT_OPTIONS, any other option is
+    passed to RobotBuilder as keyword argument.
+    """
+    options = {**IMPORT_OPTIONS, **options}
+    merge_duplicate_materials = options.pop("merge_duplicate_materials")
+    return RobotBuilder(
+        urdf_path,
+        merge_duplicate_materials in ("OP1", "OP2"),
+        merge_duplicate_materials == "OP1",
+        options.pop("rename_materials"),
+        options.pop("apply_weld"),
+        options.pop("unique_name"),
+        options.pop("scale_unit"),
+        options.pop("ignore_root"),
+        **options,
+    )
+
+
+def reset_scene() -> None:
+    """Leave edit/pose mode and drop staged files, so a failed import does not leak into the next one"""
+    if bpy.context.object is not None and bpy.context.object.mode != "OBJECT":
+        bpy.ops.object.mode_set(mode="OBJECT")
+    clean_up()
+    if os.path.exists(TMP_FOLDER_PATH):
+        rmtree(TMP_FOLDER_PATH)
+    return None
+
+
+def get_scene_counts() -> Dict[str, int]:
+    return {
+        "objects": len(bpy.data.objects),
+        "meshes": len(bpy.data.meshes),
+        "materials": len(bpy.data.materials),
+        "images": len(bpy.data.images),
+        "bones": sum(len(armature.bones) for armature in bpy.data.armatures),
+        "vertices": sum(len(mesh.vertices) for mesh in bpy.data.meshes),
+        "polygons": sum(len(mesh.polygons) for mesh in bpy.data.meshes),
+    }
+
+
+def convert(urdf_path: str, fbx_path: str, options: Dict, force_export: bool = False, texture_options: Dict = None) -> Dict:
+    """Import urdf_path and export it to fbx_path, returns the result entry of the summary"""
+    result = {"urdf": urdf_path, "fbx": fbx_path, "status": "failed"}
+    try:
+        reset_scene()
+        start = time.perf_counter()
+        robot_builder = import_robot(urdf_path, options)
+        result["import_time"] = time.perf_counter() - start
+        if robot_builder.profiler.enabled:
+            result["profile"] = robot_builder.profiler.to_dict()
+        if robot_builder.lod_triangles:
+            result["lod_triangles"] = robot_builder.lod_triangles
+
+        os.makedirs(os.path.dirname(os.path.abspath(fbx_path)), exist_ok=True)
+        start = time.perf_counter()
+        result["export"] = export_fbx(fbx_path, force_export, TextureProcessor(**(texture_options or {})))
+        result["export_time"] = time.perf_counter() - start
+
+        result["counts"] = get_scene_counts()
+        result["status"] = "succeeded"
+    except Exception as error:
+        result["error"] = repr(error)
+        result["traceback"] = traceback.format_exc()
+        print("Failed to convert", urdf_path)
+        print(result["traceback"])
+    return result
+
+
+def get_urdf_paths(patterns: List[str]) -> List[str]:
+    urdf_paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for urdf_path in matches:
+            if urdf_path not in urdf_paths:
+                urdf_paths.append(urdf_path)
+    return urdf_paths
+
+
+def get_fbx_paths(urdf_paths: List[str], output_dir: str) -> Dict[str, str]:
+    """
+    FBX path of every URDF, <output_dir>/<folder>/<name>/<name>.fbx, where
+    folder is the folder of the URDF relative to the common folder of all
+    URDFs, so e.g. robots/a/robot.urdf and robots/b/robot.urdf do not collide.
+    """
+    if not urdf_paths:
+        return {}
+    root_dir = os.path.commonpath([os.path.dirname(os.path.abspath(urdf_path)) for urdf_path in urdf_paths])
+    fbx_paths: Dict[str, str] = {}
+    for urdf_path in urdf_paths:
+        # One folder per robot, the textures are exported next to the FBX
+        robot_name = os.path.splitext(os.path.basename(urdf_path))[0]
+        rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(urdf_path)), root_dir)
+        fbx_paths[urdf_path] = os.path.normpath(os.path.join(output_dir, rel_dir, robot_name, robot_name + ".fbx"))
+
+    fbx_urdfs: Dict[str, str] = {}
+    for urdf_path, fbx_path in fbx_paths.items():
+        if fbx_path in fbx_urdfs and os.path.abspath(fbx_urdfs[fbx_path]) != os.path.abspath(urdf_path):
+            raise ValueError("URDF files " + fbx_urdfs[fbx_path] + " and " + urdf_path + " would both be written to " + fbx_path)
+        fbx_urdfs[fbx_path] = urdf_path
+    return fbx_paths
+
+
+def run_batch(urdf_paths: List[str], output_dir: str, options: Dict, force_export: bool = False, texture_options: Dict = None) -> Dict:
+    start = time.perf_counter()
+    results = []
+    fbx_paths = get_fbx_paths(urdf_paths, output_dir)
+    for urdf_path in urdf_paths:
+        print("Converting", urdf_path)
+        results.append(convert(urdf_path, fbx_paths[urdf_path], options, force_export, texture_options))
+    reset_scene()
+
+    return {
+        "total_time": time.perf_counter() - start,
+        "succeeded": sum(result["status"] == "succeeded" for result in results),
+        "failed": sum(result["status"] != "succeeded" for result in results),
+        "options": options,
+        "texture_options": texture_options,
+        "results": results,
+    }
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="urdf_batch", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urdfs", nargs="+", help="URDF files or glob patterns, e.g. 'robots/**/*.urdf'")
+    parser.add_argument("-o", "--output-dir", default="fbx", help="Each robot is exported to <output-dir>/<name>/<name>.fbx")
+    parser.add_argument("--summary", help="Path of the JSON summary, default <output-dir>/summary.json")
+    parser.add_argument("--force-export", action="store_true", help="Export FBX files and textures even if their manifest shows no change")
+    parser.add_argument("--texture-max-size", type=int, default=0, help="Downscale textures to this width and height, 0 keeps the size")
+    parser.add_argument("--texture-format", choices=[texture_format[0] for texture_format in TEXTURE_FORMATS], default="KEEP")
+    parser.add_argument("--texture-quality", type=int, default=TEXTURE_QUALITY, help="JPEG quality")
+    parser.add_argument("--texture-atlas", action="store_true", help="Pack small textures into atlases and remap their UVs")
+    parser.add_argument("--atlas-size", type=int, default=ATLAS_SIZE)
+    parser.add_argument("--atlas-max-texture", type=int, default=ATLAS_MAX_TEXTURE, help="Largest texture packed into an atlas")
+    parser.add_argument("--texture-workers", type=int, default=0, help="Texture processing threads, 0 for one per CPU")
+    parser.add_argument(
+        "--merge-duplicate-materials", choices=["OP1", "OP2", "NONE"], default="OP1", help="OP1: with name check, OP2: without name check"
+    )
+    parser.add_argument("--no-rename-materials", dest="rename_materials", action="store_false")
+    parser.add_argument("--no-weld", dest="apply_weld", action="store_false")
+    parser.add_argument("--weld-backend", choices=[backend[0] for backend in WELD_BACKENDS], default="BMESH")
+    parser.add_argument("--weld-distance", type=float, default=WELD_DISTANCE)
+    parser.add_argument("--no-unique-name", dest="unique_name", action="store_false")
+    parser.add_argument("--scale-unit", type=float, default=0.01)
+    parser.add_argument("--ignore-root", action="store_true")
+    parser.add_argument("--use-parent-operator", action="store_true")
+    parser.add_argument("--use-transform-operators", action="store_true", help="Bake mesh transforms with origin_set and transform_apply")
+    parser.add_argument("--mesh-cache", dest="use_mesh_cache", action="store_true")
+    parser.add_argument("--mesh-cache-size", type=float, default=MESH_CACHE_SIZE, help="in MB")
+    parser.add_argument("--mesh-cache-path", help="Mesh cache folder, default $URDF_MESH_CACHE or Blender's user data folder")
+    parser.add_argument("--no-native-stl", dest="use_native_stl", action="store_false")
+    parser.add_argument("--mesh-workers", type=int, default=0, help="0 for one per CPU")
+    parser.add_argument("--lod-ratios", type=float, nargs="+", help="Triangle ratio of LOD1, LOD2, ... to the link mesh")
+    parser.add_argument("--lod-errors", type=float, nargs="+", help="Error of LOD1, LOD2, ... in meters, used instead of --lod-ratios")
+    parser.add_argument("--profile", action="store_true", help="Record per phase and per link timings in the summary")
+    parser.add_argument("--cprofile", dest="use_cprofile", action="store_true", help="Also write cProfile stats next to the profile JSON")
+    return parser
+
+
+def get_options(args: argparse.Namespace) -> Dict:
+    options = dict(vars(args))
+    for key in ("urdfs", "output_dir", "summary", "force_export", *TEXTURE_ARGUMENTS):
+        options.pop(key)
+    if options["merge_duplicate_materials"] == "NONE":
+        options["merge_duplicate_materials"] = ""
+    return options
+
+
+def get_texture_options(args: argparse.Namespace) -> Dict:
+    return {option: getattr(args, argument) for argument, option in TEXTURE_ARGUMENTS.items()}
+
+
+def main(argv: List[str] = None) -> int:
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    args = get_argument_parser().parse_args(argv)
+
+    summary = run_batch(get_urdf_paths(args.urdfs), args.output_dir, get_options(args), args.force_export, get_texture_options(args))
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.json")
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, "w") as file:
+        json.dump(summary, file, indent=2)
+
+    print(
+        "Converted %d of %d robots in %.2f s, summary written to %s"
+        % (summary["succeeded"], len(summary["results"]), summary["total_time"], summary_path)
+    )
+    return 0 if summary["failed"] == 0 else 1
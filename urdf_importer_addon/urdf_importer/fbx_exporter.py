@@ -2,17 +2,147 @@
 
 from bpy_extras.io_utils import ExportHelper
 import bpy
+import numpy
 
+from .lod import lod_names
+from .mesh_io import get_material_info, mesh_to_arrays
+from .profiling import ADDON_VERSION
 from .robot_builder import TMP_TEXTURE_PATH
-from shutil import copytree
+from .textures import ATLAS_MAX_TEXTURE, ATLAS_SIZE, TEXTURE_FORMATS, TEXTURE_QUALITY, TextureProcessor
+from .utils import file_digest
+from shutil import copy2
+from typing import Dict
 
+import hashlib
+import json
+import os
 from os import path
 
+FBX_EXPORT_OPTIONS = {"object_types": {"ARMATURE", "MESH"}, "mesh_smooth_type": "FACE", "add_leaf_bones": False}
+MANIFEST_SUFFIX = ".manifest.json"  # Written next to the FBX, see export_fbx
+MANIFEST_VERSION = 1
 
-def write_data(filepath):
-    bpy.ops.export_scene.fbx(filepath=filepath, object_types={"ARMATURE", "MESH"}, mesh_smooth_type="FACE", add_leaf_bones=False)
-    if path.exists(TMP_TEXTURE_PATH):
-        copytree(TMP_TEXTURE_PATH, path.dirname(filepath) + "/" + TMP_TEXTURE_PATH, dirs_exist_ok=True)
+
+def get_scene_digest() -> str:
+    """
+    Hash of what the FBX export writes: names, parents and transforms of the
+    mesh and armature objects, mesh data, materials, bones and modifiers.
+    """
+    sha = hashlib.sha1()
+    objects = [object for object in bpy.context.scene.objects if object.type in FBX_EXPORT_OPTIONS["object_types"]]
+    for object in sorted(objects, key=lambda object: object.name):
+        header = {
+            "name": object.name,
+            "type": object.type,
+            "parent": object.parent.name if object.parent is not None else None,
+            "parent_type": object.parent_type,
+            "parent_bone": object.parent_bone,
+            "modifiers": [(modifier.name, modifier.type) for modifier in object.modifiers],
+        }
+        sha.update(json.dumps(header).encode("utf-8"))
+        sha.update(numpy.array(object.matrix_world, dtype=numpy.float64).tobytes())
+        if object.type == "MESH":
+            arrays = mesh_to_arrays(object.data)
+            for key in sorted(arrays):
+                sha.update(arrays[key].tobytes())
+            materials = [get_material_info(material) for material in object.data.materials if material is not None]
+            for material in materials:
+                # Staged textures are hashed by content, their absolute path depends on the working directory
+                material["image"] = path.basename(material["image"])
+            sha.update(json.dumps(materials).encode("utf-8"))
+        else:
+            for bone in object.data.bones:
+                sha.update(json.dumps([bone.name, bone.parent.name if bone.parent is not None else None]).encode("utf-8"))
+                sha.update(numpy.array(bone.matrix_local, dtype=numpy.float64).tobytes())
+                sha.update(numpy.array(bone.tail_local, dtype=numpy.float64).tobytes())
+    return sha.hexdigest()
+
+
+def get_digest(data: Dict) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_options_digest(texture_options: Dict) -> str:
+    options = {key: sorted(value) if isinstance(value, set) else value for key, value in FBX_EXPORT_OPTIONS.items()}
+    options["blender"] = bpy.app.version_string
+    options["addon"] = ADDON_VERSION
+    options["textures"] = texture_options
+    return get_digest(options)
+
+
+def read_manifest(manifest_path: str) -> Dict:
+    try:
+        with open(manifest_path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(manifest_path: str, manifest: Dict) -> None:
+    # Written to a temporary file first, so an interrupted export leaves no manifest that matches
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return None
+
+
+def export_fbx(filepath: str, force: bool = False, texture_processor: TextureProcessor = None) -> Dict:
+    """
+    Export the scene to filepath and copy the staged textures, processed by
+    texture_processor, next to it. The manifest written next to the FBX
+    holds the hashes of the scene, the export options, the outputs and
+    atlas rectangles the staged textures map to and every texture, so a
+    repeated export skips the FBX if nothing changed and copies only new or
+    changed textures. Returns what was written.
+    """
+    if texture_processor is None:
+        texture_processor = TextureProcessor()
+    manifest_path = filepath + MANIFEST_SUFFIX
+    manifest = read_manifest(manifest_path)
+    # Processed first, the texture paths and atlas UVs written into the FBX depend on the outputs
+    outputs = texture_processor.process()
+    new_manifest = {
+        "version": MANIFEST_VERSION,
+        "scene": get_scene_digest(),
+        "options": get_options_digest(texture_processor.get_options()),
+        "texture_mapping": get_digest(texture_processor.get_mapping()),
+        "textures": {},
+    }
+    result = {"fbx_exported": False, "textures_copied": 0, "textures_skipped": 0}
+    is_changed = force or not path.exists(filepath) or any(
+        manifest.get(key) != new_manifest[key] for key in ("version", "scene", "options", "texture_mapping")
+    )
+    if is_changed and path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # Textures go first, atlases are loaded from the export folder while the FBX is written
+    texture_dir = path.dirname(filepath) + "/" + TMP_TEXTURE_PATH
+    copied_textures = manifest.get("textures", {})
+    for output_name, src_path in outputs.items():
+        digest = file_digest(src_path)
+        new_manifest["textures"][output_name] = digest
+        dst_path = path.join(texture_dir, output_name)
+        if not force and copied_textures.get(output_name) == digest and path.exists(dst_path):
+            result["textures_skipped"] += 1
+            continue
+        os.makedirs(path.dirname(dst_path), exist_ok=True)
+        copy2(src_path, dst_path)
+        result["textures_copied"] += 1
+
+    if is_changed:
+        with lod_names(), texture_processor.applied(texture_dir):
+            bpy.ops.export_scene.fbx(filepath=filepath, **FBX_EXPORT_OPTIONS)
+        result["fbx_exported"] = True
+    else:
+        print("FBX", filepath, "is unchanged, export skipped")
+
+    write_manifest(manifest_path, new_manifest)
+    return result
+
+
+def write_data(filepath, force=False, texture_options=None):
+    export_fbx(filepath, force, TextureProcessor(**(texture_options or {})))
     return {"FINISHED"}
 
 
@@ -25,5 +155,23 @@ class FBXExporter(bpy.types.Operator, ExportHelper):
     # ExportHelper mixin class uses this
     filename_ext = ".fbx"
 
+    force: bpy.props.BoolProperty(name="Export even if the robot and its textures did not change", default=False)
+    texture_max_size: bpy.props.IntProperty(name="Maximum texture width and height (0 keeps the size)", default=0, min=0)
+    texture_format: bpy.props.EnumProperty(name="Texture format", items=TEXTURE_FORMATS, default="KEEP")
+    texture_quality: bpy.props.IntProperty(name="JPEG quality", default=TEXTURE_QUALITY, min=1, max=100)
+    texture_atlas: bpy.props.BoolProperty(name="Pack small textures into atlases", default=False)
+    atlas_size: bpy.props.IntProperty(name="Atlas size", default=ATLAS_SIZE, min=64)
+    atlas_max_texture: bpy.props.IntProperty(name="Largest texture packed into an atlas", default=ATLAS_MAX_TEXTURE, min=1)
+
+    def get_texture_options(self) -> dict:
+        return {
+            "max_size": self.texture_max_size,
+            "format": self.texture_format,
+            "quality": self.texture_quality,
+            "atlas": self.texture_atlas,
+            "atlas_size": self.atlas_size,
+            "atlas_max_texture": self.atlas_max_texture,
+        }
+
     def execute(self, _):
-        return write_data(self.filepath)
+        return write_data(self.filepath, self.force, self.get_texture_options())
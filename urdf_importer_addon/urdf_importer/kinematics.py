@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+
+from typing import Dict, List, Tuple
+
+import numpy
+
+IDENTITY = numpy.identity(4)
+ORTHONORMAL_TOLERANCE = 1e-6
+
+
+def euler_to_matrices(rpy: numpy.ndarray) -> numpy.ndarray:
+    """(n, 3) XYZ euler angles to (n, 3, 3) rotation matrices, same as mathutils.Euler(rpy).to_matrix()"""
+    cos_x, cos_y, cos_z = numpy.cos(rpy).T
+    sin_x, sin_y, sin_z = numpy.sin(rpy).T
+    matrices = numpy.empty((len(rpy), 3, 3))
+    matrices[:, 0, 0] = cos_y * cos_z
+    matrices[:, 0, 1] = sin_x * sin_y * cos_z - cos_x * sin_z
+    matrices[:, 0, 2] = cos_x * sin_y * cos_z + sin_x * sin_z
+    matrices[:, 1, 0] = cos_y * sin_z
+    matrices[:, 1, 1] = sin_x * sin_y * sin_z + cos_x * cos_z
+    matrices[:, 1, 2] = cos_x * sin_y * sin_z - sin_x * cos_z
+    matrices[:, 2, 0] = -sin_y
+    matrices[:, 2, 1] = sin_x * cos_y
+    matrices[:, 2, 2] = cos_x * cos_y
+    return matrices
+
+
+def get_origins(tags: List, scale_unit: float) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Translations (n, 3) in scene units and rotations (n, 3, 3) of the origins of links, joints or visuals"""
+    xyz = numpy.zeros((len(tags), 3))
+    rpy = numpy.zeros((len(tags), 3))
+    for i, tag in enumerate(tags):
+        origin = getattr(tag, "origin", None)
+        if origin is not None:
+            xyz[i] = origin.xyz or (0.0, 0.0, 0.0)
+            rpy[i] = origin.rpy or (0.0, 0.0, 0.0)
+    return xyz / scale_unit, euler_to_matrices(rpy)
+
+
+def get_origin_matrices(tags: List, scale_unit: float) -> numpy.ndarray:
+    translations, rotations = get_origins(tags, scale_unit)
+    matrices = numpy.tile(IDENTITY, (len(tags), 1, 1))
+    matrices[:, :3, :3] = rotations
+    matrices[:, :3, 3] = translations
+    return matrices
+
+
+def apply_link_origins(matrices: numpy.ndarray, links: List, scale_unit: float) -> numpy.ndarray:
+    """
+    The pose a link passes on to its children: the link origin is added
+    again, with its translation in the parent frame and its rotation
+    applied before the link rotation. Kept as it was, so existing robots
+    import unchanged.
+    """
+    translations, rotations = get_origins(links, scale_unit)
+    matrices = matrices.copy()
+    matrices[:, :3, 3] += translations
+    matrices[:, :3, :3] = rotations @ matrices[:, :3, :3]
+    return matrices
+
+
+class RobotKinematics:
+    """
+    World transforms of all links, joints and visuals of a robot in its
+    rest pose, as 4x4 matrices in scene units. The tree is walked once in
+    breadth first order and each depth is computed in one batch, no bpy
+    is needed.
+
+    - link_matrices: pose of the link frame, the bone of a link without visuals starts here
+    - joint_matrices: pose of the joint frame, keyed by joint name
+    - visual_matrices: pose of every visual of a link
+    """
+
+    def __init__(self, robot, root_name: str, scale_unit: float):
+        self.root_name = root_name
+        self.scale_unit = scale_unit
+        self.order: List[str] = [root_name]
+        self.parent_joints: Dict[str, str] = {}
+        self.link_matrices: Dict[str, numpy.ndarray] = {}
+        self.joint_matrices: Dict[str, numpy.ndarray] = {}
+        self.visual_matrices: Dict[str, List[numpy.ndarray]] = {}
+        self.compute(robot)
+
+    def compute(self, robot) -> None:
+        root_link = robot.link_map[self.root_name]
+        root_matrix = apply_link_origins(IDENTITY[None], [root_link], self.scale_unit)
+        self.link_matrices[self.root_name] = root_matrix[0]
+        # The root link origin is applied once for its visuals and twice for its children
+        parent_matrices = {self.root_name: apply_link_origins(root_matrix, [root_link], self.scale_unit)[0]}
+
+        level = [self.root_name]
+        while level:
+            children = [
+                (parent_name, joint_name, child_name)
+                for parent_name in level
+                for joint_name, child_name in robot.child_map.get(parent_name, [])
+            ]
+            level = []
+            if not children:
+                break
+            parent_names, joint_names, child_names = zip(*children)
+            joints = [robot.joint_map[joint_name] for joint_name in joint_names]
+            links = [robot.link_map[child_name] for child_name in child_names]
+
+            parents = numpy.stack([parent_matrices[parent_name] for parent_name in parent_names])
+            joint_matrices = parents @ get_origin_matrices(joints, self.scale_unit)
+            link_matrices = joint_matrices @ get_origin_matrices(links, self.scale_unit)
+            child_matrices = apply_link_origins(link_matrices, links, self.scale_unit)
+
+            for i, (joint_name, child_name) in enumerate(zip(joint_names, child_names)):
+                if child_name in self.link_matrices:
+                    raise ValueError("Link %s is reached twice, the joints do not form a tree" % child_name)
+                self.order.append(child_name)
+                self.parent_joints[child_name] = joint_name
+                self.joint_matrices[joint_name] = joint_matrices[i]
+                self.link_matrices[child_name] = link_matrices[i]
+                parent_matrices[child_name] = child_matrices[i]
+                level.append(child_name)
+
+        self.compute_visuals(robot)
+        return None
+
+    def compute_visuals(self, robot) -> None:
+        link_names = [link_name for link_name in self.order for _ in robot.link_map[link_name].visuals]
+        if not link_names:
+            return None
+        visuals = [visual for link_name in self.order for visual in robot.link_map[link_name].visuals]
+        links = numpy.stack([self.link_matrices[link_name] for link_name in link_names])
+        visual_matrices = links @ get_origin_matrices(visuals, self.scale_unit)
+
+        # The root visuals get the root pose added once more, as the scene stage always did
+        root = self.link_matrices[self.root_name]
+        is_root = numpy.array([link_name == self.root_name for link_name in link_names])
+        visual_matrices[is_root, :3, 3] += root[:3, :3] @ root[:3, 3]
+        visual_matrices[is_root, :3, :3] = visual_matrices[is_root, :3, :3] @ root[:3, :3]
+
+        for link_name, visual_matrix in zip(link_names, visual_matrices):
+            self.visual_matrices.setdefault(link_name, []).append(visual_matrix)
+        return None
+
+    def validate(self, robot) -> List[str]:
+        """Problems of the computed poses, an empty list if all links are reached with finite rigid transforms"""
+        problems = []
+        missing = [link.name for link in robot.links if link.name not in self.link_matrices]
+        if missing:
+            problems.append("Links not connected to %s: %s" % (self.root_name, ", ".join(missing)))
+
+        names = list(self.link_matrices) + list(self.joint_matrices)
+        matrices = numpy.stack(list(self.link_matrices.values()) + list(self.joint_matrices.values()))
+        rotations = matrices[:, :3, :3]
+        is_finite = numpy.isfinite(matrices).all(axis=(1, 2))
+        errors = numpy.abs(rotations @ rotations.transpose(0, 2, 1) - numpy.identity(3)).max(axis=(1, 2))
+        is_rigid = (errors < ORTHONORMAL_TOLERANCE) & (numpy.linalg.det(rotations) > 0)
+        for i in numpy.flatnonzero(~(is_finite & is_rigid)):
+            problems.append("Pose of %s is not a finite rigid transform" % names[i])
+        return problems
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+import bpy
+import numpy
+from bpy.types import Mesh, Object
+
+from .mesh_io import fill_mesh, mesh_to_arrays
+from .weld import weld_arrays
+
+LOD_SUFFIX = "_LOD"  # <name>_LOD<level>, as the FBX importers of Unreal and Unity expect
+LOD_METADATA = "urdf_lod_of"  # Name of the link object a LOD object was generated from
+
+
+def get_triangle_count(mesh: Mesh) -> int:
+    loop_totals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    return int((loop_totals - 2).sum())
+
+
+def decimate_meshes(objects: List[Object], ratio: float) -> List[Mesh]:
+    """
+    Meshes of objects with ratio of their triangles, from Decimate modifiers
+    that are added to all objects and evaluated in one depsgraph update
+    instead of one modifier_apply per object.
+    """
+    modifiers = []
+    for object in objects:
+        modifier = object.modifiers.new("LOD", "DECIMATE")
+        modifier.decimate_type = "COLLAPSE"
+        modifier.ratio = ratio
+        modifier.use_collapse_triangulate = True
+        modifiers.append(modifier)
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    meshes = [bpy.data.meshes.new_from_object(object.evaluated_get(depsgraph)) for object in objects]
+    for object, modifier in zip(objects, modifiers):
+        object.modifiers.remove(modifier)
+    return meshes
+
+
+def cluster_mesh(mesh: Mesh, distance: float) -> Mesh:
+    """Copy of mesh with its vertices merged per grid cell of size distance, so no vertex moves further than the cell diagonal"""
+    arrays, _ = weld_arrays(mesh_to_arrays(mesh), distance, grid=True)
+    lod_mesh = fill_mesh(bpy.data.meshes.new(mesh.name), arrays)
+    for material in mesh.materials:
+        lod_mesh.materials.append(material)
+    return lod_mesh
+
+
+def add_lod_object(object: Object, mesh: Mesh, level: int) -> Object:
+    """Add mesh as LOD level of object, with the same parent bone and transform"""
+    lod_object = bpy.data.objects.new(object.name + LOD_SUFFIX + str(level), mesh)
+    for collection in object.users_collection:
+        collection.objects.link(lod_object)
+    lod_object.parent = object.parent
+    lod_object.parent_type = object.parent_type
+    lod_object.parent_bone = object.parent_bone
+    lod_object.matrix_parent_inverse = object.matrix_parent_inverse.copy()
+    lod_object.matrix_basis = object.matrix_basis.copy()
+    lod_object[LOD_METADATA] = object.name
+    return lod_object
+
+
+def remove_lods(objects: List[Object]) -> None:
+    """Remove the LOD objects generated from objects, and their meshes"""
+    object_names = {object.name for object in objects}
+    for lod_object in [lod_object for lod_object in bpy.data.objects if lod_object.get(LOD_METADATA) in object_names]:
+        mesh = lod_object.data
+        bpy.data.objects.remove(lod_object)
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+    return None
+
+
+def generate_lods(objects: List[Object], ratios: List[float] = None, errors: List[float] = None) -> Dict[str, List[int]]:
+    """
+    Add the LODs 1 to N of every mesh object in objects, replacing LODs
+    generated before. LOD i keeps ratios[i - 1] of the triangles of the
+    object, or, if errors is given instead, merges vertices closer than
+    errors[i - 1] scene units. Returns the triangle counts of LOD 0 to N
+    per object name.
+    """
+    objects = [object for object in objects if object.type == "MESH" and len(object.data.polygons) > 0]
+    remove_lods(objects)
+    triangle_counts = {object.name: [get_triangle_count(object.data)] for object in objects}
+    if errors:
+        for level, error in enumerate(errors, 1):
+            for object in objects:
+                lod_object = add_lod_object(object, cluster_mesh(object.data, error), level)
+                triangle_counts[object.name].append(get_triangle_count(lod_object.data))
+    elif ratios:
+        for level, ratio in enumerate(ratios, 1):
+            for object, mesh in zip(objects, decimate_meshes(objects, ratio)):
+                lod_object = add_lod_object(object, mesh, level)
+                triangle_counts[object.name].append(get_triangle_count(lod_object.data))
+    return triangle_counts
+
+
+@contextmanager
+def lod_names() -> Iterator[None]:
+    """Name the objects that have LODs <name>_LOD0 while the context is active, e.g. for an FBX export"""
+    source_names = {lod_object[LOD_METADATA] for lod_object in bpy.data.objects if LOD_METADATA in lod_object}
+    renamed = [(object, object.name) for object in bpy.data.objects if object.name in source_names and LOD_METADATA not in object]
+    try:
+        for object, name in renamed:
+            object.name = name + LOD_SUFFIX + "0"
+        yield None
+    finally:
+        for object, name in renamed:
+            object.name = name
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+import hashlib
+import os
+from shutil import rmtree
+from typing import Dict, Optional
+
+import bpy
+import numpy
+
+from .utils import file_digest
+
+MESH_CACHE_PATH = "urdf_importer/mesh_cache"  # In Blender's user data folder, see get_mesh_cache_path
+MESH_CACHE_PATH_VARIABLE = "URDF_MESH_CACHE"  # Environment variable that overrides the cache folder
+MESH_CACHE_VERSION = 1
+MESH_CACHE_SIZE = 1024  # in MB
+
+
+def get_mesh_cache_path() -> str:
+    """
+    Default cache folder: $URDF_MESH_CACHE, or urdf_importer/mesh_cache in
+    Blender's user data folder. It does not depend on the working directory,
+    so batch and worker runs in temporary working directories share it.
+    """
+    cache_path = os.environ.get(MESH_CACHE_PATH_VARIABLE)
+    if cache_path:
+        return cache_path
+    return bpy.utils.user_resource("DATAFILES", path=MESH_CACHE_PATH)
+
+
+class MeshCache:
+    """
+    Content-addressed store of processed mesh geometry on disk. Each entry
+    is a .npz file of the arrays produced by mesh_io.object_to_arrays, and
+    the least recently used entries are evicted once max_size is exceeded.
+    """
+
+    def __init__(self, cache_path: str = None, max_size: float = MESH_CACHE_SIZE):
+        self.cache_path = cache_path or get_mesh_cache_path()
+        self.max_size = int(max_size * 1024 * 1024)
+
+    def get_key(self, file_path: str, *options) -> str:
+        """Key of a mesh file processed with the given import options"""
+        key = "%s:%d:%r" % (file_digest(file_path), MESH_CACHE_VERSION, options)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_path, key + ".npz")
+
+    def load(self, key: str) -> Optional[Dict[str, numpy.ndarray]]:
+        entry_path = self.get_entry_path(key)
+        if not os.path.exists(entry_path):
+            return None
+        try:
+            with numpy.load(entry_path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+        except (OSError, ValueError):
+            # Corrupt or truncated entry, drop it and import again
+            os.remove(entry_path)
+            return None
+        # Touch the entry, the mtime is the LRU order
+        os.utime(entry_path)
+        return arrays
+
+    def store(self, key: str, arrays: Dict[str, numpy.ndarray]) -> None:
+        if not os.path.exists(self.cache_path):
+            os.makedirs(self.cache_path)
+        entry_path = self.get_entry_path(key)
+        # Write next to the entry and rename, so concurrent imports never read a partial file
+        tmp_entry_path = entry_path + ".%d.tmp" % os.getpid()
+        with open(tmp_entry_path, "wb") as file:
+            numpy.savez(file, **arrays)
+        os.replace(tmp_entry_path, entry_path)
+        self.evict()
+        return None
+
+    def evict(self) -> None:
+        entries = []
+        for file_name in os.listdir(self.cache_path):
+            if file_name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_path, file_name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+
+        cache_size = sum(entry[1] for entry in entries)
+        for _, entry_size, file_name in sorted(entries):
+            if cache_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_path, file_name))
+            except FileNotFoundError:
+                pass
+            cache_size -= entry_size
+        return None
+
+
+def clear_mesh_cache(cache_path: str = None) -> None:
+    cache_path = cache_path or get_mesh_cache_path()
+    if os.path.exists(cache_path):
+        rmtree(cache_path)
+    return None
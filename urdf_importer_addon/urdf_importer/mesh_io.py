@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import bpy
+import numpy
+from bpy.types import Material, Mesh, Object
+from mathutils import Matrix
+
+
+def get_material_info(material: Material) -> Dict:
+    info = {"name": material.name, "color": list(material.diffuse_color), "image": ""}
+    if material.use_nodes and material.node_tree.nodes.get("Principled BSDF") is not None:
+        base_color = material.node_tree.nodes["Principled BSDF"].inputs.get("Base Color")
+        info["color"] = list(base_color.default_value)
+        if base_color.is_linked and getattr(base_color.links[0].from_node, "image", None) is not None:
+            info["image"] = bpy.path.abspath(base_color.links[0].from_node.image.filepath)
+    return info
+
+
+def is_same_material(material: Material, info: Dict) -> bool:
+    """Whether material has the base color and image stored in info"""
+    material_info = get_material_info(material)
+    if bool(material_info["image"]) != bool(info["image"]):
+        return False
+    if info["image"] and os.path.normpath(material_info["image"]) != os.path.normpath(info["image"]):
+        return False
+    return numpy.allclose(material_info["color"], info["color"], atol=1e-5)
+
+
+def get_or_create_material(info: Dict) -> Optional[Material]:
+    """
+    Return the material named in info, or rebuild it from its base color and image.
+    A material with that name but another color or image is left alone, the
+    rebuilt one gets a suffixed name then. Returns None when the image the
+    material was built from is gone.
+    """
+    material = bpy.data.materials.get(info["name"])
+    if material is not None and is_same_material(material, info):
+        return material
+    if info["image"] and not os.path.exists(info["image"]):
+        return None
+
+    material = bpy.data.materials.new(info["name"])
+    material.use_nodes = True
+    principled_node = material.node_tree.nodes.get("Principled BSDF")
+    principled_node.inputs["Base Color"].default_value = info["color"]
+    if info["image"]:
+        image_node = material.node_tree.nodes.new("ShaderNodeTexImage")
+        image_node.image = bpy.data.images.load(info["image"], check_existing=True)
+        material.node_tree.links.new(image_node.outputs["Color"], principled_node.inputs["Base Color"])
+    return material
+
+
+def mesh_to_arrays(mesh: Mesh) -> Dict[str, numpy.ndarray]:
+    vertices = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    loop_verts = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    loop_starts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    material_indices = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    if mesh.uv_layers.active is not None:
+        uvs = numpy.empty(len(mesh.loops) * 2, dtype=numpy.float32)
+        mesh.uv_layers.active.data.foreach_get("uv", uvs)
+    else:
+        uvs = numpy.empty(0, dtype=numpy.float32)
+
+    return {
+        "vertices": vertices,
+        "loop_verts": loop_verts,
+        "loop_starts": loop_starts,
+        "loop_totals": loop_totals,
+        "material_indices": material_indices,
+        "uvs": uvs,
+    }
+
+
+def fill_mesh(mesh: Mesh, arrays: Dict[str, numpy.ndarray]) -> Mesh:
+    """Fill an empty mesh from the arrays of mesh_to_arrays"""
+    mesh.vertices.add(len(arrays["vertices"]) // 3)
+    mesh.vertices.foreach_set("co", arrays["vertices"])
+    mesh.loops.add(len(arrays["loop_verts"]))
+    mesh.loops.foreach_set("vertex_index", arrays["loop_verts"])
+    mesh.polygons.add(len(arrays["loop_starts"]))
+    mesh.polygons.foreach_set("loop_start", arrays["loop_starts"])
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", arrays["loop_totals"])
+    mesh.polygons.foreach_set("material_index", arrays["material_indices"])
+    uv_layer = mesh.uv_layers.new()
+    if len(arrays["uvs"]) == len(arrays["loop_verts"]) * 2:
+        uv_layer.data.foreach_set("uv", arrays["uvs"])
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def object_to_arrays(object: Object) -> Dict[str, numpy.ndarray]:
+    arrays = mesh_to_arrays(object.data)
+    arrays["matrix_basis"] = numpy.array([value for row in object.matrix_basis for value in row], dtype=numpy.float64)
+    materials: List[Dict] = [get_material_info(material) for material in object.data.materials if material is not None]
+    arrays["materials"] = numpy.array(json.dumps(materials))
+    return arrays
+
+
+def object_from_arrays(object_name: str, arrays: Dict[str, numpy.ndarray]) -> Optional[Object]:
+    """
+    Create and link a mesh object from the arrays of object_to_arrays.
+    Returns None if one of its materials can not be restored.
+    """
+    materials = []
+    for info in json.loads(str(arrays["materials"])):
+        material = get_or_create_material(info)
+        if material is None:
+            return None
+        materials.append(material)
+
+    mesh = fill_mesh(bpy.data.meshes.new(object_name), arrays)
+    for material in materials:
+        mesh.materials.append(material)
+    object = bpy.data.objects.new(object_name, mesh)
+    object.matrix_basis = Matrix(arrays["matrix_basis"].reshape(4, 4).tolist())
+    bpy.context.scene.collection.objects.link(object)
+    return object
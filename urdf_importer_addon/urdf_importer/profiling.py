@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+import cProfile
+import functools
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+try:
+    from .. import bl_info
+    ADDON_VERSION = ".".join(str(i) for i in bl_info["version"])
+except ImportError:
+    ADDON_VERSION = "unknown"
+
+
+class ImportProfiler:
+    """
+    Wall time and call counts per import phase, and time, mesh and vertex
+    counts per link. Phases may nest (e.g. weld runs inside mesh_import),
+    so their times are inclusive. A disabled profiler records nothing.
+    """
+
+    def __init__(self, enabled: bool = False, use_cprofile: bool = False):
+        self.enabled = enabled
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.links: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.total_time = 0.0
+        self.cprofile = cProfile.Profile() if enabled and use_cprofile else None
+        self.start_time = None
+
+    def start(self) -> None:
+        if self.enabled:
+            self.start_time = time.perf_counter()
+            if self.cprofile is not None:
+                self.cprofile.enable()
+        return None
+
+    def stop(self) -> None:
+        if self.enabled and self.start_time is not None:
+            if self.cprofile is not None:
+                self.cprofile.disable()
+            self.total_time += time.perf_counter() - self.start_time
+            self.start_time = None
+        return None
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return nullcontext()
+        return self.record_phase(name)
+
+    @contextmanager
+    def record_phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phase = self.phases.setdefault(name, {"time": 0.0, "calls": 0})
+            phase["time"] += time.perf_counter() - start
+            phase["calls"] += 1
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+        return None
+
+    def add_link(self, link_name: str, elapsed: float, mesh_count: int, vertex_count: int) -> None:
+        if self.enabled:
+            self.links[link_name] = {"time": elapsed, "meshes": mesh_count, "vertices": vertex_count}
+            self.count("meshes", mesh_count)
+            self.count("vertices", vertex_count)
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            "addon_version": ADDON_VERSION,
+            "total_time": self.total_time,
+            "phases": self.phases,
+            "counters": self.counters,
+            "links": self.links,
+        }
+
+    def get_summary(self, phase_count: int = 5) -> str:
+        phases = sorted(self.phases.items(), key=lambda item: item[1]["time"], reverse=True)[:phase_count]
+        return "Imported %d meshes, %d vertices in %.2f s (%s)" % (
+            self.counters.get("meshes", 0),
+            self.counters.get("vertices", 0),
+            self.total_time,
+            ", ".join("%s %.2f s" % (name, phase["time"]) for name, phase in phases),
+        )
+
+    def write(self, file_path: str) -> None:
+        with open(file_path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(file_path.rsplit(".", 1)[0] + ".prof")
+        return None
+
+
+def profile_phase(name: str):
+    """Record a RobotBuilder method as import phase of self.profiler"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.phase(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
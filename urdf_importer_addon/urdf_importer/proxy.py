@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+# Only NumPy is used here, like stl_reader, proxies are computed without importing meshes
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+
+from .stl_reader import STL_HEADER_SIZE, STL_TRIANGLE_DTYPE, is_binary_stl, read_ascii_stl_triangles
+
+PROXY_SAMPLE_COUNT = 4096  # Triangles of a binary STL read for its bounds, 0 reads all
+PROXY_MARKER_SIZE = 0.05  # Size in meters of the box standing in for a visual without known bounds
+PROXY_SIGNATURE_PREFIX = "proxy:"  # Prefix of the link signature of a proxy object
+
+OBJ_VERTEX_PATTERN = re.compile(rb"^v[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)", re.MULTILINE)
+
+# Unit cube corners, index bits are x, y and z
+BOX_CORNERS = numpy.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]])
+# Quads of the box pointing outwards
+BOX_FACES = numpy.array([[0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4], [2, 3, 7, 6], [0, 4, 7, 3], [1, 2, 6, 5]])
+
+
+def read_stl_points(file_path: str, sample_count: int = PROXY_SAMPLE_COUNT) -> numpy.ndarray:
+    """
+    Vertices of every n-th triangle of a binary STL, so at most sample_count
+    triangles are read. The bounds of the samples may be slightly smaller
+    than those of the whole mesh. ASCII files are read completely.
+    """
+    if not is_binary_stl(file_path):
+        return read_ascii_stl_triangles(file_path)
+    triangle_count = (os.path.getsize(file_path) - STL_HEADER_SIZE) // STL_TRIANGLE_DTYPE.itemsize
+    if triangle_count == 0:
+        return numpy.empty((0, 3), dtype=numpy.float32)
+    step = max(1, triangle_count // sample_count) if sample_count > 0 else 1
+    triangles = numpy.memmap(file_path, dtype=STL_TRIANGLE_DTYPE, mode="r", offset=STL_HEADER_SIZE, shape=(triangle_count,))
+    return numpy.array(triangles["vertices"][::step], dtype=numpy.float32).reshape(-1, 3)
+
+
+def read_obj_points(file_path: str) -> numpy.ndarray:
+    """Positions of the "v" lines of an OBJ file, faces and other elements are not parsed"""
+    with open(file_path, "rb") as file:
+        coordinates = OBJ_VERTEX_PATTERN.findall(file.read())
+    if not coordinates:
+        return numpy.empty((0, 3), dtype=numpy.float32)
+    return numpy.array(coordinates).astype(numpy.float32)
+
+
+def get_mesh_bounds(file_path: str, sample_count: int = PROXY_SAMPLE_COUNT) -> Optional[numpy.ndarray]:
+    """(2, 3) minimum and maximum of the vertices of an STL or OBJ file, None for other or unreadable files"""
+    file_ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if file_ext == ".stl":
+            points = read_stl_points(file_path, sample_count)
+        elif file_ext == ".obj":
+            points = read_obj_points(file_path)
+        else:
+            return None
+    except (OSError, ValueError):
+        return None
+    if len(points) == 0:
+        return None
+    return numpy.stack([points.min(axis=0), points.max(axis=0)]).astype(numpy.float64)
+
+
+def boxes_to_arrays(boxes: List[Tuple[numpy.ndarray, numpy.ndarray]], material_indices: List[int]) -> Dict[str, numpy.ndarray]:
+    """
+    Mesh arrays, as used by mesh_io.fill_mesh, of one box per (matrix, bounds)
+    in boxes: the corners of the (2, 3) bounds transformed by the 4x4 matrix.
+    """
+    vertices = []
+    loop_verts = []
+    for i, (matrix, bounds) in enumerate(boxes):
+        corners = bounds[BOX_CORNERS, [0, 1, 2]]
+        vertices.append(corners @ matrix[:3, :3].T + matrix[:3, 3])
+        # A mirroring matrix turns the faces inside out
+        faces = BOX_FACES if numpy.linalg.det(matrix[:3, :3]) >= 0 else BOX_FACES[:, ::-1]
+        loop_verts.append(faces + 8 * i)
+    face_count = 6 * len(boxes)
+    return {
+        "vertices": numpy.concatenate(vertices).astype(numpy.float32).reshape(-1),
+        "loop_verts": numpy.concatenate(loop_verts).astype(numpy.int32).reshape(-1),
+        "loop_starts": numpy.arange(0, face_count * 4, 4, dtype=numpy.int32),
+        "loop_totals": numpy.full(face_count, 4, dtype=numpy.int32),
+        "material_indices": numpy.repeat(numpy.array(material_indices, dtype=numpy.int32), 6),
+        "uvs": numpy.empty(0, dtype=numpy.float32),
+    }
@@ -7,12 +7,21 @@ ros_path = [p for p in sys.path if p.startswith("/opt/ros")]
 sys.path = [p for p in sys.path if not p.startswith("/opt/ros")]
 sys.path = sys.path + ros_path
 
+import hashlib
+import json
 import os
+import queue
+import re
+import time
+from concurrent.futures import Executor
 from shutil import copy
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterator, List, Tuple, Union
 from xml.etree import ElementTree
+from xml.sax.saxutils import escape, unescape
 
+import bmesh
 import bpy
+import numpy
 ROS_PKG_VERSIONS = []
 try:
     import rospkg
@@ -25,13 +34,64 @@ try:
 except:
     pass
 from bpy.types import Armature, BlendData, Bone, Camera, Image, Light, Material, Mesh, Object
-from mathutils import Euler, Vector
+from mathutils import Euler, Matrix, Vector
 from urdf_parser_py.urdf import URDF, Joint, Link, Visual
 
+from .kinematics import RobotKinematics, get_origin_matrices
+from .lod import generate_lods, remove_lods
+from .mesh_cache import MESH_CACHE_SIZE, MeshCache
+from .mesh_io import fill_mesh, object_from_arrays, object_to_arrays
+from .profiling import ImportProfiler, profile_phase
+from .proxy import PROXY_MARKER_SIZE, PROXY_SAMPLE_COUNT, PROXY_SIGNATURE_PREFIX, boxes_to_arrays, get_mesh_bounds
+from .stl_reader import read_stl, read_stl_files, submit_stl_files
+from .utils import file_digest
+from .weld import WELD_DISTANCE, weld_object
+
 TMP_FOLDER_PATH = "texture/"
 TMP_TEXTURE_PATH = TMP_FOLDER_PATH
 TMP_FILE_PATH = "tmp.dae"
 
+ROBOT_METADATA = "urdf_importer"  # Import options on the armature object
+LINK_METADATA = "urdf_link"  # Link name on its mesh object
+SIGNATURE_METADATA = "urdf_signature"  # Link signature on its mesh object, see get_link_signature
+PROXY_METADATA = "urdf_proxy"  # Set on link objects that are bounding box stand-ins, see build_link_proxy
+# RobotBuilder arguments an update reuses from the import it updates, stored with it, see get_update_arguments
+UPDATE_ARGUMENTS = (
+    "should_merge_duplicate_materials",
+    "should_check_material_name",
+    "should_rename_materials",
+    "should_apply_weld",
+    "unique_name",
+    "scale_unit",
+    "ignore_root",
+    "use_parent_operator",
+    "use_transform_operators",
+    "weld_backend",
+    "weld_distance",
+    "proxy_sample_count",
+    "lod_ratios",
+    "lod_errors",
+    "use_mesh_cache",
+    "mesh_cache_size",
+    "mesh_cache_path",
+    "use_native_stl",
+    "mesh_workers",
+)
+# RobotBuilder arguments that only apply to one import, every other argument is in UPDATE_ARGUMENTS
+IMPORT_ARGUMENTS = ("file_path", "update", "store_signatures", "proxy", "load_links", "profile", "profile_path", "use_cprofile", "run")
+IDENTITY_TOLERANCE = 1e-6  # Largest deviation of a bake matrix from the identity that needs no baking, see add_mesh_file
+
+_staged_textures: Dict[str, str] = {}
+
+
+def matrix_to_pose(matrix: numpy.ndarray) -> Tuple[Vector, Euler]:
+    matrix = Matrix(matrix.tolist())
+    return (matrix.to_translation(), matrix.to_euler())
+
+
+def is_identity(matrix: Matrix) -> bool:
+    return all(abs(matrix[row][column] - (row == column)) <= IDENTITY_TOLERANCE for row in range(4) for column in range(4))
+
 
 def urdf_cleanup(file_path: str) -> str:
     tree = ElementTree.parse(file_path)
@@ -47,10 +107,75 @@ def urdf_cleanup(file_path: str) -> str:
     return ElementTree.tostring(newroot)
 
 
-def fix_up_axis_and_get_materials(file_path: str, unique_name: bool):
-    tree = ElementTree.parse(file_path)
-    root = tree.getroot()
+def get_local_tag(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def rewrite_collada(file_path: str, up_axis: bool, image_paths: Dict[str, str]) -> None:
+    """
+    Write file_path to TMP_FILE_PATH with up_axis set to Z_UP and the
+    init_from paths of library_images replaced by image_paths, as a text
+    substitution instead of a serialized element tree.
+    """
+    with open(file_path, "rb") as file:
+        data = file.read()
+
+    if up_axis:
+        data = re.sub(rb"(<(?:[\w-]+:)?up_axis\b[^>]*>)[^<]*(<)", rb"\1Z_UP\2", data, count=1)
+
+    def replace_init_from(match: re.Match) -> bytes:
+        old_path = unescape(match.group(2).decode("utf-8").strip())
+        if old_path not in image_paths:
+            return match.group(0)
+        return match.group(1) + escape(image_paths[old_path]).encode("utf-8") + match.group(3)
+
+    def replace_library_images(match: re.Match) -> bytes:
+        return re.sub(rb"(<(?:[\w-]+:)?init_from\b[^>]*>)([^<]*)(<)", replace_init_from, match.group(0))
+
+    if image_paths:
+        data = re.sub(rb"<(?:[\w-]+:)?library_images\b.*?</(?:[\w-]+:)?library_images>", replace_library_images, data, flags=re.DOTALL)
 
+    with open(TMP_FILE_PATH, "wb") as file:
+        file.write(data)
+    return None
+
+
+def stage_texture(src_path: str, unique_name: bool) -> str:
+    """
+    Place a texture in TMP_TEXTURE_PATH and return its staged path. Textures
+    are deduplicated by content, and named by content hash unless unique_name,
+    so the names stay the same across sessions. Staging uses a hard link,
+    a symlink or a copy, in that order, and is skipped if already done.
+    """
+    digest = file_digest(src_path)
+    staged_path = _staged_textures.get(digest)
+    if staged_path is not None and os.path.exists(staged_path) and file_digest(staged_path) == digest:
+        return staged_path
+
+    file_name, file_ext = os.path.splitext(os.path.basename(src_path))
+    if not unique_name:
+        file = "T_" + file_name + "_" + digest[:8] + file_ext
+    else:
+        file = "T_" + file_name + file_ext
+    staged_path = TMP_TEXTURE_PATH + file
+
+    if os.path.lexists(staged_path):
+        if os.path.exists(staged_path) and file_digest(staged_path) == digest:
+            _staged_textures[digest] = staged_path
+            return staged_path
+        os.remove(staged_path)
+    try:
+        os.link(src_path, staged_path)
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(src_path), staged_path)
+        except OSError:
+            copy(src_path, staged_path)
+    _staged_textures[digest] = staged_path
+    return staged_path
+
+
+def fix_up_axis_and_get_materials(file_path: str, unique_name: bool):
     tmp_file_path = file_path
     dir_path = os.path.dirname(file_path)
     mat_sampler2D_dict: Dict[str, Dict[str, str]] = {}
@@ -60,64 +185,55 @@ def fix_up_axis_and_get_materials(file_path: str, unique_name: bool):
     sampler2D_dict: Dict[str, str] = {}
     surface_dict: Dict[str, str] = {}
     image_dict: Dict[str, str] = {}
+    image_paths: Dict[str, str] = {}
+    fix_up_axis = False
     if not os.path.exists(TMP_TEXTURE_PATH):
         os.makedirs(TMP_TEXTURE_PATH)
 
-    for ele1 in root:
-        if "asset" in ele1.tag:
-            for ele2 in ele1:
-                if "up_axis" in ele2.tag:
-                    ele2.text = "Z_UP"
-                    tmp_file_path = TMP_FILE_PATH
-
-        if "library_materials" in ele1.tag:
-            for ele2 in ele1:
-                if "material" in ele2.tag:
-                    mat_name = ele2.attrib["name"]
-                    for ele3 in ele2:
-                        if "instance_effect" in ele3.tag:
-                            effect_id = ele3.attrib["url"]
-                            if effect_id.startswith("#"):
-                                effect_id = effect_id[1:]
-                            mat_dict[mat_name] = effect_id
-
-        if "library_effects" in ele1.tag:
-            for ele2 in ele1:
-                if "effect" in ele2.tag:
-                    effect_id = ele2.attrib["id"]
-                    effect_dict[effect_id] = []
-                    for ele3 in ele2:
-                        if "profile_COMMON" in ele3.tag:
-                            for ele4 in ele3:
-                                if "newparam" in ele4.tag:
-                                    param_name = ele4.attrib["sid"]
-                                    for ele5 in ele4:
-                                        if "surface" in ele5.tag:
-                                            for ele6 in ele5:
-                                                if "init_from" in ele6.tag:
-                                                    surface_dict[param_name] = ele6.text
-                                        if "sampler2D" in ele5.tag:
-                                            for ele6 in ele5:
-                                                if "source" in ele6.tag:
-                                                    effect_dict[effect_id].append(param_name)
-                                                    sampler2D_dict[param_name] = ele6.text
-
-        if "library_images" in ele1.tag:
-            for ele2 in ele1:
-                if "image" in ele2.tag:
-                    image_name = ele2.attrib["name"]
-                    for ele3 in ele2:
-                        if "init_from" in ele3.tag:
-                            tmp_file_path = TMP_FILE_PATH
-                            file_name, file_ext = os.path.splitext(ele3.text)
-                            if not unique_name:
-                                file_hash = str(abs(hash(os.path.dirname(file_path))) % (10**3))
-                                file = "T_" + file_name + "_" + file_hash + file_ext
-                            else:
-                                file = "T_" + file_name + file_ext
-                            copy(dir_path + "/" + ele3.text, TMP_TEXTURE_PATH + file)
-                            ele3.text = TMP_TEXTURE_PATH + file
-                            image_dict[image_name] = ele3.text
+    # Stream the document and only look at asset and the material, effect and image libraries.
+    # Elements are cleared once read, so the geometry is never held in memory.
+    tags: List[str] = []
+    mat_name = effect_id = param_name = image_name = None
+    for event, element in ElementTree.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            tag = get_local_tag(element.tag)
+            tags.append(tag)
+            if len(tags) < 3:
+                continue
+            if tags[1] == "library_materials" and tag == "material" and len(tags) == 3:
+                mat_name = element.attrib["name"]
+            elif tags[1] == "library_effects" and tag == "effect" and len(tags) == 3:
+                effect_id = element.attrib["id"]
+                effect_dict[effect_id] = []
+            elif tags[1] == "library_effects" and tag == "newparam" and tags[-2] == "profile_COMMON":
+                param_name = element.attrib["sid"]
+            elif tags[1] == "library_images" and tag == "image" and len(tags) == 3:
+                image_name = element.attrib["name"]
+            continue
+
+        tag = tags.pop()
+        if len(tags) >= 2:
+            if tags[1] == "asset" and tag == "up_axis":
+                fix_up_axis = (element.text or "").strip() != "Z_UP"
+
+            elif tags[1] == "library_materials" and tag == "instance_effect" and tags[-1] == "material":
+                effect_id = element.attrib["url"]
+                if effect_id.startswith("#"):
+                    effect_id = effect_id[1:]
+                mat_dict[mat_name] = effect_id
+
+            elif tags[1] == "library_effects" and tags[-2:] == ["newparam", "surface"] and tag == "init_from":
+                surface_dict[param_name] = element.text
+            elif tags[1] == "library_effects" and tags[-2:] == ["newparam", "sampler2D"] and tag == "source":
+                effect_dict[effect_id].append(param_name)
+                sampler2D_dict[param_name] = element.text
+
+            elif tags[1] == "library_images" and tag == "init_from" and tags[-1] == "image":
+                image_file = element.text.strip()
+                image_path = stage_texture(dir_path + "/" + image_file, unique_name)
+                image_paths[image_file] = image_path
+                image_dict[image_name] = image_path
+        element.clear()
 
     for mat_name in mat_dict:
         mat_sampler2D_dict[mat_name] = {}
@@ -128,8 +244,10 @@ def fix_up_axis_and_get_materials(file_path: str, unique_name: bool):
             image_path = image_dict.get(image_name)
             mat_sampler2D_dict[mat_name][effect_name] = image_path
 
-    if tmp_file_path == TMP_FILE_PATH:
-        tree.write(tmp_file_path)
+    image_paths = {old_path: new_path for old_path, new_path in image_paths.items() if old_path != new_path}
+    if fix_up_axis or image_paths:
+        tmp_file_path = TMP_FILE_PATH
+        rewrite_collada(file_path, fix_up_axis, image_paths)
 
     return (tmp_file_path, mat_sampler2D_dict)
 
@@ -170,138 +288,178 @@ def clear_data(data: BlendData, scale_unit: float) -> None:
     return None
 
 
+class RosPackageIndex:
+    """
+    Package name to package path index. rospkg crawls ROS_PACKAGE_PATH
+    once per RosPack instance, so one instance is kept and every resolved
+    lookup (ROS 1, ROS 2 and the local directory fallback) is memoized.
+    Failed lookups are not, a package installed or built later is found by
+    the next import.
+    """
+
+    def __init__(self):
+        self.env_key = get_ros_env_key()
+        self.ros_pack = rospkg.RosPack() if 1 in ROS_PKG_VERSIONS else None
+        self.pkg_paths: Dict[str, str] = {}
+
+    def get_path(self, pkg_name: str) -> str:
+        if pkg_name not in self.pkg_paths:
+            pkg_path = self.find_path(pkg_name)
+            if pkg_path is None:
+                if self.ros_pack is not None:
+                    # RosPack keeps its first crawl, a new one sees packages added since
+                    self.ros_pack = rospkg.RosPack()
+                raise RuntimeError('Can not resolve ros package %s', pkg_name)
+            self.pkg_paths[pkg_name] = pkg_path
+        return self.pkg_paths[pkg_name]
+
+    def find_path(self, pkg_name: str) -> str:
+        if self.ros_pack is not None:
+            try:
+                pkg_path = self.ros_pack.get_path(pkg_name)
+                if os.path.isdir(pkg_path):
+                    return pkg_path
+            except rospkg.common.ResourceNotFound:
+                # we ignore that the package can not be found and assume
+                # its a ROS 2 package or local path
+                pass
+
+        if 2 in ROS_PKG_VERSIONS:
+            try:
+                pkg_path = get_package_share_directory(pkg_name)
+                if os.path.isdir(pkg_path):
+                    return pkg_path
+            except ValueError:
+                # we ignore that the package can not be found and hope
+                # that it is a local path
+                pass
+        print(
+            'rospkg and rospkg2 not installed, or ROS package not installed '
+            'correctly, trying to use package name as relative path to the '
+            'urdf-file!')
+        if os.path.isdir(pkg_name):
+            return pkg_name
+        else:
+            return None
+
+
+_ros_package_index: RosPackageIndex = None
+
+
+def get_ros_env_key() -> Tuple[str, ...]:
+    return (
+        os.environ.get("ROS_PACKAGE_PATH", ""),
+        os.environ.get("AMENT_PREFIX_PATH", ""),
+        os.getcwd(),
+    )
+
+
+def get_ros_package_index() -> RosPackageIndex:
+    """Return the package index of this Blender session, rebuilt when the ROS environment changes"""
+    global _ros_package_index
+    if _ros_package_index is None or _ros_package_index.env_key != get_ros_env_key():
+        _ros_package_index = RosPackageIndex()
+    return _ros_package_index
+
+
 def get_from_ros_pkg(rel_path: str) -> str:
     """
     Use rospkg/ros2pkg to get the full path of a package.
     Fall back to a local directory if both fail, if the local
     directory does not exist fail completely.
     """
-    pkg_name = os.path.basename(rel_path)
+    return get_ros_package_index().get_path(os.path.basename(rel_path))
 
-    if 1 in ROS_PKG_VERSIONS:
-        try:
-            pkg_path = rospkg.RosPack().get_path(pkg_name)
-            if os.path.isdir(pkg_path):
-                return pkg_path
-        except rospkg.common.ResourceNotFound:
-            # we ignore that the package can not be found and assume
-            # its a ROS 2 package or local path
-            pass
 
-    if 2 in ROS_PKG_VERSIONS:
-        try:
-            pkg_path = get_package_share_directory(pkg_name)
-            if os.path.isdir(pkg_path):
-                return pkg_path
-        except ValueError:
-            # we ignore that the package can not be found and hope
-            # that it is a local path
-            pass
-    print(
-        'rospkg and rospkg2 not installed, or ROS package not installed '
-        'correctly, trying to use package name as relative path to the '
-        'urdf-file!')
-    if os.path.isdir(pkg_name):
-        return pkg_name
+def get_material_base_name(mat_name: str) -> str:
+    mat_name_split = mat_name.split(".")
+    if len(mat_name_split) > 1 and mat_name_split[-1].isnumeric():
+        mat_name_split.pop()
+    return ".".join(mat_name_split)
+
+
+def get_material_key(mat: Material, should_check_material_name: bool) -> Tuple:
+    """
+    Key under which materials are merged: the base color, or the name of the image linked to it,
+    and with the name check also the name without numeric suffix (each part cut to 59 characters).
+    Returns None for materials that are not merged.
+    """
+    principled_node = mat.node_tree.nodes.get("Principled BSDF")
+    if principled_node is None:
+        return None
+    mat_base_color = principled_node.inputs.get("Base Color")
+    if mat_base_color.is_linked:
+        image = getattr(mat_base_color.links[0].from_node, "image", None)
+        content_key = ("image", image.name if image is not None else None)
     else:
-        raise RuntimeError('Can not resolve ros package %s', pkg_name)
+        content_key = ("color", tuple(mat_base_color.default_value))
+
+    if should_check_material_name:
+        name_key = tuple(mat_name[:59] for mat_name in get_material_base_name(mat.name_full).split("."))
+        return (name_key, content_key)
+    return (content_key,)
 
 
-def merge_materials(should_check_material_name: bool) -> None:
-    mat_uniques: List[Material] = []
+def get_object_materials(objects: List[Object]) -> List[Material]:
+    materials = []
+    for object in objects:
+        for material_slot in object.material_slots:
+            if material_slot.material is not None and material_slot.material not in materials:
+                materials.append(material_slot.material)
+    return materials
+
+
+def merge_materials(objects: List[Object], should_check_material_name: bool) -> None:
+    """Merge the duplicate materials of objects, materials of other objects are left alone"""
+    mat_keys: Dict[str, Tuple] = {}
+    mat_uniques: Dict[Tuple, Material] = {}
+    mat_duplicates: Dict[str, Material] = {}
+    object_materials = get_object_materials(objects)
+
+    def get_key(mat: Material) -> Tuple:
+        if mat.name_full not in mat_keys:
+            mat_keys[mat.name_full] = get_material_key(mat, should_check_material_name)
+        return mat_keys[mat.name_full]
+
     object: Object
-    for object in bpy.data.objects:
+    for object in objects:
         for material_slot in object.material_slots:
             mat = material_slot.material
             if mat is None or not mat.use_nodes:
                 continue
-            mat_base_color = mat.node_tree.nodes["Principled BSDF"].inputs.get("Base Color")
-            is_mat_unique = True
-            for mat_unique in mat_uniques:
-                # Level 1: Check for equalness
-                if mat == mat_unique:
-                    continue
-
-                if should_check_material_name:
-                    # Level 2: Check for name equalness
-                    mat_name_split = mat.name_full.split(".")
-                    mat_unique_name_split = mat_unique.name_full.split(".")
-                    if (
-                        len(mat_name_split) == len(mat_unique_name_split)
-                        and len(mat_name_split) > 1
-                        and mat_name_split[-1].isnumeric()
-                        and mat_unique_name_split[-1].isnumeric()
-                    ):
-                        mat_name_split.pop()
-                        mat_unique_name_split.pop()
-                    for mat_name, mat_unique_name in zip(mat_name_split, mat_unique_name_split):
-                        if mat_name[:59] == mat_unique_name[:59]:
-                            is_mat_unique = False
-                        else:
-                            is_mat_unique = True
-                            break
-                    if is_mat_unique:
-                        continue
-
-                # Level 3: Check for content equalness
-                mat_unique_base_color = mat_unique.node_tree.nodes["Principled BSDF"].inputs.get("Base Color")
-                if (not mat_base_color.is_linked) and (not mat_unique_base_color.is_linked):
-                    # Merge duplicate materials based on their Base Color
-                    if [i for i in mat_base_color.default_value] == [i for i in mat_unique_base_color.default_value]:
-                        object.material_slots[mat.name].material = mat_unique
-                        bpy.data.materials.remove(mat)
-                        is_mat_unique = False
-                        break
-                elif mat_base_color.is_linked and mat_unique_base_color.is_linked:
-                    # Merge duplicate materials based on their image name
-                    if mat_base_color.links[0].from_node.image.name == mat_unique_base_color.links[0].from_node.image.name:
-                        object.material_slots[mat.name].material = mat_unique
-                        bpy.data.materials.remove(mat)
-                        is_mat_unique = False
-                        break
-
-            if is_mat_unique and mat is not None:
-                mat_name_split = mat.name_full.split(".")
-                mat_unique = None
-                while len(mat_name_split) > 1 and mat_name_split[-1].isnumeric():
-                    mat_name = "".join(mat_name_split[:-1])
-                    if bpy.data.materials.get(mat_name) is not None:
-                        mat_unique = bpy.data.materials[mat_name]
-                    mat_name_split.pop()
-
-                if mat_unique is None:
-                    mat_uniques.append(mat)
-                else:
-                    # Level 3: Check for content equalness
-                    mat_unique_base_color = mat_unique.node_tree.nodes["Principled BSDF"].inputs.get("Base Color")
-                    is_mat_unique_equal_mat = False
-                    if (not mat_base_color.is_linked) and (not mat_unique_base_color.is_linked):
-                        # Merge duplicate materials based on their Base Color
-                        if [i for i in mat_base_color.default_value] == [i for i in mat_unique_base_color.default_value]:
-                            is_mat_unique_equal_mat = True
-                    elif mat_base_color.is_linked and mat_unique_base_color.is_linked:
-                        # Merge duplicate materials based on their image name
-                        if mat_base_color.links[0].from_node.image.name == mat_unique_base_color.links[0].from_node.image.name:
-                            is_mat_unique_equal_mat = True
-
-                    if is_mat_unique_equal_mat:
-                        object.material_slots[mat.name].material = mat_unique
-                        bpy.data.materials.remove(mat)
-                        mat_uniques.append(mat_unique)
-                    else:
-                        mat_uniques.append(mat)
+            mat_key = get_key(mat)
+            if mat_key is None:
+                continue
+
+            mat_unique = mat_uniques.get(mat_key)
+            if mat_unique is None:
+                # Prefer the material without numeric suffix, e.g. "steel" over "steel.001", if it has the same content
+                mat_unique = mat
+                mat_base = bpy.data.materials.get(get_material_base_name(mat.name_full))
+                is_base_used = mat_base is not None and mat_base != mat and mat_base in object_materials
+                if is_base_used and mat_base.use_nodes and get_key(mat_base) == mat_key:
+                    mat_unique = mat_base
+                mat_uniques[mat_key] = mat_unique
+
+            if mat_unique != mat:
+                material_slot.material = mat_unique
+                mat_duplicates[mat.name_full] = mat
         object.select_set(False)
+
+    for mat in mat_duplicates.values():
+        if mat.users == 0:
+            bpy.data.materials.remove(mat)
     return None
 
 
-def fix_alpha() -> None:
-    for mat in bpy.data.materials:
+def fix_alpha(materials: List[Material]) -> None:
+    for mat in materials:
         if hasattr(mat.node_tree, "nodes"):
             mat.node_tree.nodes["Principled BSDF"].inputs["Alpha"].default_value = 1.0
 
 
-def rename_materials(base_name: str) -> None:
-    for object in bpy.data.objects:
+def rename_materials(objects: List[Object], base_name: str) -> None:
+    for object in objects:
         for material_slot in object.material_slots:
             if material_slot.material is not None:
                 material_slot.material.name = "M_" + base_name
@@ -319,29 +477,140 @@ class RobotBuilder:
         unique_name: bool,
         scale_unit: float,
         ignore_root: bool,
+        use_parent_operator: bool = False,
+        use_transform_operators: bool = False,
+        weld_backend: str = "BMESH",
+        weld_distance: float = WELD_DISTANCE,
+        update: bool = False,
+        store_signatures: bool = False,
+        proxy: bool = False,
+        load_links: List[str] = None,
+        proxy_sample_count: int = PROXY_SAMPLE_COUNT,
+        lod_ratios: List[float] = None,
+        lod_errors: List[float] = None,
+        use_mesh_cache: bool = False,
+        mesh_cache_size: float = MESH_CACHE_SIZE,
+        mesh_cache_path: str = None,
+        use_native_stl: bool = True,
+        mesh_workers: int = 0,
+        profile: bool = False,
+        profile_path: str = None,
+        use_cprofile: bool = False,
+        run: bool = True,
     ):
-        xml_string = urdf_cleanup(file_path)
+        arguments = dict(locals())
+        self.update_arguments = {name: arguments[name] for name in UPDATE_ARGUMENTS}
+        self.profiler = ImportProfiler(profile or use_cprofile or profile_path is not None, use_cprofile)
+        self.profiler.start()
+        with self.profiler.phase("parse"):
+            xml_string = urdf_cleanup(file_path)
+            self.robot: URDF = URDF.from_xml_string(xml_string)
         self.file_path = file_path
-        self.robot: URDF = URDF.from_xml_string(xml_string)
         self.robot_root_name = self.robot.get_root()
         if ignore_root:
             self.remove_root_link()
-        self.link_pose: Dict[str, Tuple[Vector, Euler]] = {}
+        self.kinematics: RobotKinematics = None
         self.arm_bones: Dict[str, Bone] = {}
+        self.bone_specs: List[Tuple[str, Vector, Vector, str]] = []
+        self.mesh_bones: List[Tuple[str, str]] = []
+        self.mesh_cache: Dict[Tuple[str, float, bool], Tuple[Mesh, Matrix]] = {}
+        self.mesh_uses: Dict[Tuple[str, float, bool], int] = {}  # Visuals left to build per mesh_cache key
+        self.shared_meshes: Dict[Tuple[Tuple[str, float, bool], str], Mesh] = {}  # Unbaked meshes per mesh_cache key and material name
         self.root: Object = None
         self.root_name = "root"
         self.bone_tail = ".bone"
-        self.parent_links = None
         self.apply_weld = should_apply_weld
+        self.weld_backend = weld_backend
+        self.weld_distance = weld_distance
         self.unique_name = unique_name
         self.scale_unit = scale_unit
         self.ignore_root = ignore_root
-        self.build_robot()
-        if should_merge_duplicate_materials:
-            merge_materials(should_check_material_name)
-        if should_rename_materials:
-            rename_materials(self.robot.name)
+        self.use_parent_operator = use_parent_operator
+        self.use_transform_operators = use_transform_operators
+        self.disk_mesh_cache = MeshCache(mesh_cache_path, mesh_cache_size) if use_mesh_cache else None
+        self.use_native_stl = use_native_stl
+        self.mesh_workers = mesh_workers
+        self.decoded_meshes: Dict[str, Dict[str, numpy.ndarray]] = {}
+        self.update = update
+        self.proxy = proxy
+        # Hashing every mesh file only pays off for imports that are updated later, load_full_meshes updates proxies
+        self.store_signatures = store_signatures or update or proxy
+        self.load_links = set(load_links) if load_links is not None else None
+        self.proxy_sample_count = proxy_sample_count
+        self.lod_ratios = lod_ratios
+        self.lod_errors = lod_errors
+        self.lod_triangles: Dict[str, List[int]] = {}
+        self.build_links: set = None
+        self.link_bones: Dict[str, str] = {}
+        self.link_objects: Dict[str, Object] = {}
+        self.is_started = False
+        self.is_update = False
+        self.signatures: Dict[str, str] = None
+        self.stale_objects: List[Object] = []
+        self.kept_objects: Dict[str, Object] = {}
+        self.previous_materials: set = set()
+        self.decode_queue: queue.Queue = None
+        self.decode_executor: Executor = None
+        self.decode_futures = []
+        self.pending_decodes: set = set()
+        self.progress = {"links": 0, "link_count": 0, "meshes": 0, "bytes": 0, "byte_count": 0}
+        self.should_merge_duplicate_materials = should_merge_duplicate_materials
+        self.should_check_material_name = should_check_material_name
+        self.should_rename_materials = should_rename_materials
+        self.profile_path = profile_path
+        if run:
+            self.run()
+
+    def run(self) -> None:
+        for _ in self.build_steps():
+            pass
+        return None
+
+    def build_steps(self, link_batch_size: int = 0, decode_in_background: bool = False) -> Iterator[Dict]:
+        """
+        Import the robot, yielding self.progress after preparing the scene and
+        after every link_batch_size links (0 builds all links in one step), so
+        a caller can spread the import over several ticks and cancel between
+        them. With decode_in_background, STL files are decoded while links are
+        built and a link waits until its files arrived.
+        """
+        yield from self.build_robot_steps(link_batch_size, decode_in_background)
+        if self.should_merge_duplicate_materials:
+            with self.profiler.phase("merge_materials"):
+                merge_materials(list(self.link_objects.values()), self.should_check_material_name)
+        if self.should_rename_materials:
+            rename_materials(list(self.link_objects.values()), self.robot.name)
+        if (self.lod_ratios or self.lod_errors) and not self.proxy:
+            self.build_lods()
         clean_up()
+        self.profiler.stop()
+        if self.profiler.enabled:
+            print(self.profiler.get_summary())
+            self.profiler.write(self.profile_path or self.robot.name + "_import_profile.json")
+        return None
+
+    def cancel(self) -> None:
+        """
+        Remove what the import added so far. A full import leaves the cleared
+        scene, an update the previous robot. An import that has not started
+        yet has changed nothing, so the scene is left as it is.
+        """
+        if not self.is_started:
+            self.profiler.stop()
+            return None
+        self.stop_decoding()
+        self.clear_mesh_cache()
+        if self.is_update:
+            self.remove_objects(list(self.link_objects.values()))
+            for material in list(bpy.data.materials):
+                if material.users == 0 and material.name not in self.previous_materials:
+                    bpy.data.materials.remove(material)
+        else:
+            clear_data(bpy.data, self.scale_unit)
+        self.link_objects = {}
+        clean_up()
+        self.profiler.stop()
+        return None
 
     def remove_root_link(self) -> None:
         def parent_name(j):
@@ -362,48 +631,354 @@ class RobotBuilder:
         self.robot_root_name = links[0].name
 
     def build_robot(self) -> None:
-        clear_data(bpy.data, self.scale_unit)
+        for _ in self.build_robot_steps():
+            pass
+        return None
+
+    def build_robot_steps(self, link_batch_size: int = 0, decode_in_background: bool = False) -> Iterator[Dict]:
+        self.is_started = True
+        self.is_update = self.update and self.find_previous_import()
+        if self.is_update:
+            self.prepare_update()
+        else:
+            self.prepare_build()
+        link_names = [link_name for link_name in self.kinematics.order if self.should_build(link_name)]
+        self.progress["link_count"] = len(link_names)
+        self.progress["byte_count"] = sum(self.get_link_bytes(link_name) for link_name in link_names)
+        self.count_mesh_uses(link_names)
+        if decode_in_background:
+            self.start_decoding()
+        else:
+            self.decode_meshes()
+        yield self.progress
+
+        batch_start = 0
+        for link_name in self.kinematics.order:
+            self.collect_decoded_meshes()
+            while not self.is_link_decoded(link_name):
+                yield self.progress
+                self.collect_decoded_meshes()
+            self.build_link(link_name)
+            if self.should_build(link_name):
+                self.progress["links"] += 1
+                self.progress["bytes"] += self.get_link_bytes(link_name)
+            if link_batch_size > 0 and self.progress["links"] - batch_start >= link_batch_size:
+                batch_start = self.progress["links"]
+                yield self.progress
+        self.stop_decoding()
+        self.finish_build()
+        return None
+
+    def prepare_build(self) -> None:
+        with self.profiler.phase("clear_data"):
+            clear_data(bpy.data, self.scale_unit)
         self.create_materials()
         self.configure_mesh_path()
+        self.compute_kinematics()
         self.add_root_armature()
-        self.build_root()
-        self.build_chain()
-        fix_alpha()
         return None
 
-    def create_materials(self) -> None:
+    def finish_build(self) -> None:
+        self.clear_mesh_cache()
+        stale_materials = self.remove_objects(self.stale_objects)
+        self.stale_objects = []
+        self.link_objects.update(self.kept_objects)
+        for link_name, object in self.link_objects.items():
+            # Rebuilt links got a suffixed name while the previous object still existed
+            object.name = link_name
+            self.mesh_bones.append((object.name, self.link_bones[link_name]))
+        self.build_bones()
+        self.bind_meshes()
+        for material in stale_materials:
+            if material.users == 0:
+                bpy.data.materials.remove(material)
+        fix_alpha(get_object_materials(list(self.link_objects.values())))
+        self.store_metadata(self.signatures)
+        return None
+
+    def should_build(self, link_name: str) -> bool:
+        return bool(self.robot.link_map[link_name].visuals) and (self.build_links is None or link_name in self.build_links)
+
+    def get_link_file_paths(self, link_name: str) -> List[str]:
+        file_paths = []
+        for visual in self.robot.link_map[link_name].visuals:
+            file_path = getattr(visual.geometry, "filename", None)
+            if file_path and file_path not in file_paths:
+                file_paths.append(file_path)
+        return file_paths
+
+    def get_link_bytes(self, link_name: str) -> int:
+        return sum(os.path.getsize(file_path) for file_path in self.get_link_file_paths(link_name))
+
+    def find_previous_import(self) -> bool:
+        """Use the armature of an earlier import of this robot with the same import options, if there is one"""
+        for object in bpy.data.objects:
+            if object.type != "ARMATURE" or ROBOT_METADATA not in object:
+                continue
+            metadata = json.loads(object[ROBOT_METADATA])
+            if metadata["robot"] != self.robot.name:
+                continue
+            if metadata["options"] != self.get_import_options():
+                print("Import options of", self.robot.name, "changed, rebuilding the whole robot")
+                return False
+            self.root = object
+            self.arm_bones = object.data.bones
+            return True
+        return False
+
+    def prepare_update(self) -> None:
+        """
+        Find the links whose signature changed since the previous import. Their
+        objects, and those of links that are gone, are removed in finish_build,
+        so a cancelled update keeps the previous robot.
+        """
+        self.previous_materials = {material.name for material in bpy.data.materials}
+        self.create_materials(update_existing=True)
+        self.configure_mesh_path()
+        self.compute_kinematics()
+        self.signatures = self.get_link_signatures()
+
+        link_objects: Dict[str, Object] = {
+            object[LINK_METADATA]: object for object in self.root.children if LINK_METADATA in object
+        }
+        self.build_links = {
+            link_name
+            for link_name, signature in self.signatures.items()
+            if link_name not in link_objects
+            or link_objects[link_name].get(SIGNATURE_METADATA) not in self.get_kept_signatures(link_name, signature)
+        }
+        self.stale_objects = [
+            object for link_name, object in link_objects.items() if link_name in self.build_links or link_name not in self.signatures
+        ]
+        print("Updating", len(self.build_links), "of", len(self.signatures), "links of", self.robot.name)
+        self.profiler.count("updated_links", len(self.build_links))
+        self.kept_objects = {
+            link_name: object
+            for link_name, object in link_objects.items()
+            if link_name not in self.build_links and link_name in self.signatures
+        }
+        return None
+
+    def get_kept_signatures(self, link_name: str, signature: str) -> set:
+        """Stored signatures of an unchanged link object. Proxies stay unless full meshes are loaded for their link."""
+        if self.proxy or (self.load_links is not None and link_name not in self.load_links):
+            return {signature, PROXY_SIGNATURE_PREFIX + signature}
+        return {signature}
+
+    def remove_objects(self, objects: List[Object]) -> List[Material]:
+        """Remove link objects, their LODs and their meshes, returns their materials"""
+        remove_lods(objects)
+        materials = []
+        for object in objects:
+            mesh = object.data
+            materials += [material for material in mesh.materials if material is not None and material not in materials]
+            bpy.data.objects.remove(object)
+            if mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+        return materials
+
+    def get_import_options(self) -> Dict:
+        """Options an update has to share with the previous import, in the form they are stored in"""
+        options = {
+            "scale_unit": self.scale_unit,
+            "mesh": self.get_mesh_options(),
+            "unique_name": self.unique_name,
+            "ignore_root": self.ignore_root,
+        }
+        return json.loads(json.dumps(options))
+
+    def get_link_signature(self, link: Link, materials: Dict) -> str:
+        """Hash of everything the mesh object of link is built from: world poses, visuals, materials and mesh file contents"""
+        signature = hashlib.sha1()
+        for matrix in [self.kinematics.link_matrices[link.name]] + self.kinematics.visual_matrices[link.name]:
+            # Adding 0.0 turns -0.0 into 0.0
+            signature.update((numpy.round(matrix, 6) + 0.0).tobytes())
+        visual: Visual
+        for visual in link.visuals:
+            signature.update(visual.to_xml_string().encode("utf-8"))
+            material_name = getattr(visual.material, "name", None)
+            if material_name in materials:
+                signature.update(materials[material_name].to_xml_string().encode("utf-8"))
+            file_path = getattr(visual.geometry, "filename", None)
+            if file_path:
+                signature.update(file_digest(file_path).encode("utf-8"))
+        return signature.hexdigest()
+
+    @profile_phase("signatures")
+    def get_link_signatures(self) -> Dict[str, str]:
+        materials = {material.name: material for material in self.robot.materials}
+        return {
+            link_name: self.get_link_signature(self.robot.link_map[link_name], materials)
+            for link_name in self.kinematics.order
+            if self.robot.link_map[link_name].visuals
+        }
+
+    def store_metadata(self, signatures: Dict[str, str] = None) -> None:
+        """
+        Store what update_robot compares against on the armature and the link
+        objects. Link signatures are only stored with self.store_signatures,
+        an update of an import without them rebuilds every link.
+        """
+        if signatures is None and self.store_signatures:
+            signatures = self.get_link_signatures()
+        self.root[ROBOT_METADATA] = json.dumps(
+            {
+                "robot": self.robot.name,
+                "file_path": os.path.abspath(self.file_path),
+                "options": self.get_import_options(),
+                "arguments": self.get_update_arguments(),
+            }
+        )
+        for link_name, object in self.link_objects.items():
+            object[LINK_METADATA] = link_name
+            if signatures is None:
+                continue
+            if object.get(PROXY_METADATA):
+                object[SIGNATURE_METADATA] = PROXY_SIGNATURE_PREFIX + signatures[link_name]
+            else:
+                object[SIGNATURE_METADATA] = signatures[link_name]
+        return None
+
+    def get_update_arguments(self) -> Dict:
+        """Arguments of a RobotBuilder that updates this import with the same options, see load_full_meshes"""
+        return json.loads(json.dumps(self.update_arguments))
+
+    def create_materials(self, update_existing: bool = False) -> None:
+        material_names = set()
         for material in self.robot.materials:
             if material.color is not None and hasattr(material.color, "rgba"):
-                if bpy.data.materials.get(material.name):
+                mat: Material = bpy.data.materials.get(material.name)
+                if mat is not None and update_existing and material.name not in material_names:
+                    # Kept from the previous import, its color may have changed since
+                    mat.diffuse_color = material.color.rgba
+                elif mat is not None:
                     print("Material", material.name, "already exists")
                 else:
-                    mat: Material = bpy.data.materials.new(name=material.name)
+                    mat = bpy.data.materials.new(name=material.name)
                     mat.diffuse_color = material.color.rgba
+                material_names.add(material.name)
         return None
 
+    def get_abs_path(self, ros_package_index: RosPackageIndex, filename: str) -> str:
+        if filename.startswith("package:"):
+            rel_path: str = filename
+            while os.path.dirname(rel_path) != "package:":
+                rel_path = os.path.dirname(rel_path)
+            pkg_path = ros_package_index.get_path(os.path.basename(rel_path))
+            return os.path.dirname(pkg_path) + filename.replace("package://", "/")
+        if filename.startswith("file:///"):
+            return filename.replace("file://", "")
+        if filename.startswith("file://"):
+            return os.path.join(os.path.dirname(self.file_path), filename.replace("file://", ""))
+        return os.path.join(os.path.dirname(self.file_path), filename)
+
+    @profile_phase("resolve_packages")
     def configure_mesh_path(self) -> None:
+        ros_package_index = get_ros_package_index()
         link: Link
         for link in self.robot.links:
             visual: Visual
             for visual in link.visuals:
                 if hasattr(visual.geometry, "filename"):
-                    if visual.geometry.filename.startswith("package:"):
-                        rel_path: str = visual.geometry.filename
-                        while os.path.dirname(rel_path) != "package:":
-                            rel_path = os.path.dirname(rel_path)
-                        pkg_path = get_from_ros_pkg(rel_path)
-                        abs_path = os.path.dirname(pkg_path) + visual.geometry.filename.replace("package://", "/")
-                    else:
-                        if visual.geometry.filename.startswith("file:///"):
-                            abs_path = visual.geometry.filename.replace("file://", "")
-                        elif visual.geometry.filename.startswith("file://"):
-                            abs_path = os.path.join(os.path.dirname(self.file_path), visual.geometry.filename.replace("file://", ""))
-                        else:
-                            abs_path = os.path.join(os.path.dirname(self.file_path), visual.geometry.filename)
+                    abs_path = self.get_abs_path(ros_package_index, visual.geometry.filename)
                     print(abs_path)
                     if not os.path.exists(abs_path):
                         raise FileNotFoundError("File " + abs_path + " does not exist")
                     visual.geometry.filename = abs_path
+            if not self.proxy:
+                continue
+            # Proxies fall back to the collision geometry, which is optional, so a missing file is no error
+            for collision in link.collisions:
+                if getattr(collision.geometry, "filename", None):
+                    try:
+                        collision.geometry.filename = self.get_abs_path(ros_package_index, collision.geometry.filename)
+                    except RuntimeError as error:
+                        print("Collision mesh", collision.geometry.filename, "of", link.name, "is not resolved:", error)
+        return None
+
+    @profile_phase("kinematics")
+    def compute_kinematics(self) -> None:
+        """All link, joint and visual poses up front, build_link only consumes them"""
+        self.kinematics = RobotKinematics(self.robot, self.robot_root_name, self.scale_unit)
+        problems = self.kinematics.validate(self.robot)
+        if problems:
+            raise ValueError("Invalid robot kinematics: " + "; ".join(problems))
+        return None
+
+    def get_decode_paths(self) -> List[str]:
+        """STL files of the links to build that are not in the disk mesh cache"""
+        if not self.use_native_stl or self.proxy:
+            return []
+        file_paths = set()
+        for link_name in self.kinematics.order:
+            if not self.should_build(link_name):
+                continue
+            for file_path in self.get_link_file_paths(link_name):
+                if os.path.splitext(file_path)[1].lower() == ".stl":
+                    file_paths.add(file_path)
+        if self.disk_mesh_cache is not None:
+            file_paths = {
+                file_path
+                for file_path in file_paths
+                if not os.path.exists(
+                    self.disk_mesh_cache.get_entry_path(
+                        self.disk_mesh_cache.get_key(file_path, *self.get_mesh_options())
+                    )
+                )
+            }
+        return sorted(file_paths)
+
+    @profile_phase("decode_meshes")
+    def decode_meshes(self) -> None:
+        """Decode all STL files up front in worker processes, add_mesh then only creates the datablocks"""
+        self.decoded_meshes = read_stl_files(
+            self.get_decode_paths(), 1 / self.scale_unit, self.get_decode_weld_distance(), self.mesh_workers
+        )
+        return None
+
+    def get_decode_weld_distance(self) -> float:
+        """
+        Weld distance of the STL decoding. The NUMPY backend welds in the
+        decoding workers, BMESH and MODIFIER need Blender and weld on the main
+        thread in import_stl_file, the workers then only merge exact duplicates.
+        """
+        return self.weld_distance if self.apply_weld and self.weld_backend == "NUMPY" else 0.0
+
+    def start_decoding(self) -> None:
+        """Decode the STL files in the background, collect_decoded_meshes picks up the finished ones"""
+        file_paths = self.get_decode_paths()
+        if not file_paths:
+            return None
+        self.decode_queue = queue.Queue()
+        self.decode_executor, self.decode_futures = submit_stl_files(
+            file_paths, 1 / self.scale_unit, self.get_decode_weld_distance(), self.mesh_workers, self.decode_queue
+        )
+        self.pending_decodes = set(file_paths)
+        return None
+
+    def collect_decoded_meshes(self) -> None:
+        while self.pending_decodes:
+            try:
+                file_path, future = self.decode_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.pending_decodes.discard(file_path)
+            # A failed file is read again by import_stl_file, which raises its error
+            if not future.cancelled() and future.exception() is None:
+                self.decoded_meshes[file_path] = future.result()
+        return None
+
+    def is_link_decoded(self, link_name: str) -> bool:
+        return not any(file_path in self.pending_decodes for file_path in self.get_link_file_paths(link_name))
+
+    def stop_decoding(self) -> None:
+        if self.decode_executor is not None:
+            for future in self.decode_futures:
+                future.cancel()
+            self.decode_executor.shutdown(wait=False)
+        self.decode_executor = None
+        self.decode_futures = []
+        self.pending_decodes = set()
         return None
 
     def add_root_armature(self) -> None:
@@ -414,6 +989,215 @@ class RobotBuilder:
         bpy.context.scene.collection.objects.link(self.root)
         return None
 
+    def import_stl_file(self, file_path: str) -> Object:
+        arrays = self.decoded_meshes.pop(file_path, None)
+        if arrays is None:
+            arrays = read_stl(file_path, 1 / self.scale_unit, self.get_decode_weld_distance())
+        object_name = os.path.splitext(os.path.basename(file_path))[0]
+        object = bpy.data.objects.new(object_name, fill_mesh(bpy.data.meshes.new(object_name), arrays))
+        bpy.context.scene.collection.objects.link(object)
+        self.select_only(object)
+        if self.get_decode_weld_distance() > 0.0:
+            # Already welded while decoding
+            removed_count = int(arrays["welded_vertices"])
+            print("Weld removed", removed_count, "vertices of", object.name)
+            self.profiler.count("welded_vertices", removed_count)
+        else:
+            self.weld_mesh(object)
+        return object
+
+    def weld_mesh(self, object: Object) -> None:
+        if self.apply_weld:
+            with self.profiler.phase("weld"):
+                removed_count = weld_object(object, self.weld_backend, self.weld_distance)
+            print("Weld removed", removed_count, "vertices of", object.name)
+            self.profiler.count("welded_vertices", removed_count)
+        return None
+
+    @profile_phase("mesh_import")
+    def import_mesh_file(self, file_path: str) -> Object:
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext == ".stl" and self.use_native_stl:
+            return self.import_stl_file(file_path)
+        # Only the cameras and lights the importer adds are removed, an update keeps those of the scene
+        previous_cameras = set(bpy.data.cameras)
+        previous_lights = set(bpy.data.lights)
+        if file_ext == ".dae":
+            with self.profiler.phase("dae_preprocess"):
+                (file_path, _) = fix_up_axis_and_get_materials(file_path, self.unique_name)
+            bpy.ops.wm.collada_import(filepath=file_path)
+        elif file_ext == ".obj":
+            if "obj_import" in dir(bpy.ops.wm):
+                bpy.ops.wm.obj_import(filepath=file_path, up_axis='Z', forward_axis='Y', global_scale=1 / self.scale_unit)
+            elif "obj" in dir(bpy.ops.import_mesh):
+                bpy.ops.import_scene.obj(filepath=file_path, axis_forward="Y", axis_up="Z")
+            else:
+                print("OBJ import is not supported")
+                return None
+        elif file_ext == ".stl":
+            if "stl_import" in dir(bpy.ops.wm):
+                bpy.ops.wm.stl_import(filepath=file_path, up_axis='Z', forward_axis='Y', global_scale=1 / self.scale_unit)
+            elif "stl" in dir(bpy.ops.import_mesh):
+                bpy.ops.import_mesh.stl(filepath=file_path, global_scale=1 / self.scale_unit)
+            else:
+                print("STL import is not supported")
+                return None
+
+        else:
+            print("File extension", file_ext, "of", file_path, "is not supported")
+            return None
+        camera: Camera
+        for camera in [camera for camera in bpy.data.cameras if camera not in previous_cameras]:
+            bpy.data.cameras.remove(camera)
+        light: Light
+        for light in [light for light in bpy.data.lights if light not in previous_lights]:
+            bpy.data.lights.remove(light)
+        bpy.context.view_layer.objects.active = bpy.context.selected_objects[0]
+        if len(bpy.context.selected_objects) > 1:
+            bpy.ops.object.join()
+        if not bpy.context.object.data.uv_layers:
+            bpy.ops.mesh.uv_texture_add()
+        object = bpy.context.object
+        self.weld_mesh(object)
+        return object
+
+    def get_mesh_options(self) -> Tuple:
+        """Options that change the imported mesh data, part of the mesh cache keys"""
+        weld = (self.weld_backend, self.weld_distance) if self.apply_weld else None
+        # unique_name changes the file names of the staged textures that cached materials refer to
+        return (self.scale_unit, weld, self.use_native_stl, self.unique_name)
+
+    def load_mesh_file(self, mesh_name: str, file_path: str) -> Object:
+        if self.disk_mesh_cache is None:
+            return self.import_mesh_file(file_path)
+
+        cache_key = self.disk_mesh_cache.get_key(file_path, *self.get_mesh_options())
+        arrays = self.disk_mesh_cache.load(cache_key)
+        if arrays is not None:
+            object = object_from_arrays(mesh_name, arrays)
+            if object is not None:
+                self.select_only(object)
+                return object
+
+        object = self.import_mesh_file(file_path)
+        if object is not None:
+            self.disk_mesh_cache.store(cache_key, object_to_arrays(object))
+        return object
+
+    def select_only(self, object: Object) -> None:
+        for selected_object in bpy.context.selected_objects:
+            selected_object.select_set(False)
+        object.select_set(True)
+        bpy.context.view_layer.objects.active = object
+        return None
+
+    def get_mesh_key(self, file_path: str) -> Tuple[str, float, bool]:
+        return (file_path, self.scale_unit, self.apply_weld)
+
+    def count_mesh_uses(self, link_names: List[str]) -> None:
+        self.mesh_uses = {}
+        for link_name in link_names:
+            for visual in self.robot.link_map[link_name].visuals:
+                file_path = getattr(visual.geometry, "filename", None)
+                if file_path:
+                    mesh_key = self.get_mesh_key(file_path)
+                    self.mesh_uses[mesh_key] = self.mesh_uses.get(mesh_key, 0) + 1
+        return None
+
+    def add_cached_mesh(self, mesh_name: str, mesh_key: Tuple[str, float, bool]) -> Object:
+        # The object shows the cached mesh only until add_mesh_file gives it its own, see take_cached_mesh
+        mesh, matrix_basis = self.mesh_cache[mesh_key]
+        object = bpy.data.objects.new(mesh_name, mesh)
+        object.matrix_basis = matrix_basis
+        bpy.context.scene.collection.objects.link(object)
+        self.select_only(object)
+        return object
+
+    def take_cached_mesh(self, mesh_key: Tuple[str, float, bool], copy: bool = True) -> Mesh:
+        """
+        Count one more user of the cached mesh of mesh_key and return a copy of
+        it, or None without copy. The last user gets the cached mesh itself, or
+        removes it without copy, so no mesh outlives its last visual.
+        """
+        self.mesh_uses[mesh_key] -= 1
+        if self.mesh_uses[mesh_key] > 0:
+            return self.mesh_cache[mesh_key][0].copy() if copy else None
+        mesh, _ = self.mesh_cache.pop(mesh_key)
+        if copy:
+            return mesh
+        bpy.data.meshes.remove(mesh)
+        return None
+
+    def clear_mesh_cache(self) -> None:
+        for mesh, _ in self.mesh_cache.values():
+            bpy.data.meshes.remove(mesh)
+        self.mesh_cache.clear()
+        self.mesh_uses.clear()
+        # Shared meshes belong to their link objects
+        self.shared_meshes.clear()
+        return None
+
+    def add_mesh_file(
+        self,
+        mesh_name: str,
+        material: Material,
+        file_path: str,
+        location: Vector,
+        rotation: Euler,
+        scale: Vector,
+        link_pos: Vector,
+        link_rot: Euler,
+        shareable: bool,
+    ) -> Object:
+        """
+        Add the object of a mesh file visual. A file used by several visuals
+        is loaded once and copied from self.mesh_cache. A shareable visual,
+        i.e. the only one of its link, whose mesh needs no baking as it has no
+        scale and no origin offset, links the mesh of the first such visual
+        of the same file and material instead of a copy.
+        """
+        mesh_key = self.get_mesh_key(file_path)
+        is_cached = mesh_key in self.mesh_cache
+        if is_cached:
+            object = self.add_cached_mesh(mesh_name, mesh_key)
+        else:
+            object = self.load_mesh_file(mesh_name, file_path)
+            if object is None:
+                return None
+            self.mesh_uses[mesh_key] = self.mesh_uses.get(mesh_key, 1) - 1
+            if self.mesh_uses[mesh_key] > 0:
+                self.mesh_cache[mesh_key] = (object.data.copy(), object.matrix_basis.copy())
+        object.name = mesh_name
+        self.set_visual_transform(object, location, rotation, scale)
+
+        with self.profiler.phase("bake_transform"):
+            bake_matrix = None if self.use_transform_operators else self.get_bake_matrix(object, link_pos)
+            shared_key = None
+            if shareable and bake_matrix is not None and is_identity(bake_matrix):
+                shared_key = (mesh_key, material.name if material is not None else "")
+            shared_mesh = self.shared_meshes.get(shared_key)
+            if shared_mesh is not None:
+                mesh = object.data
+                object.data = shared_mesh
+                if is_cached:
+                    self.take_cached_mesh(mesh_key, copy=False)
+                else:
+                    bpy.data.meshes.remove(mesh)
+                return object
+
+            if is_cached:
+                object.data = self.take_cached_mesh(mesh_key)
+            if material is not None:
+                object.data.materials.append(material)
+            if shared_key is not None:
+                self.shared_meshes[shared_key] = object.data
+            elif bake_matrix is None:
+                self.bake_transform_with_operators(link_pos, link_rot)
+            else:
+                self.bake_mesh(object.data, bake_matrix)
+        return object
+
+    @profile_phase("add_mesh")
     def add_mesh(
         self,
         mesh_name: str,
@@ -424,6 +1208,7 @@ class RobotBuilder:
         scale=Vector((1, 1, 1)),
         link_pos=Vector(),
         link_rot=Euler(),
+        shareable: bool = False,
     ) -> Object:
         if isinstance(file_path, list):
             if file_path[0] == "cylinder":
@@ -446,52 +1231,7 @@ class RobotBuilder:
             object.data.materials.append(material)
 
         elif file_path:
-            file_ext = os.path.splitext(file_path)[1].lower()
-            if file_ext == ".dae":
-                (file_path, _) = fix_up_axis_and_get_materials(file_path, self.unique_name)
-                bpy.ops.wm.collada_import(filepath=file_path)
-            elif file_ext == ".obj":
-                if "obj_import" in dir(bpy.ops.wm):
-                    bpy.ops.wm.obj_import(filepath=file_path, up_axis='Z', forward_axis='Y', global_scale=1 / self.scale_unit)
-                elif "obj" in dir(bpy.ops.import_mesh):
-                    bpy.ops.import_scene.obj(filepath=file_path, axis_forward="Y", axis_up="Z")
-                else:
-                    print("OBJ import is not supported")
-                    return None
-            elif file_ext == ".stl":
-                if "stl_import" in dir(bpy.ops.wm):
-                    bpy.ops.wm.stl_import(filepath=file_path, up_axis='Z', forward_axis='Y', global_scale=1 / self.scale_unit)
-                elif "stl" in dir(bpy.ops.import_mesh):
-                    bpy.ops.import_mesh.stl(filepath=file_path, global_scale=1 / self.scale_unit)
-                else:
-                    print("STL import is not supported")
-                    return None
-
-            else:
-                print("File extension", file_ext, "of", file_path, "is not supported")
-                return None
-            camera: Camera
-            for camera in bpy.data.cameras:
-                bpy.data.cameras.remove(camera)
-            light: Light
-            for light in bpy.data.lights:
-                bpy.data.lights.remove(light)
-            bpy.context.view_layer.objects.active = bpy.context.selected_objects[0]
-            if len(bpy.context.selected_objects) > 1:
-                bpy.ops.object.join()
-            if not bpy.context.object.data.uv_layers:
-                bpy.ops.mesh.uv_texture_add()
-            object = bpy.context.object
-            if self.apply_weld:
-                object.modifiers.new("Weld", "WELD")
-                # Modifiers cannot be applied to
-                # multi-user data, so we make it single.
-                bpy.ops.object.make_single_user(
-                    object=True, obdata=True, material=False,
-                    animation=False, obdata_animation=False)
-                bpy.ops.object.modifier_apply(modifier="Weld")
-            if material is not None:
-                object.data.materials.append(material)
+            return self.add_mesh_file(mesh_name, material, file_path, location, rotation, scale, link_pos, link_rot, shareable)
 
         else:
             mesh = bpy.data.meshes.new(mesh_name)
@@ -500,12 +1240,56 @@ class RobotBuilder:
             bpy.context.scene.collection.objects.link(object)
 
         object.name = mesh_name
+        self.set_visual_transform(object, location, rotation, scale)
+
+        with self.profiler.phase("bake_transform"):
+            if self.use_transform_operators:
+                self.bake_transform_with_operators(link_pos, link_rot)
+            else:
+                self.bake_transform(object, link_pos)
+
+        return object
+
+    def set_visual_transform(self, object: Object, location: Vector, rotation: Euler, scale: Vector) -> None:
         object.rotation_mode = "XYZ"
         object.rotation_euler.rotate(rotation)
         object.location.rotate(rotation)
         object.location += location
         object.scale *= scale
+        return None
 
+    def get_bake_matrix(self, object: Object, link_pos: Vector) -> Matrix:
+        """Move object to link_pos with unit scale and return the matrix that keeps its mesh in place, see bake_mesh"""
+        matrix = object.matrix_basis.copy()
+        object.location = link_pos
+        object.scale = (1.0, 1.0, 1.0)
+        return object.matrix_basis.inverted() @ matrix
+
+    def bake_transform(self, object: Object, link_pos: Vector) -> None:
+        """
+        Same result as bake_transform_with_operators without operators: the
+        origin offset and the scale go into the mesh with one transform, the
+        object keeps its rotation at link_pos with unit scale.
+        """
+        self.bake_mesh(object.data, self.get_bake_matrix(object, link_pos))
+        return None
+
+    def bake_mesh(self, mesh: Mesh, bake_matrix: Matrix) -> None:
+        mesh.transform(bake_matrix)
+        if bake_matrix.determinant() < 0:
+            # Mirrored faces point inwards unless their winding is reversed too
+            if hasattr(mesh, "flip_normals"):
+                mesh.flip_normals()
+            else:
+                bm = bmesh.new()
+                bm.from_mesh(mesh)
+                bmesh.ops.reverse_faces(bm, faces=bm.faces)
+                bm.to_mesh(mesh)
+                bm.free()
+        mesh.update()
+        return None
+
+    def bake_transform_with_operators(self, link_pos: Vector, link_rot: Euler) -> None:
         selected_object = bpy.context.object
         if selected_object.scale[0] * selected_object.scale[1] * selected_object.scale[2] < 0:
             bpy.ops.object.mode_set(mode="EDIT")
@@ -524,43 +1308,17 @@ class RobotBuilder:
         # object.scale *= 100
         bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
         # object.scale /= 100
-
-        return object
-
-    def set_link_origin(self, link: Link) -> None:
-        if hasattr(link, "origin") and link.origin is not None:
-            self.link_pose[link.name][0][:] = self.link_pose[link.name][0] + Vector(link.origin.xyz) / self.scale_unit
-            self.link_pose[link.name][1].rotate(Euler(link.origin.rpy))
         return None
 
     def add_root_bone(self, link_name: str, bone_name: str) -> None:
-        bpy.context.view_layer.objects.active = self.root
-        bpy.ops.object.mode_set(mode="EDIT", toggle=False)
-
-        head = self.link_pose[link_name][0]
+        head, rot = matrix_to_pose(self.kinematics.link_matrices[link_name])
         tail = Vector((0.0, 0.1 / self.scale_unit, 0.0))
-        tail.rotate(self.link_pose[link_name][1])
+        tail.rotate(rot)
         tail += head
-        bone: Bone = self.root.data.edit_bones.new(bone_name)
-        bone.head = head
-        bone.tail = tail
-        bpy.ops.object.mode_set(mode="OBJECT")
+        self.bone_specs.append((bone_name, head, tail, None))
         return None
 
-    def add_link_origin(self, pos: Vector, rot: Euler, tag: Union[Link, Joint, Visual]) -> Tuple[Vector, Euler]:
-        if hasattr(tag, "origin") and tag.origin is not None:
-            pos_out = Vector(tag.origin.xyz) / self.scale_unit
-            pos_out.rotate(rot)
-            pos_out += pos
-            rot_out = Euler(tag.origin.rpy)
-            rot_out.rotate(rot)
-            return (pos_out, rot_out)
-        else:
-            return (pos, rot)
-
-    def get_link_data(self, link_pos: Vector, link_rot: Euler, link: Link, visual: Visual):
-        visual_pos, visual_rot = self.add_link_origin(link_pos, link_rot, visual)
-
+    def get_link_data(self, link: Link, visual: Visual):
         if hasattr(visual.geometry, "filename") and visual.geometry.filename:
             file_path = visual.geometry.filename
             mesh_name: str = link.name + "." + os.path.basename(file_path)
@@ -597,11 +1355,10 @@ class RobotBuilder:
         else:
             material = None
 
-        return (mesh_name, file_path, visual_pos, visual_rot, scale, material)
+        return (mesh_name, file_path, scale, material)
 
     def bind_mesh_to_bone(self, mesh_name: str, bone_name: str) -> None:
-        bpy.ops.object.mode_set(mode="POSE")
-
+        # Must be called in POSE mode of the root armature, see bind_meshes
         object = bpy.context.scene.objects.get(mesh_name)
         object.select_set(True)
         self.arm_bones.active = self.arm_bones[bone_name]
@@ -611,153 +1368,260 @@ class RobotBuilder:
         object.select_set(False)
         if bpy.app.version < (5, 0, 0):
             self.arm_bones[bone_name].select = False
+        return None
 
-        bpy.ops.object.mode_set(mode="OBJECT")
+    def parent_mesh_to_bone(self, mesh_name: str, bone_name: str) -> None:
+        # Same result as parent_set(type="BONE") in rest pose, without operator context:
+        # a bone parent acts from the bone tail, so the inverse cancels that matrix
+        object = bpy.context.scene.objects.get(mesh_name)
+        bone: Bone = self.arm_bones[bone_name]
+        parent_matrix = self.root.matrix_world @ bone.matrix_local @ Matrix.Translation((0.0, bone.length, 0.0))
+
+        object.parent = self.root
+        object.parent_type = "BONE"
+        object.parent_bone = bone_name
+        object.matrix_parent_inverse = parent_matrix.inverted()
         return None
 
     def add_bone(self, link: Link, joint: Joint, joint_pos: Vector, joint_rot: Euler, bone_name: str) -> None:
-        bpy.context.view_layer.objects.active = self.root
-        bpy.ops.object.mode_set(mode="EDIT", toggle=False)
-
-        head = joint_pos
+        head = joint_pos.copy()
         tail = Vector((0.0, 0.0, 0.1 / self.scale_unit))
         if hasattr(joint, "axis") and joint.axis is not None and Vector(joint.axis).magnitude != 0:
             tail = Vector(joint.axis).normalized() * 0.1 / self.scale_unit
         tail.rotate(joint_rot)
 
-        bone: Bone = self.root.data.edit_bones.new(bone_name)
-        bone.head = head
-        bone.tail = head + tail
-
         if self.robot.parent_map[link.name][1] == self.robot_root_name:
-            bone.parent = self.root.data.edit_bones["root" + self.bone_tail]
+            parent_name = "root" + self.bone_tail
         else:
             parent_joint = self.robot.parent_map[self.robot.parent_map[link.name][1]][0]
-            parent_joint_name = parent_joint + "." + str(self.robot.joint_map[parent_joint].type) + self.bone_tail
-            bone.parent = self.root.data.edit_bones[parent_joint_name]
+            parent_name = parent_joint + "." + str(self.robot.joint_map[parent_joint].type) + self.bone_tail
 
-        bpy.ops.object.mode_set(mode="OBJECT")
+        self.bone_specs.append((bone_name, head, head + tail, parent_name))
         return None
 
-    def build_root(self) -> None:
-        root_link: Link = self.robot.link_map[self.robot_root_name]
-        self.link_pose[root_link.name] = (Vector(), Euler())
-        self.set_link_origin(root_link)
+    @profile_phase("bones")
+    def build_bones(self) -> None:
+        """
+        Create all bones collected by add_root_bone and add_bone in a single
+        edit session. Bones of a previous import are moved and bones no longer
+        in the robot are removed; without changes edit mode is skipped.
+        """
+        bone_names = {bone_name for bone_name, _, _, _ in self.bone_specs}
+        if not self.get_changed_bones() and all(bone.name in bone_names for bone in self.arm_bones):
+            return None
 
-        if root_link.visuals:
-            objects = []
-            visual: Visual
-            for visual in root_link.visuals:
-                mesh_name, file_path, visual_pos, visual_rot, scale, material = self.get_link_data(
-                    self.link_pose[root_link.name][0], self.link_pose[root_link.name][1], root_link, visual
-                )
+        bpy.context.view_layer.objects.active = self.root
+        bpy.ops.object.mode_set(mode="EDIT", toggle=False)
 
-                pos_tmp = self.link_pose[root_link.name][0].copy()
-                pos_tmp.rotate(self.link_pose[root_link.name][1])
-                visual_pos += pos_tmp
-
-                rot_tmp = self.link_pose[root_link.name][1].copy()
-                rot_tmp.rotate(visual_rot)
-                visual_rot = rot_tmp
-
-                object = self.add_mesh(
-                    mesh_name,
-                    material,
-                    file_path,
-                    visual_pos,
-                    visual_rot,
-                    scale,
-                    self.link_pose[root_link.name][0],
-                    self.link_pose[root_link.name][1],
-                )
-                objects.append(object)
+        edit_bones = self.root.data.edit_bones
+        for bone in list(edit_bones):
+            if bone.name not in bone_names:
+                edit_bones.remove(bone)
+        for bone_name, head, tail, _ in self.bone_specs:
+            bone: Bone = edit_bones.get(bone_name)
+            if bone is None:
+                bone = edit_bones.new(bone_name)
+            bone.head = head
+            bone.tail = tail
+        for bone_name, _, _, parent_name in self.bone_specs:
+            if parent_name is not None:
+                edit_bones[bone_name].parent = edit_bones[parent_name]
 
-            for object in objects:
-                object.select_set(True)
+        bpy.ops.object.mode_set(mode="OBJECT")
+        return None
 
-            if len(bpy.context.selected_objects) > 1:
-                bpy.context.view_layer.objects.active = bpy.context.selected_objects[0]
-                bpy.ops.object.join()
+    def get_changed_bones(self) -> List[str]:
+        """Names of the bones in bone_specs that do not exist yet or differ from the armature"""
+        changed_bones = []
+        for bone_name, head, tail, parent_name in self.bone_specs:
+            bone: Bone = self.arm_bones.get(bone_name)
+            if (
+                bone is None
+                or (bone.head_local - head).length > 1e-5
+                or (bone.tail_local - tail).length > 1e-5
+                or (bone.parent.name if bone.parent is not None else None) != parent_name
+            ):
+                changed_bones.append(bone_name)
+        return changed_bones
+
+    @profile_phase("parenting")
+    def bind_meshes(self) -> None:
+        """Parent all link meshes to their bones in a single pass"""
+        if not self.mesh_bones:
+            return None
+        if not self.use_parent_operator:
+            for mesh_name, bone_name in self.mesh_bones:
+                self.parent_mesh_to_bone(mesh_name, bone_name)
+            return None
 
-            bone_name = self.root_name + self.bone_tail
-            self.add_root_bone(root_link.name, bone_name)
+        bpy.context.view_layer.objects.active = self.root
+        bpy.ops.object.mode_set(mode="POSE")
+        for mesh_name, bone_name in self.mesh_bones:
+            self.bind_mesh_to_bone(mesh_name, bone_name)
+        bpy.ops.object.mode_set(mode="OBJECT")
+        return None
 
-            objects[0].name = root_link.name
-            self.bind_mesh_to_bone(root_link.name, bone_name)
+    def join_objects(self, objects: List[Object]) -> Object:
+        for object in bpy.context.selected_objects:
+            object.select_set(False)
+        for object in objects:
+            object.select_set(True)
+
+        bpy.context.view_layer.objects.active = objects[0]
+        if len(objects) > 1:
+            bpy.ops.object.join()
+        objects[0].select_set(False)
+        return objects[0]
+
+    def build_link_meshes(self, link: Link) -> Object:
+        """Add the visuals of link at their precomputed poses and join them into one object"""
+        if not link.visuals:
+            return None
+        if self.proxy:
+            return self.build_link_proxy(link)
+        link_start = time.perf_counter()
+        link_pos, link_rot = matrix_to_pose(self.kinematics.link_matrices[link.name])
+        objects = []
+        visual: Visual
+        for visual, visual_matrix in zip(link.visuals, self.kinematics.visual_matrices[link.name]):
+            mesh_name, file_path, scale, material = self.get_link_data(link, visual)
+            visual_pos, visual_rot = matrix_to_pose(visual_matrix)
+            # A visual alone in its link is never joined, so other links may share its mesh
+            shareable = len(link.visuals) == 1
+            object = self.add_mesh(mesh_name, material, file_path, visual_pos, visual_rot, scale, link_pos, link_rot, shareable)
+            objects.append(object)
+
+        object = self.join_objects(objects)
+        self.progress["meshes"] += len(objects)
+        self.profiler.add_link(link.name, time.perf_counter() - link_start, len(objects), len(object.data.vertices))
+        object.name = link.name
+        return object
 
+    def get_geometry_bounds(self, geometry) -> numpy.ndarray:
+        """(2, 3) bounds of a URDF geometry in scene units and its own frame, without its scale, None if unknown"""
+        file_path = getattr(geometry, "filename", None)
+        if file_path:
+            bounds = get_mesh_bounds(file_path, self.proxy_sample_count) if os.path.exists(file_path) else None
+            return bounds / self.scale_unit if bounds is not None else None
+        if hasattr(geometry, "length") and hasattr(geometry, "radius"):
+            half_size = numpy.array([geometry.radius, geometry.radius, geometry.length / 2])
+        elif hasattr(geometry, "size"):
+            half_size = numpy.array(geometry.size) / 2
+        elif hasattr(geometry, "radius"):
+            half_size = numpy.full(3, geometry.radius)
         else:
-            bone_name = self.root_name + self.bone_tail
-            self.add_root_bone(root_link.name, bone_name)
+            return None
+        return numpy.stack([-half_size, half_size]) / self.scale_unit
+
+    def get_geometry_matrix(self, matrix: numpy.ndarray, geometry) -> numpy.ndarray:
+        scale = getattr(geometry, "scale", None)
+        if not scale:
+            return matrix
+        return matrix @ numpy.diag(list(scale) + [1.0])
+
+    def get_proxy_boxes(self, link: Link) -> List[Tuple[numpy.ndarray, numpy.ndarray, Visual]]:
+        """
+        (world matrix, bounds, visual) of the boxes standing in for the visuals
+        of link. Visuals whose mesh bounds can not be read cheaply, e.g. COLLADA
+        files, are replaced by the collision geometry of the link, or by a
+        marker box if that is unknown too.
+        """
+        boxes = []
+        unknown_visuals = []
+        visual: Visual
+        for visual, visual_matrix in zip(link.visuals, self.kinematics.visual_matrices[link.name]):
+            bounds = self.get_geometry_bounds(visual.geometry)
+            if bounds is not None:
+                boxes.append((self.get_geometry_matrix(visual_matrix, visual.geometry), bounds, visual))
+            else:
+                unknown_visuals.append((visual, visual_matrix))
+        if not unknown_visuals:
+            return boxes
+
+        link_matrix = self.kinematics.link_matrices[link.name]
+        collisions = [collision for collision in link.collisions if collision.geometry is not None]
+        collision_bounds = [self.get_geometry_bounds(collision.geometry) for collision in collisions]
+        if collisions and all(bounds is not None for bounds in collision_bounds):
+            collision_matrices = link_matrix @ get_origin_matrices(collisions, self.scale_unit)
+            # The collision boxes take the material of the first visual they stand in for
+            for collision, collision_matrix, bounds in zip(collisions, collision_matrices, collision_bounds):
+                boxes.append((self.get_geometry_matrix(collision_matrix, collision.geometry), bounds, unknown_visuals[0][0]))
+            return boxes
+
+        half_size = PROXY_MARKER_SIZE / 2 / self.scale_unit
+        for visual, visual_matrix in unknown_visuals:
+            print("Bounds of a visual of", link.name, "are unknown, adding a marker box")
+            boxes.append((visual_matrix, numpy.array([[-half_size] * 3, [half_size] * 3]), visual))
+        return boxes
+
+    @profile_phase("proxy")
+    def build_link_proxy(self, link: Link) -> Object:
+        """Add one box per visual of link instead of its meshes, placed at the link pose"""
+        link_start = time.perf_counter()
+        link_matrix = self.kinematics.link_matrices[link.name]
+        inverse_link_matrix = numpy.linalg.inv(link_matrix)
+        boxes = []
+        materials = []
+        material_indices = []
+        for matrix, bounds, visual in self.get_proxy_boxes(link):
+            material = self.get_link_data(link, visual)[3]
+            if material not in materials:
+                materials.append(material)
+            boxes.append((inverse_link_matrix @ matrix, bounds))
+            material_indices.append(materials.index(material))
+
+        mesh = fill_mesh(bpy.data.meshes.new(link.name), boxes_to_arrays(boxes, material_indices))
+        for material in materials:
+            mesh.materials.append(material)
+        object = bpy.data.objects.new(link.name, mesh)
+        object.matrix_world = Matrix(link_matrix.tolist())
+        object[PROXY_METADATA] = True
+        bpy.context.scene.collection.objects.link(object)
+
+        self.progress["meshes"] += len(link.visuals)
+        self.profiler.add_link(link.name, time.perf_counter() - link_start, len(link.visuals), len(mesh.vertices))
+        return object
 
-        self.parent_links = [root_link]
+    @profile_phase("lods")
+    def build_lods(self) -> None:
+        """Add the LODs of the links built by this import, lod_errors are in meters"""
+        objects = [object for link_name, object in self.link_objects.items() if self.build_links is None or link_name in self.build_links]
+        lod_errors = [error / self.scale_unit for error in self.lod_errors] if self.lod_errors else None
+        self.lod_triangles = generate_lods(objects, self.lod_ratios, lod_errors)
+        for object_name, triangle_counts in self.lod_triangles.items():
+            print("LODs of", object_name, "have", " -> ".join(str(triangle_count) for triangle_count in triangle_counts), "triangles")
+            self.profiler.count("lod_triangles", sum(triangle_counts[1:]))
         return None
 
-    def build_chain(self) -> None:
-        while self.robot.child_map:
-            if self.ignore_root and len(self.robot.child_map) == 1:
-                break
-            # Make new parent links
-            links = self.parent_links
-
-            # Iterate through all parent links
-            for link in links:
-                self.set_link_origin(link)
-
-                # Iterate through all children of parent link
-                if self.robot.child_map.get(link.name):
-                    for child_map in self.robot.child_map[link.name]:
-                        child_pos = self.link_pose[link.name][0].copy()
-                        child_rot = self.link_pose[link.name][1].copy()
-
-                        child_joint = self.robot.joint_map[child_map[0]]
-                        child_pos, child_rot = self.add_link_origin(child_pos, child_rot, child_joint)
-                        joint_pos = child_pos.copy()
-                        joint_rot = child_rot.copy()
-
-                        child_link = self.robot.link_map[child_map[1]]
-                        child_pos, child_rot = self.add_link_origin(child_pos, child_rot, child_link)
-
-                        self.link_pose[child_link.name] = (child_pos, child_rot)
-
-                        if child_link.visuals:
-                            visual: Visual
-                            objects = []
-                            for visual in child_link.visuals:
-                                mesh_name, file_path, visual_pos, visual_rot, scale, material = self.get_link_data(
-                                    child_pos, child_rot, child_link, visual
-                                )
-                                object = self.add_mesh(
-                                    mesh_name,
-                                    material,
-                                    file_path,
-                                    visual_pos,
-                                    visual_rot,
-                                    scale,
-                                    self.link_pose[child_link.name][0],
-                                    self.link_pose[child_link.name][1],
-                                )
-                                objects.append(object)
-
-                            for object in objects:
-                                object.select_set(True)
-
-                            if len(bpy.context.selected_objects) > 1:
-                                bpy.context.view_layer.objects.active = bpy.context.selected_objects[0]
-                                bpy.ops.object.join()
-
-                            bone_name = child_joint.name + "." + str(child_joint.type) + self.bone_tail
-                            self.add_bone(child_link, child_joint, joint_pos, joint_rot, bone_name)
-
-                            objects[0].name = child_link.name
-                            self.bind_mesh_to_bone(child_link.name, bone_name)
-                        else:
-                            bone_name = child_joint.name + "." + str(child_joint.type) + self.bone_tail
-                            self.add_bone(child_link, child_joint, child_pos, child_rot, bone_name)
-
-                        self.parent_links.append(child_link)
-
-                    del self.robot.child_map[link.name]
-
-                # Remove finish link from parent links
-                self.parent_links.remove(link)
+    def build_link(self, link_name: str) -> None:
+        """Collect the bone of link_name and build its mesh object, if the link is to be built"""
+        link: Link = self.robot.link_map[link_name]
+        object = self.build_link_meshes(link) if self.should_build(link_name) else None
+        if object is not None:
+            self.link_objects[link_name] = object
+
+        if link_name == self.robot_root_name:
+            bone_name = self.root_name + self.bone_tail
+            self.add_root_bone(link_name, bone_name)
+        else:
+            joint: Joint = self.robot.joint_map[self.kinematics.parent_joints[link_name]]
+            bone_name = joint.name + "." + str(joint.type) + self.bone_tail
+            if link.visuals:
+                joint_pos, joint_rot = matrix_to_pose(self.kinematics.joint_matrices[joint.name])
+                self.add_bone(link, joint, joint_pos, joint_rot, bone_name)
+            else:
+                # A link without visuals has always started its bone at the link frame
+                link_pos, link_rot = matrix_to_pose(self.kinematics.link_matrices[link_name])
+                self.add_bone(link, joint, link_pos, link_rot, bone_name)
+        self.link_bones[link_name] = bone_name
         return None
+
+
+def load_full_meshes(root: Object, link_names: List[str] = None) -> RobotBuilder:
+    """
+    Replace the proxies of link_names, or of all links, of the robot imported
+    as root with their full meshes. The robot is imported again in update
+    mode with the arguments of its previous import.
+    """
+    metadata = json.loads(root[ROBOT_METADATA])
+    return RobotBuilder(metadata["file_path"], update=True, load_links=link_names, **metadata["arguments"])
@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+"""
+Keep a background Blender running and convert URDF files on request.
+
+Usage: blender --background --python scripts/urdf_worker.py -- [--port 8765 | --socket PATH]
+
+Clients connect over localhost TCP or a Unix socket and send one JSON job
+per line, e.g. {"command": "convert", "urdf": "robot.urdf", "fbx": "robot.fbx", "options": {...}}.
+The options are those of batch.import_robot. For every job the server
+answers with JSON lines, ending with a line whose status is "succeeded"
+or "failed".
+
+Commands:
+- convert: import "urdf", export it to "fbx" and clear the scene
+- import: import "urdf" and keep the scene for following jobs
+- export: export the current scene to "fbx"
+- ping: answer {"status": "succeeded"}
+- shutdown: stop the server
+
+Exports of "convert" and "export" are skipped when the manifest next to
+"fbx" shows no change, unless the job sets "force": true. Textures are
+processed with the "texture_options", the arguments of TextureProcessor.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+import traceback
+from typing import Callable, Dict, List
+
+import bpy
+
+from .batch import get_scene_counts, import_robot, reset_scene
+from .fbx_exporter import export_fbx
+from .textures import TextureProcessor
+from .robot_builder import clear_data
+
+DEFAULT_PORT = 8765
+
+
+def release_scene() -> None:
+    """Clear the scene between jobs, so memory does not grow with every robot"""
+    reset_scene()
+    clear_data(bpy.data, bpy.context.scene.unit_settings.scale_length)
+    if hasattr(bpy.data, "orphans_purge"):
+        bpy.data.orphans_purge(do_recursive=True)
+    return None
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    def send(self, message: Dict) -> None:
+        self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.wfile.flush()
+        return None
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as error:
+                self.send({"status": "failed", "error": "Invalid job: %r" % error})
+                continue
+            job_server: JobServer = self.server.job_server
+            job_server.run_job(job, self.send)
+            if job_server.stopped:
+                break
+        return None
+
+
+class TCPServer(socketserver.TCPServer):
+    # Restarting the worker should not wait for the old socket to time out
+    allow_reuse_address = True
+
+
+class JobServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, socket_path: str = None):
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.server = socketserver.UnixStreamServer(socket_path, JobHandler)
+        else:
+            self.server = TCPServer((host, port), JobHandler)
+        self.server.job_server = self
+        self.stopped = False
+        self.socket_path = socket_path
+        self.job_count = 0
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def serve(self) -> None:
+        # Jobs run on Blender's main thread, one connection at a time, since bpy is not thread safe
+        print("URDF worker listening on", self.address)
+        try:
+            while not self.stopped:
+                self.server.handle_request()
+        finally:
+            self.server.server_close()
+            if self.socket_path is not None and os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        return None
+
+    def run_job(self, job: Dict, send: Callable[[Dict], None]) -> None:
+        self.job_count += 1
+        command = job.get("command", "convert")
+        result = {"job": self.job_count, "command": command, "status": "failed"}
+        send({"job": self.job_count, "command": command, "status": "started"})
+        start = time.perf_counter()
+        try:
+            if command == "ping":
+                pass
+            elif command == "shutdown":
+                self.stopped = True
+            elif command in ("convert", "import"):
+                reset_scene()
+                import_start = time.perf_counter()
+                robot_builder = import_robot(job["urdf"], job.get("options", {}))
+                result["import_time"] = time.perf_counter() - import_start
+                if robot_builder.profiler.enabled:
+                    result["profile"] = robot_builder.profiler.to_dict()
+                result["counts"] = get_scene_counts()
+                send({"job": self.job_count, "status": "imported", "import_time": result["import_time"]})
+            elif command != "export":
+                raise ValueError("Unknown command %s" % command)
+
+            if command in ("convert", "export"):
+                os.makedirs(os.path.dirname(os.path.abspath(job["fbx"])), exist_ok=True)
+                export_start = time.perf_counter()
+                texture_processor = TextureProcessor(**job.get("texture_options", {}))
+                result["export"] = export_fbx(job["fbx"], job.get("force", False), texture_processor)
+                result["export_time"] = time.perf_counter() - export_start
+                send({"job": self.job_count, "status": "exported", "export_time": result["export_time"]})
+            result["status"] = "succeeded"
+        except Exception as error:
+            result["error"] = repr(error)
+            result["traceback"] = traceback.format_exc()
+        finally:
+            if command == "convert" or (command == "import" and result["status"] == "failed"):
+                release_scene()
+        result["time"] = time.perf_counter() - start
+        send(result)
+        return None
+
+
+def main(argv: List[str] = None) -> int:
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="urdf_worker", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    if hasattr(socket, "AF_UNIX"):
+        parser.add_argument("--socket", dest="socket_path", help="Listen on a Unix socket instead of TCP")
+    args = parser.parse_args(argv)
+
+    JobServer(args.host, args.port, getattr(args, "socket_path", None)).serve()
+    return 0
@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+
+# Only NumPy is used here, so meshes can be decoded outside of Blender's main thread
+
+import multiprocessing
+import os
+import queue
+import sys
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy
+
+STL_HEADER_SIZE = 84
+STL_TRIANGLE_DTYPE = numpy.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+
+
+def is_binary_stl(file_path: str) -> bool:
+    file_size = os.path.getsize(file_path)
+    if file_size < STL_HEADER_SIZE:
+        return False
+    with open(file_path, "rb") as file:
+        header = file.read(STL_HEADER_SIZE)
+    triangle_count = int(numpy.frombuffer(header, dtype="<u4", count=1, offset=80)[0])
+    # Binary files may also start with "solid", so trust the size first
+    if file_size == STL_HEADER_SIZE + triangle_count * STL_TRIANGLE_DTYPE.itemsize:
+        return True
+    return not header.lstrip().startswith(b"solid")
+
+
+def read_binary_stl_triangles(file_path: str) -> numpy.ndarray:
+    triangle_count = (os.path.getsize(file_path) - STL_HEADER_SIZE) // STL_TRIANGLE_DTYPE.itemsize
+    if triangle_count == 0:
+        return numpy.empty((0, 3), dtype=numpy.float32)
+    triangles = numpy.memmap(file_path, dtype=STL_TRIANGLE_DTYPE, mode="r", offset=STL_HEADER_SIZE, shape=(triangle_count,))
+    return numpy.array(triangles["vertices"], dtype=numpy.float32).reshape(-1, 3)
+
+
+def read_ascii_stl_triangles(file_path: str) -> numpy.ndarray:
+    with open(file_path, "rb") as file:
+        tokens = numpy.array(file.read().split())
+    vertex_ids = numpy.flatnonzero(tokens == b"vertex")
+    coordinates = tokens[vertex_ids[:, None] + numpy.arange(1, 4)]
+    return coordinates.astype(numpy.float32).reshape(-1, 3)
+
+
+def get_cell_pairs(cell_ids: numpy.ndarray, neighbour_cells: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Index pairs (i, j) of points sorted by cell_ids, with j in the neighbour
+    cell of the cell of i, or, where neighbour_cells is None, with i < j in
+    the same cell. Cells without neighbour have -1 in neighbour_cells.
+    """
+    cell_count = len(neighbour_cells) if neighbour_cells is not None else cell_ids[-1] + 1
+    cell_starts = numpy.searchsorted(cell_ids, numpy.arange(cell_count))
+    cell_counts = numpy.bincount(cell_ids, minlength=cell_count)
+    if neighbour_cells is None:
+        point_ids = numpy.arange(len(cell_ids))
+        # Partners of a point are the points after it in its cell
+        pair_starts = point_ids + 1
+        pair_counts = cell_starts[cell_ids] + cell_counts[cell_ids] - pair_starts
+    else:
+        point_neighbours = neighbour_cells[cell_ids]
+        point_ids = numpy.flatnonzero(point_neighbours >= 0)
+        pair_starts = cell_starts[point_neighbours[point_ids]]
+        pair_counts = cell_counts[point_neighbours[point_ids]]
+    firsts = numpy.repeat(point_ids, pair_counts)
+    pair_offsets = numpy.cumsum(pair_counts) - pair_counts
+    seconds = numpy.repeat(pair_starts - pair_offsets, pair_counts) + numpy.arange(pair_counts.sum())
+    return firsts, seconds
+
+
+def get_close_pairs(positions: numpy.ndarray, distance: float) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Index pairs (i, j), i < j, of positions at most distance apart. Such
+    positions lie in the same or in neighbouring grid cells of size distance,
+    so only those cells are compared.
+    """
+    cells = numpy.floor(positions / distance).astype(numpy.int64)
+    # Cell coordinates are numbered per axis, so the cell codes stay small for any extent
+    axis_values = [numpy.unique(cells[:, axis]) for axis in range(3)]
+    axis_ids = numpy.stack([numpy.searchsorted(axis_values[axis], cells[:, axis]) for axis in range(3)], axis=1)
+    axis_sizes = [len(values) for values in axis_values]
+
+    def encode(ids: numpy.ndarray) -> numpy.ndarray:
+        return (ids[:, 0] * axis_sizes[1] + ids[:, 1]) * axis_sizes[2] + ids[:, 2]
+
+    codes = encode(axis_ids)
+    order = numpy.argsort(codes, kind="stable")
+    unique_codes, first_ids, cell_ids = numpy.unique(codes[order], return_index=True, return_inverse=True)
+    cell_ids = cell_ids.reshape(-1)
+    unique_cells = cells[order[first_ids]]
+
+    pairs = [get_cell_pairs(cell_ids, None)]
+    # These 13 offsets and their opposites are the 26 neighbour cells, so every pair of neighbours is compared once
+    offsets = numpy.array(numpy.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij")).reshape(3, -1).T[14:]
+    for offset in offsets:
+        neighbours = unique_cells + offset
+        neighbour_ids = numpy.stack(
+            [numpy.searchsorted(axis_values[axis], neighbours[:, axis]) for axis in range(3)], axis=1
+        )
+        has_neighbour = numpy.ones(len(unique_cells), dtype=bool)
+        for axis in range(3):
+            neighbour_ids[:, axis] = numpy.minimum(neighbour_ids[:, axis], axis_sizes[axis] - 1)
+            has_neighbour &= axis_values[axis][neighbour_ids[:, axis]] == neighbours[:, axis]
+        neighbour_codes = encode(neighbour_ids)
+        neighbour_cells = numpy.minimum(numpy.searchsorted(unique_codes, neighbour_codes), len(unique_codes) - 1)
+        has_neighbour &= unique_codes[neighbour_cells] == neighbour_codes
+        pairs.append(get_cell_pairs(cell_ids, numpy.where(has_neighbour, neighbour_cells, -1)))
+
+    firsts = order[numpy.concatenate([pair[0] for pair in pairs])]
+    seconds = order[numpy.concatenate([pair[1] for pair in pairs])]
+    differences = positions[firsts].astype(numpy.float64) - positions[seconds]
+    is_close = numpy.einsum("ij,ij->i", differences, differences) <= distance * distance
+    firsts, seconds = firsts[is_close], seconds[is_close]
+    return numpy.minimum(firsts, seconds), numpy.maximum(firsts, seconds)
+
+
+def merge_close_vertices(positions: numpy.ndarray, distance: float) -> numpy.ndarray:
+    """
+    Index of the vertex each of positions merges into: the first vertex of
+    its group of vertices linked by pairs closer than distance. The pairs of
+    get_close_pairs are united with union-find, hooking the larger root to
+    the smaller one and compressing all paths after every round, so even a
+    long chain of close vertices takes only a few rounds.
+    """
+    roots = numpy.arange(len(positions))
+    firsts, seconds = get_close_pairs(positions, distance)
+    while True:
+        first_roots, second_roots = roots[firsts], roots[seconds]
+        is_split = first_roots != second_roots
+        if not is_split.any():
+            return roots
+        firsts, seconds = firsts[is_split], seconds[is_split]
+        first_roots, second_roots = first_roots[is_split], second_roots[is_split]
+        numpy.minimum.at(roots, numpy.maximum(first_roots, second_roots), numpy.minimum(first_roots, second_roots))
+        while True:
+            next_roots = roots[roots]
+            if numpy.array_equal(next_roots, roots):
+                break
+            roots = next_roots
+
+
+def merge_vertices(positions: numpy.ndarray, distance: float = 0.0, grid: bool = False) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Merge vertices at the same position, and with distance > 0 those linked
+    by vertices closer than distance, see merge_close_vertices, or with grid
+    those in the same grid cell of size distance. Returns the merged
+    positions, in the order of their first vertex, and the index of each
+    input vertex into them.
+    """
+    if distance > 0.0 and grid:
+        keys = numpy.floor(positions / distance).astype(numpy.int64)
+    else:
+        # Adding 0.0 turns -0.0 into 0.0, so both compare equal as bytes
+        keys = positions + positions.dtype.type(0.0)
+    keys = numpy.ascontiguousarray(keys)
+    keys = keys.view(numpy.dtype((numpy.void, keys.dtype.itemsize * 3))).reshape(-1)
+    _, first_ids, inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+    order = numpy.argsort(first_ids)
+    merged_ids = numpy.empty(len(order), dtype=numpy.int64)
+    merged_ids[order] = numpy.arange(len(order))
+    merged_positions = positions[first_ids[order]]
+    inverse = merged_ids[inverse.reshape(-1)]
+    if distance > 0.0 and not grid and len(merged_positions) > 1:
+        kept_ids, target_ids = numpy.unique(merge_close_vertices(merged_positions, distance), return_inverse=True)
+        merged_positions = merged_positions[kept_ids]
+        inverse = target_ids.reshape(-1)[inverse]
+    return merged_positions, inverse.astype(numpy.int32)
+
+
+def read_stl(file_path: str, scale: float = 1.0, weld_distance: float = 0.0) -> Dict[str, numpy.ndarray]:
+    """
+    Read a binary or ASCII STL file into the arrays used by mesh_io.fill_mesh.
+    Vertices at the same position are always merged, with weld_distance > 0
+    also those closer than it, as the NUMPY weld backend does. The number of
+    vertices removed by that weld is returned as "welded_vertices".
+    """
+    if is_binary_stl(file_path):
+        positions = read_binary_stl_triangles(file_path)
+    else:
+        positions = read_ascii_stl_triangles(file_path)
+    positions *= scale
+
+    vertices, loop_verts = merge_vertices(positions)
+    welded_count = 0
+    if weld_distance > 0.0:
+        welded_vertices, weld_ids = merge_vertices(vertices, weld_distance)
+        welded_count = len(vertices) - len(welded_vertices)
+        vertices, loop_verts = welded_vertices, weld_ids[loop_verts]
+    triangles = loop_verts.reshape(-1, 3)
+    # Triangles collapsed by the merge are removed, like the Weld modifier does
+    triangles = triangles[
+        (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])
+    ]
+    if weld_distance > 0.0:
+        # The weld keeps no loose vertices behind, as weld.weld_arrays
+        used_vertices, loop_verts = numpy.unique(triangles, return_inverse=True)
+        welded_count += len(vertices) - len(used_vertices)
+        vertices, triangles = vertices[used_vertices], loop_verts.reshape(-1, 3).astype(numpy.int32)
+    triangle_count = len(triangles)
+
+    return {
+        "vertices": vertices.reshape(-1),
+        "loop_verts": triangles.reshape(-1),
+        "loop_starts": numpy.arange(0, triangle_count * 3, 3, dtype=numpy.int32),
+        "loop_totals": numpy.full(triangle_count, 3, dtype=numpy.int32),
+        "material_indices": numpy.zeros(triangle_count, dtype=numpy.int32),
+        "uvs": numpy.empty(0, dtype=numpy.float32),
+        "welded_vertices": numpy.array(welded_count),
+    }
+
+
+def get_executor(workers: int) -> Executor:
+    # Forked workers inherit the loaded modules, spawned ones would have to import the add-on package and so bpy.
+    # Fork is only safe on Linux, macOS offers it but system frameworks may crash in the child, so threads are used there.
+    if sys.platform.startswith("linux") and "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def read_stl_files(
+    file_paths: List[str], scale: float = 1.0, weld_distance: float = 0.0, workers: int = 0
+) -> Dict[str, Dict[str, numpy.ndarray]]:
+    """
+    Read many STL files with read_stl, in a pool of worker processes.
+    workers = 0 uses one worker per CPU, workers = 1 reads in this process.
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(file_paths))
+    if workers <= 1:
+        return {file_path: read_stl(file_path, scale, weld_distance) for file_path in file_paths}
+
+    with get_executor(workers) as executor:
+        futures = {file_path: executor.submit(read_stl, file_path, scale, weld_distance) for file_path in file_paths}
+        return {file_path: future.result() for file_path, future in futures.items()}
+
+
+def submit_stl_files(
+    file_paths: List[str], scale: float, weld_distance: float, workers: int, results: queue.Queue
+) -> Tuple[Executor, List[Future]]:
+    """
+    Read STL files with read_stl in the background. Each finished file is put
+    on results as (file_path, future). The caller shuts the executor down.
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(file_paths)))
+    # Even a single worker runs off the calling thread, so the caller stays responsive
+    executor = get_executor(workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+    futures = []
+    for file_path in file_paths:
+        future = executor.submit(read_stl, file_path, scale, weld_distance)
+        future.add_done_callback(lambda future, file_path=file_path: results.put((file_path, future)))
+        futures.append(future)
+    return executor, futures
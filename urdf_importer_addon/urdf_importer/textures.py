@@ -0,0 +1,428 @@
+#!/usr/bin/python3
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import bpy
+import numpy
+from bpy.types import Image, Material, Mesh
+
+HAS_PILLOW = False
+try:
+    from PIL import Image as PILImage
+    HAS_PILLOW = True
+except ImportError:
+    pass
+
+from .robot_builder import TMP_TEXTURE_PATH
+from .utils import file_digest
+
+TEXTURE_CACHE_PATH = "texture_cache/"
+TEXTURE_CACHE_VERSION = 1
+TEXTURE_QUALITY = 90  # JPEG quality
+ATLAS_SIZE = 2048  # Maximum width and height of an atlas
+ATLAS_MAX_TEXTURE = 512  # Textures up to this width and height are packed into atlases
+ATLAS_PADDING = 4  # Pixels around each texture in an atlas, filled with its border
+ATLAS_UV_TOLERANCE = 1e-3  # Textures used with UVs outside of 0..1 by more than this repeat and are not packed
+
+TEXTURE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tga", ".bmp", ".tif", ".tiff"}
+TEXTURE_FORMATS = [
+    ("KEEP", "Keep", "Keep the format of each texture"),
+    ("PNG", "PNG", "Lossless, keeps alpha"),
+    ("JPEG", "JPEG", "Lossy with the given quality, drops alpha"),
+    ("TGA", "TGA", "Uncompressed, keeps alpha"),
+]
+FORMAT_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "TGA": ".tga"}
+BPY_FILE_FORMATS = {"PNG": "PNG", "JPEG": "JPEG", "TGA": "TARGA"}
+
+
+def get_output_size(size: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+    """size scaled down to fit into max_size, keeping the aspect ratio"""
+    width, height = size
+    if max_size <= 0 or max(width, height) <= max_size:
+        return (width, height)
+    factor = max_size / max(width, height)
+    return (max(1, round(width * factor)), max(1, round(height * factor)))
+
+
+def save_with_pillow(image, dst_path: str, format: str, quality: int) -> None:
+    if format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    # Written next to the cache entry and renamed, so a concurrent export never reads a partial file
+    tmp_path = dst_path + ".%d.tmp" % os.getpid()
+    image.save(tmp_path, format=format, quality=quality)
+    os.replace(tmp_path, dst_path)
+    return None
+
+
+def process_with_pillow(src_path: str, dst_path: str, max_size: int, format: str, quality: int) -> None:
+    with PILImage.open(src_path) as image:
+        image.load()
+        format = image.format if format == "KEEP" else format
+        output_size = get_output_size(image.size, max_size)
+        if output_size != image.size:
+            image = image.resize(output_size, PILImage.LANCZOS)
+        save_with_pillow(image, dst_path, format, quality)
+    return None
+
+
+def process_with_bpy(src_path: str, dst_path: str, max_size: int, format: str, quality: int) -> None:
+    # bpy is not thread safe, so this runs on the main thread only
+    image: Image = bpy.data.images.load(os.path.abspath(src_path))
+    try:
+        output_size = get_output_size(tuple(image.size), max_size)
+        if output_size != tuple(image.size):
+            image.scale(*output_size)
+        if format != "KEEP":
+            image.file_format = BPY_FILE_FORMATS[format]
+        tmp_path = os.path.abspath(dst_path + ".%d.tmp" % os.getpid())
+        try:
+            image.save(filepath=tmp_path, quality=quality)
+        except TypeError:
+            # Blender before 3.4 saves to filepath_raw and has no quality argument
+            image.filepath_raw = tmp_path
+            image.save()
+        os.replace(tmp_path, dst_path)
+    finally:
+        bpy.data.images.remove(image)
+    return None
+
+
+def compose_atlas(
+    texture_dir: str, placements: Dict[str, Tuple[int, int, int, int]], size: Tuple[int, int], dst_path: str, format: str, quality: int
+) -> None:
+    """Paste the textures at their (x, y, width, height) placements, counted from the top left, into one atlas"""
+    atlas = PILImage.new("RGBA", size, (0, 0, 0, 0))
+    for rel_path, (x, y, width, height) in placements.items():
+        with PILImage.open(os.path.join(texture_dir, rel_path)) as image:
+            image = image.convert("RGBA")
+        # The stretched texture below fills the padding with the border colors, so mipmaps do not mix neighbours
+        padded = image.resize((width + 2 * ATLAS_PADDING, height + 2 * ATLAS_PADDING), PILImage.NEAREST)
+        atlas.paste(padded, (x - ATLAS_PADDING, y - ATLAS_PADDING))
+        atlas.paste(image.resize((width, height), PILImage.LANCZOS) if image.size != (width, height) else image, (x, y))
+    save_with_pillow(atlas, dst_path, format, quality)
+    return None
+
+
+def pack_atlases(
+    sizes: Dict[str, Tuple[int, int]], atlas_size: int, padding: int = ATLAS_PADDING
+) -> List[Tuple[Tuple[int, int], Dict[str, Tuple[int, int, int, int]]]]:
+    """
+    Place textures of the given (width, height) in rows, tallest first, and
+    start a new atlas when one is full. Returns (atlas size, placements) per
+    atlas, each atlas trimmed to the next power of two it fits in.
+    """
+    atlases = []
+    placements: Dict[str, Tuple[int, int, int, int]] = {}
+    x = y = row_height = 0
+    for rel_path, (width, height) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x + width + 2 * padding > atlas_size:
+            x, y, row_height = 0, y + row_height, 0
+        if y + height + 2 * padding > atlas_size:
+            atlases.append(placements)
+            placements, x, y, row_height = {}, 0, 0, 0
+        placements[rel_path] = (x + padding, y + padding, width, height)
+        x += width + 2 * padding
+        row_height = max(row_height, height + 2 * padding)
+    if placements:
+        atlases.append(placements)
+
+    packed = []
+    for placements in atlases:
+        used_width = max(x + width + padding for x, _, width, _ in placements.values())
+        used_height = max(y + height + padding for _, y, _, height in placements.values())
+        packed.append(((min(atlas_size, 1 << (used_width - 1).bit_length()), min(atlas_size, 1 << (used_height - 1).bit_length())), placements))
+    return packed
+
+
+def get_image_nodes(material: Material) -> List:
+    if material is None or not material.use_nodes or material.node_tree is None:
+        return []
+    return [node for node in material.node_tree.nodes if node.type == "TEX_IMAGE" and node.image is not None]
+
+
+def get_loop_materials(mesh: Mesh) -> numpy.ndarray:
+    """Material slot of the face of every loop of mesh"""
+    loop_starts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    material_indices = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    # The loops of the faces are contiguous, in the order of their loop_start
+    order = numpy.argsort(loop_starts)
+    return numpy.repeat(material_indices[order], loop_totals[order])
+
+
+def get_uvs(mesh: Mesh) -> Optional[numpy.ndarray]:
+    if mesh.uv_layers.active is None:
+        return None
+    uvs = numpy.empty(len(mesh.loops) * 2, dtype=numpy.float32)
+    mesh.uv_layers.active.data.foreach_get("uv", uvs)
+    return uvs.reshape(-1, 2)
+
+
+class TextureProcessor:
+    """
+    Export-time processing of the textures staged in texture_dir. Every
+    texture is resized to fit max_size and saved as format, and with atlas,
+    textures up to atlas_max_texture pixels that are only used with UVs in
+    0..1 are packed into atlases and their UVs are remapped on export.
+    Results are cached by content hash in cache_path, so unchanged textures
+    are not processed again. Pillow processes the textures in a thread
+    pool; without Pillow they are processed one by one with bpy and no
+    atlases are built.
+    """
+
+    def __init__(
+        self,
+        texture_dir: str = TMP_TEXTURE_PATH,
+        max_size: int = 0,
+        format: str = "KEEP",
+        quality: int = TEXTURE_QUALITY,
+        atlas: bool = False,
+        atlas_size: int = ATLAS_SIZE,
+        atlas_max_texture: int = ATLAS_MAX_TEXTURE,
+        workers: int = 0,
+        cache_path: str = TEXTURE_CACHE_PATH,
+    ):
+        self.texture_dir = texture_dir
+        self.max_size = max_size
+        self.format = format
+        self.quality = quality
+        self.atlas = atlas
+        self.atlas_size = atlas_size
+        self.atlas_max_texture = atlas_max_texture
+        self.workers = workers
+        self.cache_path = cache_path
+        self.outputs: Dict[str, str] = {}  # Output file name, relative to the texture folder of the export, to the file it is copied from
+        self.image_outputs: Dict[str, str] = {}  # Staged texture to its output file name
+        self.atlas_rects: Dict[str, Tuple[str, numpy.ndarray, numpy.ndarray]] = {}  # Staged texture to its atlas, UV offset and UV scale
+
+    def is_enabled(self) -> bool:
+        return self.max_size > 0 or self.format != "KEEP" or self.atlas
+
+    def get_options(self) -> Dict:
+        """Options that change the processed textures, part of the cache keys and the export manifest"""
+        if not self.is_enabled():
+            return {}
+        options = {"max_size": self.max_size, "format": self.format, "quality": self.quality, "pillow": HAS_PILLOW}
+        if self.atlas:
+            options.update({"atlas_size": self.atlas_size, "atlas_max_texture": self.atlas_max_texture, "atlas_padding": ATLAS_PADDING})
+        return options
+
+    def get_key(self, *parts) -> str:
+        key = json.dumps([TEXTURE_CACHE_VERSION, self.get_options(), parts])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get_texture_paths(self) -> List[str]:
+        rel_paths = []
+        for dir_path, _, file_names in os.walk(self.texture_dir):
+            for file_name in file_names:
+                rel_paths.append(os.path.relpath(os.path.join(dir_path, file_name), self.texture_dir))
+        return sorted(rel_paths)
+
+    def get_staged_path(self, image: Image) -> Optional[str]:
+        """Path of image relative to texture_dir, None if it is not a staged texture"""
+        if image.source != "FILE" or not image.filepath:
+            return None
+        rel_path = os.path.relpath(bpy.path.abspath(image.filepath), os.path.abspath(self.texture_dir))
+        return None if rel_path.startswith("..") else rel_path
+
+    def get_uv_ranges(self) -> Dict[str, Tuple[numpy.ndarray, numpy.ndarray]]:
+        """Minimum and maximum UV per material over all meshes of the scene"""
+        uv_ranges = {}
+        meshes = {object.data for object in bpy.context.scene.objects if object.type == "MESH"}
+        for mesh in meshes:
+            uvs = get_uvs(mesh)
+            if uvs is None or len(uvs) == 0:
+                continue
+            loop_materials = get_loop_materials(mesh)
+            for slot, material in enumerate(mesh.materials):
+                slot_uvs = uvs[loop_materials == slot]
+                if material is None or len(slot_uvs) == 0:
+                    continue
+                minimum, maximum = slot_uvs.min(axis=0), slot_uvs.max(axis=0)
+                if material.name in uv_ranges:
+                    minimum = numpy.minimum(minimum, uv_ranges[material.name][0])
+                    maximum = numpy.maximum(maximum, uv_ranges[material.name][1])
+                uv_ranges[material.name] = (minimum, maximum)
+        return uv_ranges
+
+    def get_atlas_candidates(self, rel_paths: List[str]) -> Dict[str, Tuple[int, int]]:
+        """Output size of the staged textures that can be packed: small, and only used alone by materials with UVs in 0..1"""
+        uv_ranges = self.get_uv_ranges()
+        blocked = set()
+        used = set()
+        for material in bpy.data.materials:
+            image_nodes = get_image_nodes(material)
+            staged_paths = {self.get_staged_path(node.image) for node in image_nodes}
+            uv_range = uv_ranges.get(material.name)
+            in_range = uv_range is None or (
+                (uv_range[0] >= -ATLAS_UV_TOLERANCE).all() and (uv_range[1] <= 1 + ATLAS_UV_TOLERANCE).all()
+            )
+            if len(image_nodes) != 1 or not in_range:
+                blocked |= staged_paths
+            else:
+                used |= staged_paths
+
+        sizes = {}
+        for rel_path in rel_paths:
+            if rel_path not in used or rel_path in blocked or os.path.splitext(rel_path)[1].lower() not in TEXTURE_EXTENSIONS:
+                continue
+            try:
+                with PILImage.open(os.path.join(self.texture_dir, rel_path)) as image:
+                    size = get_output_size(image.size, self.max_size)
+            except OSError:
+                continue
+            if max(size) <= self.atlas_max_texture and max(size) + 2 * ATLAS_PADDING <= self.atlas_size:
+                sizes[rel_path] = size
+        return sizes
+
+    def get_output_name(self, rel_path: str, digest: str) -> str:
+        output_name = rel_path
+        if self.format != "KEEP":
+            output_name = os.path.splitext(rel_path)[0] + FORMAT_EXTENSIONS[self.format]
+        if output_name in self.outputs:
+            # e.g. a.png and a.jpg both saved as JPEG
+            stem, ext = os.path.splitext(output_name)
+            output_name = stem + "_" + digest[:8] + ext
+        return output_name
+
+    def get_mapping(self) -> Dict:
+        """Which output, atlas and UV rectangle each staged texture got in process, applied writes this into the FBX"""
+        return {
+            "images": dict(sorted(self.image_outputs.items())),
+            "atlases": {
+                rel_path: [output_name, offset.tolist(), scale.tolist()]
+                for rel_path, (output_name, offset, scale) in sorted(self.atlas_rects.items())
+            },
+        }
+
+    def process(self) -> Dict[str, str]:
+        """Process the staged textures, returns self.outputs"""
+        self.outputs = {}
+        self.image_outputs = {}
+        self.atlas_rects = {}
+        if not os.path.exists(self.texture_dir):
+            return self.outputs
+        rel_paths = self.get_texture_paths()
+        if not self.is_enabled():
+            self.outputs = {rel_path: os.path.join(self.texture_dir, rel_path) for rel_path in rel_paths}
+            return self.outputs
+        if not os.path.exists(self.cache_path):
+            os.makedirs(self.cache_path)
+
+        digests = {rel_path: file_digest(os.path.join(self.texture_dir, rel_path)) for rel_path in rel_paths}
+        jobs: List[Tuple[Callable, Tuple, str]] = []
+        atlas_format = "PNG" if self.format == "KEEP" else self.format
+        if self.atlas and HAS_PILLOW:
+            for atlas_size, placements in pack_atlases(self.get_atlas_candidates(rel_paths), self.atlas_size):
+                if len(placements) < 2:
+                    continue
+                key = self.get_key(sorted((digests[rel_path], placement) for rel_path, placement in placements.items()))
+                cache_path = os.path.join(self.cache_path, key + FORMAT_EXTENSIONS[atlas_format])
+                output_name = "atlas_" + key[:12] + FORMAT_EXTENSIONS[atlas_format]
+                self.outputs[output_name] = cache_path
+                for rel_path, (x, y, width, height) in placements.items():
+                    offset = numpy.array([x / atlas_size[0], (atlas_size[1] - y - height) / atlas_size[1]])
+                    scale = numpy.array([width / atlas_size[0], height / atlas_size[1]])
+                    self.atlas_rects[rel_path] = (output_name, offset, scale)
+                jobs.append((compose_atlas, (self.texture_dir, placements, atlas_size, cache_path, atlas_format, self.quality), cache_path))
+        elif self.atlas:
+            print("Pillow is not installed, textures are not packed into atlases")
+
+        for rel_path in rel_paths:
+            src_path = os.path.join(self.texture_dir, rel_path)
+            if rel_path in self.atlas_rects:
+                continue
+            if os.path.splitext(rel_path)[1].lower() not in TEXTURE_EXTENSIONS:
+                self.outputs[rel_path] = src_path
+                continue
+            output_name = self.get_output_name(rel_path, digests[rel_path])
+            cache_path = os.path.join(self.cache_path, self.get_key(digests[rel_path]) + os.path.splitext(output_name)[1])
+            self.outputs[output_name] = cache_path
+            self.image_outputs[rel_path] = output_name
+            process = process_with_pillow if HAS_PILLOW else process_with_bpy
+            jobs.append((process, (src_path, cache_path, self.max_size, self.format, self.quality), cache_path))
+
+        self.run_jobs([job for job in jobs if not os.path.exists(job[2])])
+        return self.outputs
+
+    def run_jobs(self, jobs: List[Tuple[Callable, Tuple, str]]) -> None:
+        if not jobs:
+            return None
+        print("Processing", len(jobs), "textures")
+        if not HAS_PILLOW:
+            for function, args, _ in jobs:
+                function(*args)
+            return None
+        # Pillow releases the GIL while decoding, resizing and encoding, so threads run in parallel
+        workers = self.workers if self.workers > 0 else os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = [executor.submit(function, *args) for function, args, _ in jobs]
+            for future in futures:
+                future.result()
+        return None
+
+    @contextmanager
+    def applied(self, output_dir: str) -> Iterator[None]:
+        """
+        While the context is active, the staged images of the scene point at
+        their processed files in output_dir, and the UVs of packed textures
+        point into their atlas, e.g. for an FBX export.
+        """
+        if not self.is_enabled():
+            yield None
+            return
+        image_paths: List[Tuple[Image, str]] = []
+        node_images = []
+        mesh_uvs: List[Tuple[Mesh, numpy.ndarray]] = []
+        atlas_images: Dict[str, Image] = {}
+        try:
+            for image in bpy.data.images:
+                rel_path = self.get_staged_path(image)
+                if rel_path in self.image_outputs:
+                    image_paths.append((image, image.filepath))
+                    image.filepath = os.path.abspath(os.path.join(output_dir, self.image_outputs[rel_path]))
+
+            material_rects = {}
+            for material in bpy.data.materials:
+                for node in get_image_nodes(material):
+                    rel_path = self.get_staged_path(node.image)
+                    if rel_path not in self.atlas_rects:
+                        continue
+                    output_name, offset, scale = self.atlas_rects[rel_path]
+                    if output_name not in atlas_images:
+                        atlas_images[output_name] = bpy.data.images.load(os.path.abspath(os.path.join(output_dir, output_name)))
+                    node_images.append((node, node.image))
+                    node.image = atlas_images[output_name]
+                    material_rects[material.name] = (offset, scale)
+
+            meshes = {object.data for object in bpy.context.scene.objects if object.type == "MESH"}
+            for mesh in meshes:
+                slots = [slot for slot, material in enumerate(mesh.materials) if material is not None and material.name in material_rects]
+                uvs = get_uvs(mesh) if slots else None
+                if uvs is None:
+                    continue
+                mesh_uvs.append((mesh, uvs.copy()))
+                loop_materials = get_loop_materials(mesh)
+                for slot in slots:
+                    offset, scale = material_rects[mesh.materials[slot].name]
+                    loops = loop_materials == slot
+                    uvs[loops] = offset + uvs[loops] * scale
+                mesh.uv_layers.active.data.foreach_set("uv", uvs.reshape(-1))
+            yield None
+        finally:
+            for mesh, uvs in mesh_uvs:
+                mesh.uv_layers.active.data.foreach_set("uv", uvs.reshape(-1))
+            for node, image in node_images:
+                node.image = image
+            for image in atlas_images.values():
+                bpy.data.images.remove(image)
+            for image, filepath in image_paths:
+                image.filepath = filepath
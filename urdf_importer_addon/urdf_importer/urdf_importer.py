@@ -1,13 +1,46 @@
 #!/usr/bin/python3
 
+import json
+
 import bpy
 from bpy_extras.io_utils import ImportHelper
 
-from .robot_builder import RobotBuilder
+from .mesh_cache import MESH_CACHE_SIZE, clear_mesh_cache
+from .robot_builder import LINK_METADATA, PROXY_METADATA, ROBOT_METADATA, RobotBuilder, load_full_meshes
+from .watcher import start_watch, stop_watch
+from .weld import WELD_BACKENDS, WELD_DISTANCE
+
+MODAL_LINK_BATCH_SIZE = 8  # Links built per timer tick of the modal import
+MODAL_TIMER_INTERVAL = 0.01
+# Events that are not user input, e.g. timers of other operators, and viewport navigation pass through the modal import.
+# Other input is swallowed, see modal.
+MODAL_PASS_THROUGH_EVENTS = {
+    "TIMER", "TIMER0", "TIMER1", "TIMER2", "TIMER_JOBS", "TIMER_AUTOSAVE", "TIMER_REPORT", "TIMERREGION", "WINDOW_DEACTIVATE", "NONE",
+    "MOUSEMOVE", "INBETWEEN_MOUSEMOVE", "MIDDLEMOUSE", "WHEELUPMOUSE", "WHEELDOWNMOUSE", "WHEELINMOUSE", "WHEELOUTMOUSE",
+    "TRACKPADPAN", "TRACKPADZOOM", "MOUSEROTATE", "MOUSESMARTZOOM",
+    "NUMPAD_0", "NUMPAD_1", "NUMPAD_2", "NUMPAD_3", "NUMPAD_4", "NUMPAD_5", "NUMPAD_6", "NUMPAD_7", "NUMPAD_8", "NUMPAD_9",
+    "NUMPAD_PERIOD", "NUMPAD_PLUS", "NUMPAD_MINUS", "HOME",
+}
+MODAL_PASS_THROUGH_PREFIX = "NDOF_"  # 3D mouse motion and buttons
+
+
+def on_imported(robot_builder, filepath, builder_args, options, report=None, watch=False):
+    if report is not None and robot_builder.profiler.enabled:
+        report({"INFO"}, robot_builder.profiler.get_summary())
+    if report is not None and robot_builder.lod_triangles:
+        level_triangles = [sum(levels) for levels in zip(*robot_builder.lod_triangles.values())]
+        report({"INFO"}, "LOD triangles: " + " -> ".join(str(triangle_count) for triangle_count in level_triangles))
+    if watch:
+        start_watch(filepath, builder_args, options, robot_builder)
 
 
-def read_data(filepath, merge_duplicate_materials, should_check_material_name, rename_materials, apply_weld, unique_name, scale_unit, ignore_root):
-    RobotBuilder(filepath, merge_duplicate_materials, should_check_material_name, rename_materials, apply_weld, unique_name, scale_unit, ignore_root)
+def read_data(
+    filepath, merge_duplicate_materials, should_check_material_name, rename_materials, apply_weld, unique_name, scale_unit, ignore_root,
+    report=None, watch=False, **options
+):
+    builder_args = (merge_duplicate_materials, should_check_material_name, rename_materials, apply_weld, unique_name, scale_unit, ignore_root)
+    robot_builder = RobotBuilder(filepath, *builder_args, **options)
+    on_imported(robot_builder, filepath, builder_args, options, report, watch)
 
     return {"FINISHED"}
 
@@ -28,21 +61,176 @@ class URDFImporter(bpy.types.Operator, ImportHelper):
     )
     rename_materials: bpy.props.BoolProperty(name="Rename materials", default=True)
     apply_weld: bpy.props.BoolProperty(name="Apply weld modifier", default=True)
+    weld_backend: bpy.props.EnumProperty(
+        name="Weld method", description="How vertices are merged when weld is applied", items=WELD_BACKENDS, default="BMESH"
+    )
+    weld_distance: bpy.props.FloatProperty(name="Weld distance", default=WELD_DISTANCE, min=0.0, precision=4)
     unique_name: bpy.props.BoolProperty(name="Each texture has an unique name", default=True)
     scale_unit: bpy.props.FloatProperty(name="Scale unit (for Unreal Engine is 0.01)", default=0.01)
     ignore_root: bpy.props.BoolProperty(name="Ignore root link (e.g world), only applicable when the root has a single child link", default=False)
+    use_mesh_cache: bpy.props.BoolProperty(name="Cache processed meshes on disk", default=False)
+    mesh_cache_size: bpy.props.FloatProperty(name="Mesh cache size (MB)", default=MESH_CACHE_SIZE, min=0.0)
+    use_native_stl: bpy.props.BoolProperty(name="Read STL files without the STL import operator", default=True)
+    mesh_workers: bpy.props.IntProperty(name="Mesh decoding processes (0 for one per CPU)", default=0, min=0)
+    update: bpy.props.BoolProperty(name="Only rebuild links that changed since the last import of this robot", default=False)
+    lod_levels: bpy.props.IntProperty(name="LOD levels added to each link mesh", default=0, min=0)
+    lod_ratio: bpy.props.FloatProperty(name="Triangle ratio of a LOD to the previous one", default=0.5, min=0.01, max=1.0)
+    lod_error: bpy.props.FloatProperty(name="Error of LOD1 in meters, doubled per level, 0 uses the ratio", default=0.0, min=0.0, precision=4)
+    proxy: bpy.props.BoolProperty(name="Import links as bounding boxes, load their meshes later with Load full URDF meshes", default=False)
+    watch: bpy.props.BoolProperty(name="Watch the URDF and mesh files and update the robot when they change", default=False)
+    profile: bpy.props.BoolProperty(name="Write import timings to <robot>_import_profile.json", default=False)
+    use_modal: bpy.props.BoolProperty(name="Import in steps with a progress bar, Esc cancels", default=True)
 
     # ImportHelper mixin class uses this
     filename_ext = ".urdf"
 
-    def execute(self, _):
-        if self.merge_duplicate_materials == "OP1":
-            return read_data(
-                self.filepath, self.merge_duplicate_materials, True, self.rename_materials, self.apply_weld, self.unique_name, self.scale_unit, self.ignore_root
-            )
-        elif self.merge_duplicate_materials == "OP2":
-            return read_data(
-                self.filepath, self.merge_duplicate_materials, False, self.rename_materials, self.apply_weld, self.unique_name, self.scale_unit, self.ignore_root
-            )
-        else:
+    def get_builder_options(self) -> dict:
+        return {
+            "use_mesh_cache": self.use_mesh_cache,
+            "mesh_cache_size": self.mesh_cache_size,
+            "weld_backend": self.weld_backend,
+            "weld_distance": self.weld_distance,
+            "use_native_stl": self.use_native_stl,
+            "mesh_workers": self.mesh_workers,
+            "profile": self.profile,
+            "update": self.update,
+            # The watcher updates the robot, which needs the signatures of this import
+            "store_signatures": self.watch,
+            "proxy": self.proxy,
+            "lod_ratios": [self.lod_ratio**level for level in range(1, self.lod_levels + 1)] if self.lod_levels > 0 else None,
+            "lod_errors": (
+                [self.lod_error * 2 ** level for level in range(self.lod_levels)] if self.lod_levels > 0 and self.lod_error > 0 else None
+            ),
+            "watch": self.watch,
+            "report": self.report,
+        }
+
+    def get_builder_args(self) -> tuple:
+        # OP1 merges with name check, OP2 without
+        return (
+            self.merge_duplicate_materials,
+            self.merge_duplicate_materials == "OP1",
+            self.rename_materials,
+            self.apply_weld,
+            self.unique_name,
+            self.scale_unit,
+            self.ignore_root,
+        )
+
+    def execute(self, context):
+        if self.merge_duplicate_materials not in ("OP1", "OP2"):
             return {"FINISHED"}
+        # Background Blender has no event loop to drive a modal operator
+        if self.use_modal and not bpy.app.background:
+            return self.start_modal(context)
+        return read_data(self.filepath, *self.get_builder_args(), **self.get_builder_options())
+
+    def start_modal(self, context):
+        self.options = self.get_builder_options()
+        self.options.pop("report")
+        self.watch_after_import = self.options.pop("watch")
+        self.robot_builder = RobotBuilder(self.filepath, *self.get_builder_args(), run=False, **self.options)
+        self.steps = self.robot_builder.build_steps(MODAL_LINK_BATCH_SIZE, decode_in_background=True)
+
+        window_manager = context.window_manager
+        self.timer = window_manager.event_timer_add(MODAL_TIMER_INTERVAL, window=context.window)
+        window_manager.progress_begin(0, 100)
+        window_manager.modal_handler_add(self)
+        return {"RUNNING_MODAL"}
+
+    def stop_modal(self, context) -> None:
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self.timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+        return None
+
+    def show_progress(self, context, progress: dict) -> None:
+        link_count = max(progress["link_count"], 1)
+        context.window_manager.progress_update(int(100 * progress["links"] / link_count))
+        megabytes = (progress["bytes"] / 1024**2, progress["byte_count"] / 1024**2)
+        context.workspace.status_text_set(
+            "Importing %s: %d/%d links, %d meshes, %.1f/%.1f MB (Esc to cancel)"
+            % (self.robot_builder.robot.name, progress["links"], progress["link_count"], progress["meshes"], *megabytes)
+        )
+        return None
+
+    def modal(self, context, event):
+        if event.type == "ESC" and event.value == "PRESS":
+            self.robot_builder.cancel()
+            self.stop_modal(context)
+            self.report({"WARNING"}, "URDF import cancelled")
+            return {"CANCELLED"}
+        if event.type != "TIMER" or event.timer != self.timer:
+            # Clicks and keys could change the mode, the selection or the active object the builder relies on
+            if event.type in MODAL_PASS_THROUGH_EVENTS or event.type.startswith(MODAL_PASS_THROUGH_PREFIX):
+                return {"PASS_THROUGH"}
+            return {"RUNNING_MODAL"}
+
+        try:
+            progress = next(self.steps)
+        except StopIteration:
+            self.stop_modal(context)
+            builder_args = self.get_builder_args()
+            on_imported(self.robot_builder, self.filepath, builder_args, self.options, self.report, self.watch_after_import)
+            return {"FINISHED"}
+        except Exception as error:
+            self.robot_builder.cancel()
+            self.stop_modal(context)
+            self.report({"ERROR"}, "URDF import failed: %r" % error)
+            return {"CANCELLED"}
+        self.show_progress(context, progress)
+        return {"RUNNING_MODAL"}
+
+
+class ClearMeshCache(bpy.types.Operator):
+    """Remove all processed meshes cached on disk"""
+
+    bl_idname = "wm.urdf_clear_mesh_cache"
+    bl_label = "Clear URDF mesh cache"
+
+    def execute(self, _):
+        clear_mesh_cache()
+        return {"FINISHED"}
+
+
+class StopURDFWatch(bpy.types.Operator):
+    """Stop updating imported robots when their URDF or mesh files change"""
+
+    bl_idname = "wm.urdf_stop_watch"
+    bl_label = "Stop watching URDF files"
+
+    def execute(self, _):
+        stop_watch()
+        return {"FINISHED"}
+
+
+class LoadFullMeshes(bpy.types.Operator):
+    """Replace the bounding box proxies of imported robots with their full meshes"""
+
+    bl_idname = "object.urdf_load_full_meshes"
+    bl_label = "Load full URDF meshes"
+
+    selected_only: bpy.props.BoolProperty(name="Only the selected links", default=True)
+
+    def execute(self, context):
+        link_names = {}
+        for object in context.scene.objects:
+            if not object.get(PROXY_METADATA) or LINK_METADATA not in object or object.parent is None:
+                continue
+            if ROBOT_METADATA not in object.parent or (self.selected_only and not object.select_get()):
+                continue
+            link_names.setdefault(object.parent.name, []).append(object[LINK_METADATA])
+        if not link_names:
+            self.report({"INFO"}, "No link proxies to load")
+            return {"CANCELLED"}
+
+        if context.object is not None and context.object.mode != "OBJECT":
+            bpy.ops.object.mode_set(mode="OBJECT")
+        for root_name, root_link_names in link_names.items():
+            root = bpy.data.objects[root_name]
+            if "arguments" not in json.loads(root[ROBOT_METADATA]):
+                self.report({"WARNING"}, "Robot %s was imported by an older version, import it again" % root_name)
+                continue
+            load_full_meshes(root, root_link_names if self.selected_only else None)
+        return {"FINISHED"}
@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+
+import hashlib
+import os
+from typing import Dict, Tuple
+
+_file_digests: Dict[str, Tuple[int, int, str]] = {}
+
+
+def file_digest(file_path: str) -> str:
+    """
+    Return the SHA-1 of a file's contents. Digests are memoized on
+    (mtime, size), so unchanged files are only read once per session.
+    """
+    stat = os.stat(file_path)
+    cached = _file_digests.get(file_path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    sha = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    _file_digests[file_path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+
+import os
+import traceback
+from collections import deque
+from typing import Dict, List, Tuple
+
+import bpy
+
+from .robot_builder import RobotBuilder
+
+WATCH_INTERVAL = 1.0  # Seconds between two polls
+WATCH_BATCH_SIZE = 2000  # Files stat'ed per poll, larger workspaces are checked over several polls
+
+_watchers: Dict[str, "RobotWatcher"] = {}
+
+
+def get_file_state(file_path: str) -> Tuple[int, int]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class RobotWatcher:
+    """
+    Poll the URDF file and the mesh files it references with os.stat from
+    a Blender timer. When a file changed and kept its new mtime and size
+    for one poll, the robot is imported again in update mode, so only the
+    links using the changed files are rebuilt.
+    """
+
+    def __init__(
+        self, file_path: str, builder_args: Tuple, builder_options: Dict, interval: float = WATCH_INTERVAL, batch_size: int = WATCH_BATCH_SIZE
+    ):
+        self.file_path = file_path
+        self.builder_args = builder_args
+        self.builder_options = {**builder_options, "update": True}
+        self.interval = interval
+        self.batch_size = batch_size
+        self.file_states: Dict[str, Tuple[int, int]] = {}
+        self.pending_paths: deque = deque()
+        self.changed_paths: Dict[str, Tuple[int, int]] = {}
+        # Blender identifies timers by the function object, a bound method is a new object on every access
+        self.timer = self.tick
+
+    def watch(self, robot_builder: RobotBuilder) -> None:
+        """Watch the URDF and every mesh path resolved by robot_builder"""
+        file_paths: List[str] = [self.file_path]
+        for link in robot_builder.robot.links:
+            for visual in link.visuals:
+                file_path = getattr(visual.geometry, "filename", None)
+                if file_path and file_path not in file_paths:
+                    file_paths.append(file_path)
+        self.file_states = {file_path: get_file_state(file_path) for file_path in file_paths}
+        self.pending_paths = deque(file_paths)
+        self.changed_paths = {}
+        return None
+
+    def poll(self) -> bool:
+        """Stat the next batch of files, returns True when changed files are ready to be reloaded"""
+        # Files that changed in the last poll must have settled, e.g. are no longer being written
+        settled = bool(self.changed_paths)
+        for file_path, file_state in list(self.changed_paths.items()):
+            new_state = get_file_state(file_path)
+            if new_state != file_state:
+                self.changed_paths[file_path] = new_state
+                settled = False
+        if settled:
+            return True
+
+        if not self.pending_paths:
+            self.pending_paths.extend(self.file_states)
+        for _ in range(min(self.batch_size, len(self.pending_paths))):
+            file_path = self.pending_paths.popleft()
+            file_state = get_file_state(file_path)
+            if file_state != self.file_states[file_path]:
+                self.changed_paths[file_path] = file_state
+        return False
+
+    def reload(self) -> None:
+        print("Reloading", self.file_path, "after changes of", ", ".join(self.changed_paths))
+        for file_path, file_state in self.changed_paths.items():
+            self.file_states[file_path] = file_state
+        self.changed_paths = {}
+        if bpy.context.object is not None and bpy.context.object.mode != "OBJECT":
+            bpy.ops.object.mode_set(mode="OBJECT")
+        robot_builder = RobotBuilder(self.file_path, *self.builder_args, **{**self.builder_options, "run": False})
+        try:
+            robot_builder.run()
+        except Exception:
+            # A failed update leaves the previous robot, tick reports the error
+            robot_builder.cancel()
+            raise
+        self.watch(robot_builder)
+        return None
+
+    def tick(self) -> float:
+        # An exception would unregister the timer, so a broken intermediate file only skips this reload
+        try:
+            if self.poll():
+                self.reload()
+        except Exception:
+            traceback.print_exc()
+        return self.interval
+
+    def start(self) -> None:
+        if not bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.register(self.timer, first_interval=self.interval, persistent=True)
+        return None
+
+    def stop(self) -> None:
+        if bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.unregister(self.timer)
+        return None
+
+
+def start_watch(file_path: str, builder_args: Tuple, builder_options: Dict, robot_builder: RobotBuilder) -> RobotWatcher:
+    """Watch file_path, replacing an earlier watch of the same file"""
+    file_path = os.path.abspath(file_path)
+    stop_watch(file_path)
+    watcher = RobotWatcher(file_path, builder_args, builder_options)
+    watcher.watch(robot_builder)
+    watcher.start()
+    _watchers[file_path] = watcher
+    return watcher
+
+
+def stop_watch(file_path: str = None) -> None:
+    """Stop watching file_path, or all files if file_path is None"""
+    file_paths = list(_watchers) if file_path is None else [os.path.abspath(file_path)]
+    for file_path in file_paths:
+        watcher = _watchers.pop(file_path, None)
+        if watcher is not None:
+            watcher.stop()
+    return None
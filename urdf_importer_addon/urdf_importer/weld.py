@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+from typing import Dict, Tuple
+
+import bmesh
+import bpy
+import numpy
+from bpy.types import Mesh, Object
+
+from .mesh_io import fill_mesh, mesh_to_arrays
+from .stl_reader import merge_vertices
+
+WELD_DISTANCE = 0.001  # Default merge distance of the Weld modifier
+WELD_BACKENDS = [
+    ("MODIFIER", "Weld modifier", "Apply a Weld modifier through operators"),
+    ("BMESH", "BMesh", "Merge vertices by distance with bmesh remove_doubles"),
+    ("NUMPY", "NumPy", "Merge vertices closer than distance with NumPy, keeps faces, materials and the active UV map"),
+]
+
+
+def weld_arrays(arrays: Dict[str, numpy.ndarray], distance: float, grid: bool = False) -> Tuple[Dict[str, numpy.ndarray], int]:
+    """
+    Merge the vertices of mesh_io arrays that are closer than distance, or
+    with grid those in the same grid cell of size distance, see
+    stl_reader.merge_vertices. Edges collapsed by the merge are removed from
+    their faces and faces left with less than three corners are removed, as
+    the Weld modifier does. Returns the welded arrays and the number of
+    removed vertices.
+    """
+    vertex_count = len(arrays["vertices"]) // 3
+    merged_vertices, inverse = merge_vertices(arrays["vertices"].reshape(-1, 3), distance, grid)
+    loop_verts = inverse[arrays["loop_verts"]]
+    loop_starts = arrays["loop_starts"]
+    loop_totals = arrays["loop_totals"]
+
+    # Drop corners that merged with the next corner of the same face
+    next_loops = numpy.arange(1, len(loop_verts) + 1)
+    next_loops[loop_starts + loop_totals - 1] = loop_starts
+    loop_polygons = numpy.repeat(numpy.arange(len(loop_starts)), loop_totals)
+    keep_loops = loop_verts != loop_verts[next_loops]
+    new_totals = numpy.bincount(loop_polygons[keep_loops], minlength=len(loop_starts))
+    keep_polygons = new_totals >= 3
+    keep_loops &= keep_polygons[loop_polygons]
+
+    # Only vertices still used by a face are kept, like the Weld modifier keeps no loose vertices behind
+    used_vertices, loop_verts = numpy.unique(loop_verts[keep_loops], return_inverse=True)
+    vertices = merged_vertices[used_vertices]
+
+    loop_totals = new_totals[keep_polygons].astype(numpy.int32)
+    uvs = arrays["uvs"]
+    if len(uvs) == len(arrays["loop_verts"]) * 2:
+        uvs = uvs.reshape(-1, 2)[keep_loops].reshape(-1)
+    welded = {
+        "vertices": vertices.reshape(-1),
+        "loop_verts": loop_verts.reshape(-1).astype(numpy.int32),
+        "loop_starts": (numpy.cumsum(loop_totals) - loop_totals).astype(numpy.int32),
+        "loop_totals": loop_totals,
+        "material_indices": arrays["material_indices"][keep_polygons],
+        "uvs": uvs,
+    }
+    return welded, vertex_count - len(vertices)
+
+
+def weld_with_modifier(object: Object, distance: float) -> None:
+    # Must be called with object as the only selected and the active object
+    modifier = object.modifiers.new("Weld", "WELD")
+    modifier.merge_threshold = distance
+    # Modifiers cannot be applied to
+    # multi-user data, so we make it single.
+    bpy.ops.object.make_single_user(
+        object=True, obdata=True, material=False,
+        animation=False, obdata_animation=False)
+    bpy.ops.object.modifier_apply(modifier=modifier.name)
+    return None
+
+
+def weld_with_bmesh(mesh: Mesh, distance: float) -> None:
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=distance)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+    return None
+
+
+def weld_with_numpy(object: Object, distance: float) -> None:
+    mesh: Mesh = object.data
+    arrays, _ = weld_arrays(mesh_to_arrays(mesh), distance)
+    welded_mesh = fill_mesh(bpy.data.meshes.new(mesh.name), arrays)
+    for material in mesh.materials:
+        welded_mesh.materials.append(material)
+    object.data = welded_mesh
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+    return None
+
+
+def weld_object(object: Object, backend: str = "BMESH", distance: float = WELD_DISTANCE) -> int:
+    """Merge the vertices of object closer than distance with one of WELD_BACKENDS, returns the number of removed vertices"""
+    vertex_count = len(object.data.vertices)
+    if backend == "MODIFIER":
+        weld_with_modifier(object, distance)
+    elif backend == "BMESH":
+        if object.data.users > 1:
+            object.data = object.data.copy()
+        weld_with_bmesh(object.data, distance)
+    elif backend == "NUMPY":
+        weld_with_numpy(object, distance)
+    else:
+        raise ValueError("Unknown weld backend " + backend)
+    return vertex_count - len(object.data.vertices)